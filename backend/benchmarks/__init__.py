@@ -0,0 +1,8 @@
+"""Benchmarks and load tests for the upload and match pipeline.
+
+    python -m benchmarks stages --output stages.json
+    python -m benchmarks load --output load.json
+    python -m benchmarks compare before.json after.json
+
+Run from backend/. Results are JSON so runs can be diffed between commits.
+"""
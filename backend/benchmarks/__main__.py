@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+
+from benchmarks import report
+from benchmarks.corpus import SIZES
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="MatchPoint benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stages = commands.add_parser("stages", help="per-stage microbenchmarks")
+    stages.add_argument("--only", default="extract,chunk,embed,ats,cache", help="comma-separated stages")
+    stages.add_argument("--repeat", type=int, default=20)
+    stages.add_argument("--output")
+
+    load = commands.add_parser("load", help="end-to-end load test against a local server")
+    load.add_argument("--resumes", type=int, default=20)
+    load.add_argument("--jobs", type=int, default=5)
+    load.add_argument("--matches", type=int, default=100)
+    load.add_argument("--concurrency", type=int, default=8)
+    load.add_argument("--formats", default="txt,docx,pdf")
+    load.add_argument("--size", default="small", choices=sorted(SIZES))
+    load.add_argument("--stream", action="store_true", help="use /match/stream instead of /match")
+    load.add_argument("--workers", type=int, default=1)
+    load.add_argument("--llm-latency", type=float, default=0.5, help="seconds the stub LLM takes per call")
+    load.add_argument("--redis-url", help="default: in-memory cache (single worker only)")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--request-timeout", type=float, default=120)
+    load.add_argument("--startup-timeout", type=float, default=300)
+    load.add_argument("--server-output", action="store_true", help="show server logs")
+    load.add_argument("--output")
+
+    compare = commands.add_parser("compare", help="compare two result files")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.add_argument("--threshold", type=float, default=0.1, help="relative change flagged as a regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "load" and args.workers > 1 and not args.redis_url:
+        # Each worker has its own in-memory cache, so a match would miss uploads made on another.
+        load.error("--workers > 1 needs --redis-url")
+
+    if args.command == "stages":
+        from benchmarks import stages as stage_benchmarks
+
+        selected = args.only.split(",")
+        results = stage_benchmarks.run(selected, args.repeat)
+        report.write_report("stages", {"stages": selected, "repeat": args.repeat}, results, args.output)
+    elif args.command == "load":
+        from benchmarks import load as load_test
+
+        config = {key: value for key, value in vars(args).items() if key not in ("command", "output", "server_output")}
+        report.write_report("load", config, load_test.run(args), args.output)
+    else:
+        with open(args.before) as before, open(args.after) as after:
+            rows = report.compare(json.load(before), json.load(after), args.threshold)
+        regressions = 0
+        for name, metric, old, new, change, regressed in rows:
+            regressions += regressed
+            print(f"{'!' if regressed else ' '} {name:45} {metric:12} {old:>12} -> {new:<12} {change:+.1%}")
+        return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
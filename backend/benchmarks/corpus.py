@@ -0,0 +1,96 @@
+"""Deterministic synthetic resumes and job descriptions in TXT, DOCX and PDF."""
+import io
+import json
+import random
+
+from skills import SKILLS_TAXONOMY_PATH
+
+FILLER = (
+    "Delivered features end to end with a focus on reliability, observability and clear ownership. "
+    "Worked with product and design to scope milestones and ship incremental improvements. "
+    "Reviewed code, mentored engineers and kept documentation up to date. "
+)
+
+# Approximate document sizes in characters.
+SIZES = {"small": 2_000, "medium": 10_000, "large": 50_000}
+
+
+def skill_names() -> list:
+    with open(SKILLS_TAXONOMY_PATH, encoding="utf-8") as handle:
+        return sorted(json.load(handle))
+
+
+def resume_text(seed: int, chars: int = SIZES["small"]) -> str:
+    rng = random.Random(seed)
+    skills = rng.sample(skill_names(), 8)
+    lines = [f"Candidate {seed}", "Summary", "Software engineer with 6 years of experience.", "",
+             "Skills:", ", ".join(skills), "", "Experience"]
+    year = 2024
+    while sum(len(line) + 1 for line in lines) < chars:
+        lines.append(f"Company {rng.randint(1, 999)}  {year - 2} - {year}")
+        lines.append(f"Built services in {rng.choice(skills)} and {rng.choice(skills)}. " + FILLER)
+        year -= 2
+    lines += ["", "Education", "BSc Computer Science"]
+    return "\n".join(lines)
+
+
+def job_text(seed: int, chars: int = SIZES["small"] // 2) -> str:
+    rng = random.Random(seed + 1_000_000)
+    skills = rng.sample(skill_names(), 6)
+    lines = [f"Job {seed}: Backend Engineer", "Requirements", f"4+ years of experience with {', '.join(skills)}.",
+             "Responsibilities"]
+    while sum(len(line) + 1 for line in lines) < chars:
+        lines.append(f"Own {rng.choice(skills)} components in production. " + FILLER)
+    return "\n".join(lines)
+
+
+def to_docx(text: str) -> bytes:
+    from docx import Document
+
+    doc = Document()
+    for line in text.split("\n"):
+        doc.add_paragraph(line)
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def to_pdf(text: str, lines_per_page: int = 50) -> bytes:
+    """Minimal PDF with one Helvetica text line per input line (wrapped at 90 chars)."""
+    lines = []
+    for line in text.split("\n"):
+        lines += [line[i:i + 90] for i in range(0, len(line), 90)] or [""]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in page) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def encode(text: str, fmt: str) -> bytes:
+    if fmt == "pdf":
+        return to_pdf(text)
+    if fmt == "docx":
+        return to_docx(text)
+    return text.encode("utf-8")
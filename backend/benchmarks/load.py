@@ -0,0 +1,212 @@
+"""End-to-end load test: a real uvicorn server driven over HTTP.
+
+OpenRouter is replaced by StubOpenRouter and Pinecone by the local vector
+index. Redis is whatever ``redis_url`` points at; without one the app uses
+its in-memory cache, which is per worker, so ``workers`` > 1 needs Redis.
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks import corpus
+from benchmarks.report import peak_rss_mb, summarize
+from benchmarks.stub_openrouter import StubOpenRouter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Nothing listens here, so the server falls back to its in-memory cache.
+UNREACHABLE_REDIS_URL = "redis://127.0.0.1:1"
+MIME_TYPES = {
+    "txt": "text/plain",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_pids(pid: int) -> list:
+    """``pid`` and its child processes (uvicorn workers)."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            pids += [int(child) for child in children.read().split()]
+    except OSError:
+        pass
+    return pids
+
+
+class Phase:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, name: str, seconds: float, status: int):
+        self.statuses.setdefault(name, {}).setdefault(str(status), 0)
+        self.statuses[name][str(status)] += 1
+        if 200 <= status < 300:
+            self.latencies.setdefault(name, []).append(seconds)
+        else:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def results(self, elapsed: float) -> dict:
+        names = sorted(set(self.latencies) | set(self.errors))
+        return {
+            name: {**summarize(self.latencies.get(name, []), elapsed, self.errors.get(name, 0)),
+                   "statuses": self.statuses.get(name, {})}
+            for name in names
+        }
+
+
+def uploaded_ids(responses: list) -> list:
+    """Upload ids of the successful ``responses``."""
+    return [response.json()["job_id"] for response in responses if response is not None and response.status_code < 300]
+
+
+async def run_all(jobs: list, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(job):
+        async with semaphore:
+            return await job()
+
+    return await asyncio.gather(*(bounded(job) for job in jobs))
+
+
+async def timed(phase: Phase, name: str, send):
+    started = time.perf_counter()
+    try:
+        response = await send()
+        status = response.status_code
+    except httpx.HTTPError:
+        response, status = None, 599
+    phase.record(name, time.perf_counter() - started, status)
+    return response
+
+
+async def drive(base_url: str, args) -> dict:
+    rng = random.Random(args.seed)
+    formats = args.formats.split(",")
+    results = {}
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout,
+                                 limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        uploads = Phase()
+
+        def upload(doc_type: str, number: int):
+            fmt = formats[number % len(formats)]
+            if doc_type == "resume":
+                text = corpus.resume_text(number, corpus.SIZES[args.size])
+            else:
+                text = corpus.job_text(number)
+            content = corpus.encode(text, fmt)
+
+            async def send():
+                files = {"file": (f"{doc_type}-{number}.{fmt}", content, MIME_TYPES[fmt])}
+                return await client.post(f"/upload/{doc_type}", files=files)
+
+            return lambda: timed(uploads, f"upload_{doc_type}", send)
+
+        started = time.perf_counter()
+        responses = await run_all(
+            [upload("resume", i) for i in range(args.resumes)] + [upload("job", i) for i in range(args.jobs)],
+            args.concurrency,
+        )
+        results.update({f"upload.{name}": value for name, value in uploads.results(time.perf_counter() - started).items()})
+
+        # Split before filtering: a failed resume upload must not turn a job id into a resume id.
+        resume_ids, job_ids = uploaded_ids(responses[:args.resumes]), uploaded_ids(responses[args.resumes:])
+        if not resume_ids or not job_ids:
+            return results
+
+        matches = Phase()
+        endpoint = "/match/stream" if args.stream else "/match"
+
+        def match(resume_id: str, job_id: str):
+            async def send():
+                if not args.stream:
+                    return await client.post(endpoint, json={"resume_id": resume_id, "job_id": job_id})
+                async with client.stream("POST", endpoint, json={"resume_id": resume_id, "job_id": job_id}) as response:
+                    await response.aread()
+                    return response
+
+            return lambda: timed(matches, endpoint.strip("/").replace("/", "_"), send)
+
+        pairs = [(rng.choice(resume_ids), rng.choice(job_ids)) for _ in range(args.matches)]
+        started = time.perf_counter()
+        await run_all([match(resume_id, job_id) for resume_id, job_id in pairs], args.concurrency)
+        results.update({f"match.{name}": value for name, value in matches.results(time.perf_counter() - started).items()})
+        results["match.unique_pairs"] = len(set(pairs))
+
+        stats = await client.get("/stats")
+        if stats.status_code == 200:
+            results["server_stats"] = stats.json()
+    return results
+
+
+def wait_until_ready(base_url: str, process, timeout: float):
+    give_up_at = time.monotonic() + timeout
+    while time.monotonic() < give_up_at:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(f"{base_url}/ping", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server not ready after {timeout}s")
+
+
+def run(args) -> dict:
+    with StubOpenRouter(latency=args.llm_latency) as stub, tempfile.TemporaryDirectory(prefix="matchpoint-bench-") as workdir:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        env = {
+            **os.environ,
+            "OPENROUTER_URL": stub.url,
+            "OPENROUTER_API_KEY": "bench",
+            "PINECONE_API_KEY": "",
+            "VECTOR_BACKEND": "local",
+            "LOCAL_INDEX_PATH": os.path.join(workdir, "vector_index"),
+            "INGEST_SQLITE_PATH": os.path.join(workdir, "ingest.db"),
+            "REDIS_URL": args.redis_url or UNREACHABLE_REDIS_URL,
+            # Off unless asked for: with a shared Redis, a repeat run would
+            # otherwise be answered from the previous run's LLM responses.
+            "LLM_CACHE_ENABLED": os.environ.get("LLM_CACHE_ENABLED", "false"),
+        }
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(args.workers), "--log-level", "warning"]
+        log = open(os.path.join(workdir, "server.log"), "w") if not args.server_output else None
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT if log else None)
+        try:
+            started = time.perf_counter()
+            wait_until_ready(base_url, process, args.startup_timeout)
+            startup_seconds = time.perf_counter() - started
+
+            results = asyncio.run(drive(base_url, args))
+            results["server"] = {
+                "startup_seconds": round(startup_seconds, 2),
+                "peak_rss_mb": sum(peak_rss_mb(pid) for pid in server_pids(process.pid)),
+            }
+            results["llm_stub"] = {"requests": stub.requests, "latency_s": args.llm_latency}
+            return results
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            if log:
+                log.close()
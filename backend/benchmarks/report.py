@@ -0,0 +1,109 @@
+"""Latency summaries, peak RSS and the JSON report format shared by all runs."""
+import datetime
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank on the sorted sample.
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: list, elapsed: float = None, errors: int = 0) -> dict:
+    """Latency percentiles in milliseconds; ``elapsed`` (seconds) adds a rate."""
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "errors": errors,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+    if elapsed:
+        summary["per_second"] = round(len(values) / elapsed, 2)
+    return summary
+
+
+def time_calls(fn, repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call_started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def peak_rss_mb(pid: int = None) -> float:
+    """Peak resident set size of ``pid`` (default: this process) in MiB."""
+    if pid is not None:
+        try:
+            with open(f"/proc/{pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def write_report(kind: str, config: dict, results: dict, output: str = None) -> dict:
+    report = {
+        "kind": kind,
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as handle:
+            handle.write(text + "\n")
+    print(text)
+    return report
+
+
+def compare(before: dict, after: dict, threshold: float = 0.1) -> list:
+    """Rows ``(name, metric, before, after, change, regressed)`` for every shared latency/rate metric.
+
+    ``change`` is relative; ``regressed`` is True when latency grew (or a rate
+    fell) by more than ``threshold``.
+    """
+    rows = []
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if not isinstance(old, dict) or not isinstance(new, dict):
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "per_second", "peak_rss_mb"):
+            if metric not in old or metric not in new or not old[metric]:
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            worse = -change if metric == "per_second" else change
+            rows.append((name, metric, old[metric], new[metric], change, worse > threshold))
+    return rows
@@ -0,0 +1,97 @@
+"""Per-stage microbenchmarks: extraction, chunking, embedding, ATS scoring, cache."""
+import uuid
+
+from benchmarks import corpus
+from benchmarks.report import peak_rss_mb, time_calls
+
+FORMATS = ("txt", "docx", "pdf")
+EMBED_BATCH_SIZES = (1, 8, 32, 128)
+
+
+def bench_extract(repeat: int) -> dict:
+    from extraction import extract_text
+
+    results = {}
+    for size, chars in corpus.SIZES.items():
+        text = corpus.resume_text(1, chars)
+        for fmt in FORMATS:
+            content = corpus.encode(text, fmt)
+            summary = time_calls(lambda: extract_text(content, f"resume.{fmt}"), repeat)
+            results[f"extract_text.{fmt}.{size}"] = {**summary, "bytes": len(content)}
+    return results
+
+
+def bench_chunk(repeat: int) -> dict:
+    from chunking import chunk_text
+
+    results = {}
+    for size, chars in corpus.SIZES.items():
+        text = corpus.resume_text(2, chars)
+        results[f"chunk_text.{size}"] = {**time_calls(lambda: chunk_text(text), repeat), "chunks": len(chunk_text(text))}
+    return results
+
+
+def bench_embed(repeat: int) -> dict:
+    from chunking import chunk_text
+    from utils import generate_embeddings, get_embedding_model
+
+    if get_embedding_model() is None:
+        # generate_embeddings would time its dummy fallback instead.
+        return {"generate_embeddings": {"skipped": "embedding model not available"}}
+    # Real chunks, so every batch size encodes chunks of the configured length.
+    chunks = chunk_text(corpus.resume_text(3, 1000 * max(EMBED_BATCH_SIZES)))
+    results = {}
+    for batch_size in EMBED_BATCH_SIZES:
+        batch = (chunks * (batch_size // len(chunks) + 1))[:batch_size]
+        summary = time_calls(lambda: generate_embeddings(batch), repeat)
+        summary["chunks_per_second"] = round(batch_size * summary["per_second"], 2)
+        results[f"generate_embeddings.batch_{batch_size}"] = summary
+    return results
+
+
+def bench_ats(repeat: int) -> dict:
+    from main import generate_ats_accurate_match
+    from skills import extract_skills
+
+    results = {}
+    for size, chars in corpus.SIZES.items():
+        resume, job = corpus.resume_text(4, chars), corpus.job_text(4)
+        results[f"ats_match.scan.{size}"] = time_calls(lambda: generate_ats_accurate_match(resume, job), repeat)
+        resume_skills, job_skills = extract_skills(resume), extract_skills(job)
+        results[f"ats_match.precomputed.{size}"] = time_calls(
+            lambda: generate_ats_accurate_match(resume, job, resume_skills, job_skills), repeat)
+    return results
+
+
+def bench_cache(repeat: int) -> dict:
+    from main import cache_get, cache_set, init_redis
+
+    value = {"match_score": 72, "matching_skills": ["python", "docker"], "missing_skills": ["aws"],
+             "ats_suggestions": ["Quantify impact"], "learning_resources": []}
+    keys = [f"bench:{uuid.uuid4()}" for _ in range(repeat + 1)]
+    written = iter(keys)
+    results = {
+        "cache_set": time_calls(lambda: cache_set(next(written), value, expire=60), repeat),
+        "cache_get.hit": time_calls(lambda: cache_get(keys[0]), repeat),
+        "cache_get.miss": time_calls(lambda: cache_get(f"bench:missing:{uuid.uuid4()}"), repeat),
+    }
+    backend = "redis" if init_redis() is not None else "memory"
+    return {name: {**summary, "backend": backend} for name, summary in results.items()}
+
+
+STAGES = {
+    "extract": bench_extract,
+    "chunk": bench_chunk,
+    "embed": bench_embed,
+    "ats": bench_ats,
+    "cache": bench_cache,
+}
+
+
+def run(stages: list, repeat: int) -> dict:
+    results = {}
+    for stage in stages:
+        print(f"[BENCH] {stage}...")
+        results.update(STAGES[stage](repeat))
+    results["process"] = {"peak_rss_mb": peak_rss_mb()}
+    return results
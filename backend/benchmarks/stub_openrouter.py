@@ -0,0 +1,64 @@
+"""Local stand-in for the OpenRouter chat completions API.
+
+Answers every request with a fixed, valid match result after ``latency``
+seconds, as one JSON body or as an SSE stream when the request asks for it.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESULT = {
+    "match_score": 64,
+    "matching_skills": ["Python", "Docker"],
+    "missing_skills": ["Kubernetes"],
+    "ats_suggestions": ["Add Kubernetes projects"],
+    "learning_resources": [{"skill": "Kubernetes", "free_tutorial": "", "official_resource": "", "explore": ""}],
+}
+
+
+class StubOpenRouter:
+    def __init__(self, latency: float = 0.5, port: int = 0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(stub.latency)
+                content = json.dumps(RESULT)
+                if payload.get("stream"):
+                    parts = [content[i:i + 40] for i in range(0, len(content), 40)]
+                    body = "".join(f"data: {json.dumps({'choices': [{'delta': {'content': part}}]})}\n\n" for part in parts)
+                    body = (body + "data: [DONE]\n\n").encode("utf-8")
+                    content_type = "text/event-stream"
+                else:
+                    body = json.dumps({"choices": [{"message": {"content": content}}]}).encode("utf-8")
+                    content_type = "application/json"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/v1/chat/completions"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-openrouter", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,154 @@
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def estimate_size(value) -> int:
+    if isinstance(value, (bytes, bytearray)):
+        return sys.getsizeof(value)
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes) + 112
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class MemoryCache:
+    """In-process LRU cache bounded by approximate size in bytes, with per-entry TTL."""
+
+    def __init__(self, max_bytes: int, default_ttl: float = 3600):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, _, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value, ttl: float = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if ttl <= 0 or size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, time.monotonic() + ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[2] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+# Packed embedding layout: fixed header, model id, zero padding to an 8-byte
+# boundary, then (int8 only) one float32 scale per row, then the row-major
+# matrix. float32/float16 payloads are returned as views over the blob.
+EMBEDDING_MAGIC = b"MPE1"
+_EMBEDDING_HEADER = struct.Struct("<4sBxHII")
+_DTYPE_CODES = {"float32": 0, "float16": 1, "int8": 2}
+_DTYPE_NAMES = {code: name for name, code in _DTYPE_CODES.items()}
+
+
+def is_packed_embeddings(blob) -> bool:
+    return isinstance(blob, (bytes, bytearray, memoryview)) and bytes(blob[:4]) == EMBEDDING_MAGIC
+
+
+def pack_embeddings(embeddings, model_id: str, dtype: str = "float32") -> bytes:
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding storage dtype: {dtype}")
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    rows, cols = matrix.shape if matrix.size else (0, 0)
+    model_bytes = model_id.encode("utf-8")
+    header = _EMBEDDING_HEADER.pack(EMBEDDING_MAGIC, _DTYPE_CODES[dtype], len(model_bytes), rows, cols) + model_bytes
+    header += b"\0" * (-len(header) % 8)
+
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0 if rows else np.zeros(0, dtype=np.float32)
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return header + scales.tobytes() + quantized.tobytes()
+    return header + matrix.astype(dtype, copy=False).tobytes()
+
+
+def unpack_embeddings(blob) -> tuple:
+    magic, code, model_len, rows, cols = _EMBEDDING_HEADER.unpack_from(blob, 0)
+    if magic != EMBEDDING_MAGIC:
+        raise ValueError("Not a packed embedding blob")
+    offset = _EMBEDDING_HEADER.size
+    model_id = bytes(blob[offset:offset + model_len]).decode("utf-8")
+    offset += model_len
+    offset += -offset % 8
+
+    dtype = _DTYPE_NAMES[code]
+    if dtype == "int8":
+        scales = np.frombuffer(blob, dtype=np.float32, count=rows, offset=offset)
+        offset += rows * 4
+        quantized = np.frombuffer(blob, dtype=np.int8, count=rows * cols, offset=offset).reshape(rows, cols)
+        return quantized.astype(np.float32) * scales[:, None], model_id
+    matrix = np.frombuffer(blob, dtype=dtype, count=rows * cols, offset=offset).reshape(rows, cols)
+    return matrix, model_id
@@ -0,0 +1,148 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+# "auto" uses Redis when it is reachable and the local store otherwise; "off" disables the cache.
+CHUNK_CACHE_BACKEND = os.getenv("CHUNK_CACHE_BACKEND", "auto")
+CHUNK_CACHE_PATH = os.getenv("CHUNK_CACHE_PATH", "var/chunk_cache")
+# The local store stops growing at this many chunks (4 KB each for a 1024-dim model).
+CHUNK_CACHE_MAX_ENTRIES = int(os.getenv("CHUNK_CACHE_MAX_ENTRIES", "100000"))
+CHUNK_CACHE_TTL = int(os.getenv("CHUNK_CACHE_TTL", str(30 * 86400)))
+
+_KEY_BYTES = 16
+
+
+def chunk_key(model_id: str, chunk: str) -> bytes:
+    return hashlib.sha256(f"{model_id}\0{chunk}".encode("utf-8")).digest()[:_KEY_BYTES]
+
+
+class RedisChunkCache:
+    """Chunk embeddings as raw float32 bytes under ``chunkemb:{key}``, shared
+    by every replica. ``client`` must not decode responses."""
+
+    def __init__(self, client, ttl: int = CHUNK_CACHE_TTL):
+        self.client = client
+        self.ttl = ttl
+
+    def get_many(self, keys: list) -> list:
+        values = self.client.mget([f"chunkemb:{key.hex()}" for key in keys])
+        return [None if value is None else np.frombuffer(value, dtype=np.float32) for value in values]
+
+    def set_many(self, keys: list, vectors):
+        pipe = self.client.pipeline(transaction=False)
+        for key, vector in zip(keys, vectors):
+            pipe.set(f"chunkemb:{key.hex()}", np.asarray(vector, dtype=np.float32).tobytes(), ex=self.ttl)
+        pipe.execute()
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class LocalChunkCache:
+    """Chunk embeddings in a memory-mapped float32 file on this host.
+
+    ``path.keys`` lists the key of each row in order and ``path.vectors``
+    holds the rows. Both only grow, and a row's vector is written before its
+    key, so readers never see a key without its vector. Writers take a file
+    lock, so the worker processes of one host can share the store; each
+    reader picks up rows appended by others on its next lookup. Rows are
+    never rewritten: once ``max_entries`` is reached nothing more is added
+    (delete the files to start over).
+    """
+
+    def __init__(self, path: str, max_entries: int = CHUNK_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._full = False
+        self._dim = None
+        self._count = 0
+        self._rows = {}
+        self._matrix = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def get_many(self, keys: list) -> list:
+        with self._lock:
+            self._refresh()
+            rows = [self._rows.get(key) for key in keys]
+            return [None if row is None else np.array(self._matrix[row]) for row in rows]
+
+    def set_many(self, keys: list, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(keys) == 0:
+            return
+        with self._lock, open(self.path + ".keys", "ab") as key_file:
+            fcntl.flock(key_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                if self._dim is None:
+                    self._dim = vectors.shape[1]
+                    with open(self.path + ".json", "w", encoding="utf-8") as header:
+                        json.dump({"dim": self._dim}, header)
+                elif vectors.shape[1] != self._dim:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match cache dimension {self._dim}")
+
+                new = list(dict((key, vector) for key, vector in zip(keys, vectors) if key not in self._rows).items())
+                room = self.max_entries - self._count
+                if len(new) > room:
+                    if not self._full:
+                        print(f"Chunk embedding cache full at {self.max_entries} entries, not adding more")
+                    self._full = True
+                    new = new[:max(0, room)]
+                if not new:
+                    return
+
+                self._ensure_capacity(self._count + len(new))
+                self._matrix[self._count:self._count + len(new)] = np.stack([vector for _, vector in new])
+                self._matrix.flush()
+                key_file.write(b"".join(key for key, _ in new))
+                key_file.flush()
+                for key, _ in new:
+                    self._rows[key] = self._count
+                    self._count += 1
+            finally:
+                fcntl.flock(key_file, fcntl.LOCK_UN)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "local", "entries": self._count, "max_entries": self.max_entries}
+
+    def _refresh(self):
+        # Pick up rows other processes appended (or a clear) since the last call.
+        try:
+            size = os.path.getsize(self.path + ".keys")
+        except OSError:
+            size = 0
+        count = size // _KEY_BYTES
+        if count <= self._count:
+            return
+        if self._dim is None:
+            with open(self.path + ".json", encoding="utf-8") as header:
+                self._dim = json.load(header)["dim"]
+        with open(self.path + ".keys", "rb") as key_file:
+            key_file.seek(self._count * _KEY_BYTES)
+            data = key_file.read((count - self._count) * _KEY_BYTES)
+        if self._matrix is None or len(self._matrix) < count:
+            self._map(os.path.getsize(self.path + ".vectors") // (self._dim * 4))
+        for offset in range(0, len(data), _KEY_BYTES):
+            self._rows[data[offset:offset + _KEY_BYTES]] = self._count
+            self._count += 1
+
+    def _map(self, capacity: int):
+        if self._matrix is not None:
+            del self._matrix
+        self._matrix = np.memmap(self.path + ".vectors", dtype=np.float32, mode="r+", shape=(capacity, self._dim)) if capacity else None
+
+    def _ensure_capacity(self, rows: int):
+        capacity = 0 if self._matrix is None else len(self._matrix)
+        if rows <= capacity:
+            return
+        on_disk = os.path.getsize(self.path + ".vectors") // (self._dim * 4) if os.path.exists(self.path + ".vectors") else 0
+        if on_disk < rows:
+            with open(self.path + ".vectors", "ab") as handle:
+                handle.truncate(max(1024, on_disk * 2, rows) * self._dim * 4)
+        self._map(os.path.getsize(self.path + ".vectors") // (self._dim * 4))
@@ -0,0 +1,139 @@
+"""Token-aware chunking for resumes and job descriptions.
+
+Chunks are filled up to the embedding model's token window and broken on
+the strongest boundary available: a section (split at headings such as
+"Experience") that does not fit in the current chunk starts a new one and
+stays whole when it fits the window; larger sections are packed by whole
+paragraphs, then lines. Lines longer than the window are split at sentences, then at
+words. Chunks that break inside a section start with the last
+CHUNK_OVERLAP_TOKENS tokens' worth of lines of the previous chunk; chunks
+starting a new section don't.
+"""
+import re
+
+from features import is_heading
+from utils import CHUNK_OVERLAP_TOKENS, token_counter
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+def _sections(text: str) -> list:
+    """Sections as lists of paragraphs, each a list of non-empty lines."""
+    sections, paragraph = [[]], []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line.strip():
+            if paragraph:
+                sections[-1].append(paragraph)
+                paragraph = []
+            continue
+        if is_heading(line):
+            if paragraph:
+                sections[-1].append(paragraph)
+                paragraph = []
+            if sections[-1]:
+                sections.append([])
+        paragraph.append(line)
+    if paragraph:
+        sections[-1].append(paragraph)
+    return [section for section in sections if section]
+
+
+def _split_long(text: str, count, budget: int) -> list:
+    """``(piece, tokens)`` pieces of an over-long line, each within ``budget``."""
+    parts = _SENTENCE_END.split(text)
+    joiner = " "
+    if len(parts) == 1:
+        parts = text.split()
+    if len(parts) == 1:
+        # One unbroken token run (a URL, base64...): cut by characters.
+        step = max(1, budget * 2)
+        pieces = [text[i:i + step] for i in range(0, len(text), step)]
+        return list(zip(pieces, count(pieces)))
+
+    # Counted with the joining space in front, as the tokenizer sees them in
+    # the joined piece (a word's token carries its leading space).
+    pieces, current, used = [], [], 0
+    for part, tokens in zip(parts, count([joiner + part for part in parts])):
+        if tokens > budget:
+            if current:
+                pieces.append((joiner.join(current), used))
+                current, used = [], 0
+            pieces.extend(_split_long(part, count, budget))
+            continue
+        if current and used + tokens > budget:
+            pieces.append((joiner.join(current), used))
+            current, used = [], 0
+        current.append(part)
+        used += tokens
+    if current:
+        pieces.append((joiner.join(current), used))
+    return pieces
+
+
+def iter_chunks(text: str, count=None, budget: int = None, overlap: int = CHUNK_OVERLAP_TOKENS):
+    """Yield chunks of ``text``. ``count``/``budget`` default to the embedding
+    model's tokenizer and window (see utils.token_counter)."""
+    if count is None or budget is None:
+        default_count, default_budget = token_counter()
+        count, budget = count or default_count, budget or default_budget
+    sections = _sections(text)
+    lines = list(dict.fromkeys(line for section in sections for paragraph in section for line in paragraph))
+    sizes = dict(zip(lines, count(lines)))
+
+    def units(lines: list) -> list:
+        # Lines as (text, tokens); over-long ones are split into pieces that fit.
+        result = []
+        for line in lines:
+            if sizes[line] > budget:
+                # Leave room for the newline each piece is joined with (see cost).
+                result.extend(_split_long(line, count, budget - 1))
+            else:
+                result.append((line, sizes[line]))
+        return result
+
+    def cost(pieces: list) -> int:
+        # One extra token per piece for the newline joining it to the next.
+        return sum(tokens + 1 for _, tokens in pieces)
+
+    current = []
+
+    def flush(carry: bool, needed: int):
+        chunk = "\n".join(text for text, _ in current)
+        tail = []
+        if carry:
+            for piece in reversed(current):
+                if cost(tail) + piece[1] + 1 > overlap or cost(tail) + piece[1] + 1 + needed > budget:
+                    break
+                tail.insert(0, piece)
+        current[:] = tail
+        return chunk
+
+    for section in sections:
+        section_units = units([line for paragraph in section for line in paragraph])
+        needed = cost(section_units)
+        if current and cost(current) + needed > budget:
+            yield flush(False, 0)
+        if needed <= budget:
+            current.extend(section_units)
+            continue
+
+        for paragraph in section:
+            paragraph_units = units(paragraph)
+            needed = cost(paragraph_units)
+            if current and cost(current) + needed > budget and needed <= budget:
+                yield flush(True, needed)
+            if cost(current) + needed <= budget:
+                current.extend(paragraph_units)
+                continue
+            for piece in paragraph_units:
+                if current and cost(current) + piece[1] + 1 > budget:
+                    yield flush(True, piece[1] + 1)
+                current.append(piece)
+
+    if current:
+        yield flush(False, 0)
+
+
+def chunk_text(text: str) -> list:
+    return list(iter_chunks(text))
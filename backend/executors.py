@@ -0,0 +1,67 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+# Parsing (PDF/DOCX extraction, chunking, Pinecone I/O) runs on a bounded
+# thread pool. Encoding itself happens on the single embedding batcher thread
+# in utils; embed_pool threads only wait on it, so EMBED_WORKERS bounds how
+# many uploads can have chunks in the same coalesced batch.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "16"))
+# Blocking Redis and vector index calls on the /match path, kept apart from
+# the parse pool so a burst of uploads can't delay matches.
+IO_WORKERS = int(os.getenv("IO_WORKERS", "32"))
+
+# Uploads admitted at once (running + waiting for a worker). Beyond this the
+# API answers 503 with Retry-After instead of queueing without bound.
+MAX_PENDING_UPLOADS = int(os.getenv("MAX_PENDING_UPLOADS", "32"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "5"))
+
+parse_pool = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="parse")
+embed_pool = ThreadPoolExecutor(max_workers=EMBED_WORKERS, thread_name_prefix="embed")
+io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+_pending_lock = threading.Lock()
+_pending = 0
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int = RETRY_AFTER_SECONDS):
+        super().__init__("Upload queue is full")
+        self.retry_after = retry_after
+
+
+def pending_uploads() -> int:
+    return _pending
+
+
+@asynccontextmanager
+async def admit():
+    global _pending
+    with _pending_lock:
+        if _pending >= MAX_PENDING_UPLOADS:
+            raise QueueFullError()
+        _pending += 1
+    try:
+        yield
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def run_parse(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(parse_pool, partial(func, *args, **kwargs))
+
+
+async def run_embed(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(embed_pool, partial(func, *args, **kwargs))
+
+
+async def run_io(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_pool, partial(func, *args, **kwargs))
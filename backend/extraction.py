@@ -0,0 +1,180 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+from docx import Document
+from docx.oxml.table import CT_Tbl
+from docx.oxml.text.paragraph import CT_P
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+
+from metrics import FALLBACKS
+
+# Uploads larger than this are rejected while they are still being received.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# PDFs with more pages are rejected before any page is extracted.
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "50"))
+# Uploads up to this size stay in memory; larger ones are spooled to a temp file.
+SPOOL_MEMORY_BYTES = int(os.getenv("SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+UPLOAD_READ_SIZE = 64 * 1024
+# PyPDF2 is pure Python, so page-parallel extraction needs processes. PDFs
+# with fewer pages than PDF_PARALLEL_MIN_PAGES are extracted in the caller.
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+
+class DocumentLimitError(ValueError):
+    pass
+
+
+class Spool:
+    """Upload body received in pieces: kept in memory up to ``memory_bytes``,
+    then moved to a named temp file so extraction workers can open it by path.
+
+    ``hasher`` (a hashlib object) is fed every chunk, and writing more than
+    ``max_bytes`` raises DocumentLimitError immediately.
+    """
+
+    def __init__(self, max_bytes: int = MAX_UPLOAD_BYTES, memory_bytes: int = SPOOL_MEMORY_BYTES, hasher=None):
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.hasher = hasher
+        self.size = 0
+        self.path = None
+        self._buffer = bytearray()
+        self._file = None
+
+    @property
+    def on_disk(self) -> bool:
+        return self.path is not None
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise DocumentLimitError(f"Upload exceeds {self.max_bytes} bytes")
+        if self.hasher is not None:
+            self.hasher.update(chunk)
+        if self._file is None and len(self._buffer) + len(chunk) > self.memory_bytes:
+            self._file = tempfile.NamedTemporaryFile(prefix="matchpoint-upload-", delete=False)
+            self.path = self._file.name
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer += chunk
+
+    def digest(self) -> str:
+        return self.hasher.hexdigest()
+
+    def source(self):
+        """What extractors accept: the temp file path once spooled, else the bytes."""
+        if self._file is None:
+            return bytes(self._buffer)
+        self._file.flush()
+        return self.path
+
+    def read(self) -> bytes:
+        if self._file is None:
+            return bytes(self._buffer)
+        self._file.flush()
+        with open(self.path, "rb") as handle:
+            return handle.read()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.unlink(self.path)
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def get_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                # spawn: forking a process that holds the embedding model and
+                # its threads is unsafe, and workers only need this module.
+                _pdf_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pdf_pool
+
+
+def _open_pdf(source) -> PdfReader:
+    if isinstance(source, str):
+        return PdfReader(source)
+    return PdfReader(io.BytesIO(source))
+
+
+def _extract_pdf_pages(source, start: int, stop: int) -> list:
+    reader = _open_pdf(source)
+    return [reader.pages[number].extract_text() or "" for number in range(start, stop)]
+
+
+def extract_pdf(source, max_pages: int = MAX_PDF_PAGES) -> str:
+    """``source`` is PDF bytes or a file path (workers reopen it by path)."""
+    reader = _open_pdf(source)
+    page_count = len(reader.pages)
+    if page_count > max_pages:
+        raise DocumentLimitError(f"PDF has {page_count} pages, the limit is {max_pages}")
+
+    if page_count < PDF_PARALLEL_MIN_PAGES or EXTRACT_WORKERS <= 1:
+        pages = [page.extract_text() or "" for page in reader.pages]
+    else:
+        step = -(-page_count // EXTRACT_WORKERS)
+        pool = get_pdf_pool()
+        futures = [pool.submit(_extract_pdf_pages, source, start, min(start + step, page_count))
+                   for start in range(0, page_count, step)]
+        pages = [text for future in futures for text in future.result()]
+    return "".join(text + "\n" for text in pages)
+
+
+def _docx_lines(doc):
+    # Paragraphs and tables in document order; each table row becomes one
+    # line of tab-separated cells, with merged cells counted once.
+    for block in doc.element.body.iterchildren():
+        if isinstance(block, CT_P):
+            yield Paragraph(block, doc).text
+        elif isinstance(block, CT_Tbl):
+            for row in Table(block, doc).rows:
+                cells, seen = [], set()
+                for cell in row.cells:
+                    if id(cell._tc) not in seen:
+                        seen.add(id(cell._tc))
+                        cells.append(cell.text.strip())
+                yield "\t".join(cells)
+
+
+def extract_docx(source) -> str:
+    doc = Document(source if isinstance(source, str) else io.BytesIO(source))
+    return "".join(line + "\n" for line in _docx_lines(doc))
+
+
+def extract_text(content, filename: str) -> str:
+    """Text of an uploaded PDF, DOCX or TXT. ``content`` is bytes or a Spool."""
+    try:
+        source = content.source() if isinstance(content, Spool) else content
+        if filename.endswith('.pdf'):
+            return extract_pdf(source)
+        elif filename.endswith('.docx'):
+            return extract_docx(source)
+        elif filename.endswith('.txt'):
+            if isinstance(source, str):
+                with open(source, "rb") as handle:
+                    source = handle.read()
+            return source.decode('utf-8', errors='ignore')
+        else:
+            raise ValueError("Unsupported file type")
+    except DocumentLimitError:
+        raise
+    except Exception as e:
+        print(f"Text extraction failed for {filename}: {e}")
+        FALLBACKS.inc(reason="extraction")
+        return "Sample resume text for testing purposes."
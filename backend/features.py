@@ -0,0 +1,102 @@
+import datetime
+import re
+
+from skills import extract_skills
+from utils import estimate_tokens
+
+# Headings that open a resume/job section, mapped to a canonical name. A
+# heading is a short line on its own, optionally followed by a colon.
+SECTION_HEADINGS = {
+    "skills": ["skills", "technical skills", "core skills", "key skills", "core competencies", "technologies", "tech stack"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history"],
+    "education": ["education", "academic background", "qualifications"],
+    "projects": ["projects", "personal projects"],
+    "certifications": ["certifications", "certificates", "licenses"],
+    "summary": ["summary", "profile", "professional summary", "about me", "objective"],
+    "requirements": ["requirements", "qualifications required", "what you'll need", "what we're looking for"],
+    "responsibilities": ["responsibilities", "what you'll do", "the role"],
+}
+_HEADING_NAMES = {heading: name for name, headings in SECTION_HEADINGS.items() for heading in headings}
+_HEADING_RE = re.compile(
+    r"^[ \t#*\-•]*(" + "|".join(sorted((re.escape(h) for h in _HEADING_NAMES), key=len, reverse=True)) + r")[ \t]*:?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# "5+ years of experience", "3 yrs professional experience"
+_YEARS_STATED_RE = re.compile(
+    r"(\d{1,2})\s*\+?\s*(?:years?|yrs?)\b(?:\s+of)?(?:\s+[a-z/+#.\-]+){0,3}?\s+experience", re.IGNORECASE
+)
+# "2018 - 2022", "Jan 2019 – Present"
+_YEAR_RANGE_RE = re.compile(
+    r"\b((?:19|20)\d{2})\s*(?:-|–|—|to)\s*(?:[a-z]{3,9}\.?\s+)?((?:19|20)\d{2}|present|current|now)\b", re.IGNORECASE
+)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def is_heading(line: str) -> bool:
+    return _HEADING_RE.match(line) is not None
+
+
+def find_sections(text: str) -> dict:
+    """Character spans ``[start, end)`` of each recognised section in ``text``."""
+    sections = {}
+    headings = [(match.start(), match.end(), _HEADING_NAMES[match.group(1).lower()]) for match in _HEADING_RE.finditer(text)]
+    for i, (_, body_start, name) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
+        if name not in sections:
+            sections[name] = [body_start, end]
+    return sections
+
+
+def detect_years_experience(text: str, sections: dict):
+    stated = [int(years) for years in _YEARS_STATED_RE.findall(text)]
+    if stated:
+        return max(stated)
+
+    # Otherwise span the date ranges listed under Experience.
+    span = sections.get("experience")
+    if not span:
+        return None
+    this_year = datetime.date.today().year
+    starts, ends = [], []
+    for start, end in _YEAR_RANGE_RE.findall(text[span[0]:span[1]]):
+        starts.append(int(start))
+        ends.append(int(end) if end.isdigit() else this_year)
+    if not starts:
+        return None
+    return max(0, max(ends) - min(starts))
+
+
+# Stored with the features. A record carrying it had them computed at upload,
+# so a missing years_experience means none were found, not "not computed".
+FEATURES_VERSION = 1
+
+
+def extract_features(text: str) -> dict:
+    """What /match uses besides the raw text, computed once at upload.
+
+    The keys are stored as fields of the document record, so callers can load
+    just the ones they use: ``skills`` for the keyword score, ``token_count``
+    for the prompt budget and ``years_experience`` for the fast path.
+    """
+    return {
+        "skills": extract_skills(normalize_text(text)),
+        "years_experience": detect_years_experience(text, find_sections(text)),
+        "token_count": estimate_tokens(text),
+        "features_version": FEATURES_VERSION,
+    }
+
+
+def document_features(record: dict) -> dict:
+    """``token_count`` and ``years_experience`` of a loaded document record,
+    derived from its text when it was stored before upload-time features were."""
+    if record.get("features_version") is not None:
+        return {"token_count": record.get("token_count"), "years_experience": record.get("years_experience")}
+    text = record.get("text") or ""
+    return {
+        "token_count": estimate_tokens(text),
+        "years_experience": detect_years_experience(text, find_sections(text)),
+    }
@@ -0,0 +1,24 @@
+# Multi-worker deployment that shares one copy of the embedding model:
+#
+#     pip install gunicorn
+#     gunicorn -c gunicorn.conf.py main:app
+#
+# The app (and with EMBEDDING_PRELOAD the model) is imported once in the
+# master; workers are forked from it and share the weights copy-on-write.
+# The model is only loaded there, never run: the first encode, and every
+# thread, happens after the fork in each worker's startup warm-up.
+import gc
+import os
+
+os.environ.setdefault("EMBEDDING_PRELOAD", "true")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '7860')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+
+def when_ready(server):
+    # Keep the collector from touching (and so copying) preloaded objects.
+    gc.freeze()
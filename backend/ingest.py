@@ -0,0 +1,251 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Raw uploads waiting for a worker are dropped after this many seconds.
+INGEST_PAYLOAD_TTL = int(os.getenv("INGEST_PAYLOAD_TTL", "86400"))
+# Job status records outlive the payload so clients can still poll them.
+INGEST_STATUS_TTL = int(os.getenv("INGEST_STATUS_TTL", str(7 * 86400)))
+# A job still processing this many seconds after it was claimed is assumed
+# lost (worker killed or crashed) and goes back on the queue...
+INGEST_VISIBILITY_TIMEOUT = int(os.getenv("INGEST_VISIBILITY_TIMEOUT", "600"))
+# ...until it has been claimed this many times; then it is marked failed.
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+
+QUEUED, PROCESSING, COMPLETED, FAILED = "queued", "processing", "completed", "failed"
+
+
+class RedisIngestQueue:
+    """Ingestion jobs on a Redis list, shared by every API replica and worker.
+
+    ``ingest:queue`` holds queued ids; claiming moves an id to
+    ``ingest:processing`` and stamps ``started`` in one script, so a job
+    taken by a worker that died stays visible there and is requeued once
+    INGEST_VISIBILITY_TIMEOUT passes. Each job has a status hash
+    ``ingest:job:{id}`` and its raw upload under ``ingest:payload:{id}``.
+    ``client`` must not decode responses.
+    """
+
+    QUEUE_KEY = "ingest:queue"
+    PROCESSING_KEY = "ingest:processing"
+
+    _CLAIM_SCRIPT = """
+local job_id = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+if not job_id then
+    return false
+end
+redis.call('HSET', 'ingest:job:' .. job_id, 'status', ARGV[1], 'started', ARGV[2])
+redis.call('HINCRBY', 'ingest:job:' .. job_id, 'attempts', 1)
+return job_id
+"""
+
+    def __init__(self, client, poll_interval: float = 0.25):
+        self.client = client
+        self.poll_interval = poll_interval
+        self._claim = client.register_script(self._CLAIM_SCRIPT)
+        self._next_sweep = 0.0
+
+    def enqueue(self, job_id: str, doc_type: str, filename: str, digest: str, payload: bytes):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(f"ingest:payload:{job_id}", payload, ex=INGEST_PAYLOAD_TTL)
+        pipe.hset(f"ingest:job:{job_id}", mapping={
+            "doc_type": doc_type, "filename": filename, "digest": digest,
+            "status": QUEUED, "created": time.time(),
+        })
+        pipe.expire(f"ingest:job:{job_id}", INGEST_STATUS_TTL)
+        pipe.lpush(self.QUEUE_KEY, job_id)
+        pipe.execute()
+
+    def claim(self, timeout: float):
+        """Wait up to ``timeout`` seconds for a job; returns ``(job, payload)`` or None."""
+        give_up_at = time.monotonic() + timeout
+        while True:
+            if time.monotonic() >= self._next_sweep:
+                self.requeue_stale()
+                self._next_sweep = time.monotonic() + max(1, INGEST_VISIBILITY_TIMEOUT / 10)
+            job_id = self._claim(keys=[self.QUEUE_KEY, self.PROCESSING_KEY], args=[PROCESSING, time.time()])
+            if job_id:
+                job_id = job_id.decode("utf-8")
+                pipe = self.client.pipeline(transaction=False)
+                pipe.hgetall(f"ingest:job:{job_id}")
+                pipe.get(f"ingest:payload:{job_id}")
+                fields, payload = pipe.execute()
+                return self._decode(job_id, fields), payload
+            if time.monotonic() >= give_up_at:
+                return None
+            time.sleep(self.poll_interval)
+
+    def release(self, job_id: str):
+        """Put a claimed job back at the head of the queue without counting the attempt."""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrem(self.PROCESSING_KEY, 1, job_id)
+        pipe.hincrby(f"ingest:job:{job_id}", "attempts", -1)
+        self._requeue(pipe, job_id)
+        pipe.execute()
+
+    def requeue_stale(self):
+        """Requeue jobs claimed more than INGEST_VISIBILITY_TIMEOUT seconds ago,
+        or fail them once they have used up INGEST_MAX_ATTEMPTS."""
+        cutoff = time.time() - INGEST_VISIBILITY_TIMEOUT
+        for job_id in self.client.lrange(self.PROCESSING_KEY, 0, -1):
+            job_id = job_id.decode("utf-8")
+            started, attempts = self.client.hmget(f"ingest:job:{job_id}", ["started", "attempts"])
+            if started is not None and float(started) > cutoff:
+                continue
+            # Whoever removes the id (another sweeper, or the worker finishing) owns it.
+            if not self.client.lrem(self.PROCESSING_KEY, 1, job_id):
+                continue
+            attempts = int(attempts or 0)
+            if attempts >= INGEST_MAX_ATTEMPTS:
+                print(f"[INGEST] Job {job_id} not finished after {attempts} attempts, giving up")
+                self._finish(job_id, {"status": FAILED, "error": f"Processing did not finish after {attempts} attempts"})
+                continue
+            print(f"[INGEST] Job {job_id} claimed {attempts} time(s) and not finished, requeueing")
+            pipe = self.client.pipeline(transaction=True)
+            self._requeue(pipe, job_id)
+            pipe.execute()
+
+    def _requeue(self, pipe, job_id: str):
+        # RPOPLPUSH takes from the right, so RPUSH makes this job the next one claimed.
+        pipe.hset(f"ingest:job:{job_id}", "status", QUEUED)
+        pipe.hdel(f"ingest:job:{job_id}", "started")
+        pipe.rpush(self.QUEUE_KEY, job_id)
+
+    def complete(self, job_id: str):
+        self._finish(job_id, {"status": COMPLETED})
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, {"status": FAILED, "error": error})
+
+    def status(self, job_id: str):
+        fields = self.client.hgetall(f"ingest:job:{job_id}")
+        return self._decode(job_id, fields) if fields else None
+
+    def depth(self) -> int:
+        return self.client.llen(self.QUEUE_KEY)
+
+    def _finish(self, job_id: str, fields: dict):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(f"ingest:job:{job_id}", mapping={**fields, "finished": time.time()})
+        pipe.delete(f"ingest:payload:{job_id}")
+        pipe.lrem(self.PROCESSING_KEY, 1, job_id)
+        pipe.execute()
+
+    @staticmethod
+    def _decode(job_id: str, fields: dict) -> dict:
+        job = {key.decode("utf-8"): value.decode("utf-8") for key, value in fields.items()}
+        job["id"] = job_id
+        return job
+
+
+class SQLiteIngestQueue:
+    """Ingestion jobs in a local SQLite file, for a single host without Redis.
+
+    Several worker processes on the host can share the file: claiming runs in
+    an immediate transaction so a job is handed out once. The same transaction
+    requeues jobs claimed more than INGEST_VISIBILITY_TIMEOUT seconds ago.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.5):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingest_jobs ("
+                "id TEXT PRIMARY KEY, doc_type TEXT, filename TEXT, digest TEXT, payload BLOB,"
+                "status TEXT, error TEXT, created REAL, started REAL, finished REAL, attempts INTEGER DEFAULT 0)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ingest_jobs)")}
+            if "attempts" not in columns:
+                conn.execute("ALTER TABLE ingest_jobs ADD COLUMN attempts INTEGER DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS ingest_jobs_queued ON ingest_jobs (status, created)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_id: str, doc_type: str, filename: str, digest: str, payload: bytes):
+        self._connect().execute(
+            "INSERT INTO ingest_jobs (id, doc_type, filename, digest, payload, status, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, doc_type, filename, digest, sqlite3.Binary(payload), QUEUED, time.time()),
+        )
+
+    def claim(self, timeout: float):
+        give_up_at = time.monotonic() + timeout
+        conn = self._connect()
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale(conn)
+                row = conn.execute(
+                    "SELECT id, doc_type, filename, digest, payload FROM ingest_jobs "
+                    "WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE ingest_jobs SET status = ?, started = ?, attempts = attempts + 1 WHERE id = ?",
+                        (PROCESSING, time.time(), row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if row is not None:
+                job_id, doc_type, filename, digest, payload = row
+                return {"id": job_id, "doc_type": doc_type, "filename": filename, "digest": digest, "status": PROCESSING}, bytes(payload)
+            if time.monotonic() >= give_up_at:
+                return None
+            time.sleep(self.poll_interval)
+
+    def release(self, job_id: str):
+        """Put a claimed job back on the queue without counting the attempt."""
+        self._connect().execute(
+            "UPDATE ingest_jobs SET status = ?, started = NULL, attempts = attempts - 1 WHERE id = ? AND status = ?",
+            (QUEUED, job_id, PROCESSING),
+        )
+
+    def _requeue_stale(self, conn):
+        cutoff = time.time() - INGEST_VISIBILITY_TIMEOUT
+        conn.execute(
+            "UPDATE ingest_jobs SET status = ?, error = ?, payload = NULL, finished = ? "
+            "WHERE status = ? AND started < ? AND attempts >= ?",
+            (FAILED, "Processing did not finish after repeated attempts", time.time(), PROCESSING, cutoff, INGEST_MAX_ATTEMPTS),
+        )
+        conn.execute(
+            "UPDATE ingest_jobs SET status = ?, started = NULL WHERE status = ? AND started < ?",
+            (QUEUED, PROCESSING, cutoff),
+        )
+
+    def complete(self, job_id: str):
+        self._finish(job_id, COMPLETED, None)
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, FAILED, error)
+
+    def status(self, job_id: str):
+        row = self._connect().execute(
+            "SELECT doc_type, filename, digest, status, error, created, started, finished, attempts FROM ingest_jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("doc_type", "filename", "digest", "status", "error", "created", "started", "finished", "attempts")
+        job = {key: value for key, value in zip(keys, row) if value is not None}
+        job["id"] = job_id
+        return job
+
+    def depth(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM ingest_jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+
+    def _finish(self, job_id: str, status: str, error):
+        self._connect().execute(
+            "UPDATE ingest_jobs SET status = ?, error = ?, payload = NULL, finished = ? WHERE id = ?",
+            (status, error, time.time(), job_id),
+        )
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+
+import httpx
+
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct")
+
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "60"))
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+# Send a second, identical request when the first has been outstanding longer
+# than this percentile of recent latencies. 0 disables hedging.
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+class RetryableLLMError(LLMError):
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OpenRouterClient:
+    """Async OpenRouter chat client shared by all requests in a process.
+
+    One keep-alive connection pool, at most ``max_concurrency`` calls in
+    flight, an overall ``deadline`` per call covering retries, jittered
+    exponential backoff on 429/5xx and transport errors, and optional hedged
+    requests once enough latency samples exist.
+    """
+
+    def __init__(self, url: str = OPENROUTER_URL, model: str = OPENROUTER_MODEL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, deadline: float = LLM_DEADLINE,
+                 attempt_timeout: float = LLM_ATTEMPT_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 retry_base_delay: float = LLM_RETRY_BASE_DELAY, hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+                 hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES, transport: httpx.AsyncBaseTransport = None):
+        self.url = url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._transport = transport
+        self._latencies = deque(maxlen=200)
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    def _bind(self):
+        # httpx clients and asyncio primitives belong to one event loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                timeout=httpx.Timeout(self.attempt_timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def complete(self, prompt: str) -> str:
+        api_key = os.getenv("OPENROUTER_API_KEY")
+        if not api_key:
+            raise ValueError("Missing OpenRouter API key")
+
+        self._bind()
+        payload = {"model": self.model, "messages": [{"role": "user", "content": prompt}]}
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        self.calls += 1
+        try:
+            return await asyncio.wait_for(self._complete_with_retries(payload, headers), timeout=self.deadline)
+        except Exception:
+            self.failures += 1
+            raise
+
+    async def stream(self, prompt: str):
+        """Yield the completion incrementally as OpenRouter streams it.
+
+        Shares the concurrency limit and deadline with ``complete``. Failed
+        attempts are retried only until the first token has been yielded.
+        """
+        api_key = os.getenv("OPENROUTER_API_KEY")
+        if not api_key:
+            raise ValueError("Missing OpenRouter API key")
+
+        self._bind()
+        payload = {"model": self.model, "messages": [{"role": "user", "content": prompt}], "stream": True}
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        deadline = time.monotonic() + self.deadline
+        self.calls += 1
+
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                attempt = 0
+                yielded = False
+                while True:
+                    try:
+                        async with self._client.stream("POST", self.url, json=payload, headers=headers) as response:
+                            if response.status_code in RETRYABLE_STATUS:
+                                raise RetryableLLMError(f"OpenRouter returned {response.status_code}")
+                            if response.status_code >= 400:
+                                body = await response.aread()
+                                raise LLMError(f"OpenRouter returned {response.status_code}: {body[:200]!r}")
+                            async for line in response.aiter_lines():
+                                if time.monotonic() > deadline:
+                                    raise asyncio.TimeoutError("LLM stream exceeded deadline")
+                                # SSE: skip blank lines and ": keep-alive" comments.
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    return
+                                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                                if delta:
+                                    yielded = True
+                                    yield delta
+                            return
+                    except (RetryableLLMError, httpx.TransportError) as e:
+                        if yielded or attempt >= self.max_retries or time.monotonic() > deadline:
+                            raise
+                        attempt += 1
+                        self.retries += 1
+                        delay = random.uniform(0, self.retry_base_delay * (2 ** (attempt - 1)))
+                        print(f"LLM stream failed ({e}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                        await asyncio.sleep(delay)
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    async def _complete_with_retries(self, payload: dict, headers: dict) -> str:
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        return await self._hedged_attempt(payload, headers)
+                    except (RetryableLLMError, httpx.TransportError) as e:
+                        if attempt >= self.max_retries:
+                            raise
+                        delay = random.uniform(0, self.retry_base_delay * (2 ** attempt))
+                        retry_after = getattr(e, "retry_after", None)
+                        if retry_after is not None:
+                            delay = max(delay, retry_after)
+                        attempt += 1
+                        self.retries += 1
+                        print(f"LLM attempt failed ({e}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                        await asyncio.sleep(delay)
+            finally:
+                self.in_flight -= 1
+
+    async def _hedged_attempt(self, payload: dict, headers: dict) -> str:
+        hedge_delay = self._hedge_delay()
+        primary = asyncio.ensure_future(self._attempt(payload, headers))
+        if hedge_delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        self.hedges += 1
+        hedge = asyncio.ensure_future(self._attempt(payload, headers))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, payload: dict, headers: dict) -> str:
+        started = time.monotonic()
+        response = await self._client.post(self.url, json=payload, headers=headers)
+        if response.status_code in RETRYABLE_STATUS:
+            retry_after = response.headers.get("Retry-After")
+            raise RetryableLLMError(
+                f"OpenRouter returned {response.status_code}",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        if response.status_code >= 400:
+            raise LLMError(f"OpenRouter returned {response.status_code}: {response.text[:200]}")
+        content = response.json()["choices"][0]["message"]["content"]
+        self._latencies.append(time.monotonic() - started)
+        return content
+
+    def _hedge_delay(self):
+        if self.hedge_percentile <= 0 or len(self._latencies) < self.hedge_min_samples:
+            return None
+        samples = sorted(self._latencies)
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return samples[index]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "hedge_delay": self._hedge_delay(),
+        }
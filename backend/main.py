@@ -1,15 +1,52 @@
 from dotenv import load_dotenv
 load_dotenv()
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from models import MatchResult, UploadResponse, MatchRequest
-from utils import extract_text, chunk_text, generate_embeddings, init_pinecone, store_embeddings, call_openrouter
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, FileResponse
+from models import MatchResult, UploadResponse, MatchRequest, BatchMatchRequest, IngestStatus
+from utils import generate_embeddings, get_shared_pinecone_index, store_embeddings, retrieve_context, batch_coverage, llm_client_stats, call_openrouter, stream_openrouter, embedding_batcher_stats, embedding_model_status, warm_up_embedding_model, content_digest, new_content_digest, estimate_tokens, is_dummy_embedding, EMBEDDING_MODEL_NAME, RETRIEVAL_TOKEN_BUDGET
+from cache import MemoryCache, pack_embeddings, unpack_embeddings, is_packed_embeddings
+from vector_store import LocalIndex
+from chunking import chunk_text
+from extraction import extract_text, Spool, DocumentLimitError, MAX_UPLOAD_BYTES, UPLOAD_READ_SIZE
+from chunk_cache import RedisChunkCache, LocalChunkCache, CHUNK_CACHE_BACKEND, CHUNK_CACHE_PATH
+from ingest import RedisIngestQueue, SQLiteIngestQueue, COMPLETED
+from skills import extract_skills
+from features import extract_features, document_features
+from prescore import prescore, fast_path_decision, ACCEPT
+from prompts import render_match_prompt, response_cache_key, fit_text, content_budget, job_budget, centroid_scores, query_scores, prompt_stats
+from metrics import stage, render as render_metrics, Counter, Gauge, CACHE_REQUESTS, FALLBACKS, HTTP_REQUEST_SECONDS
+from llm import OPENROUTER_MODEL
+from profiler import PROFILING_ENABLED, start_profile, finish_profile, profile_path
+from executors import admit, run_parse, run_embed, run_io, pending_uploads, QueueFullError, MAX_PENDING_UPLOADS, PARSE_WORKERS, EMBED_WORKERS, IO_WORKERS
 import uuid
 import json
+import numpy as np
 import redis
 import os
+import threading
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
 
-app = FastAPI(title="Resume-Job Matching API", version="1.0.0")
+# Load and exercise the embedding model before the server accepts requests.
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "true").lower() == "true"
+
+@asynccontextmanager
+async def lifespan(app):
+    if EMBEDDING_WARMUP:
+        await run_embed(warm_up_embedding_model)
+    workers = start_ingest_workers()
+    try:
+        yield
+    finally:
+        for worker in workers:
+            worker.cancel()
+        # Let cancelled workers hand their jobs back before the loop closes.
+        await asyncio.gather(*workers, return_exceptions=True)
+
+app = FastAPI(title="Resume-Job Matching API", version="1.0.0", lifespan=lifespan)
 
 origins = ["https://matchpoint-frontend-alpha.vercel.app", "http://localhost:3000"]
 app.add_middleware(
@@ -20,10 +57,149 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy processing other uploads. Please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(DocumentLimitError)
+async def document_limit_handler(request: Request, exc: DocumentLimitError):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Refuse before the multipart body is received; the spool enforces the
+    # exact limit on the file part itself.
+    content_length = request.headers.get("content-length")
+    if request.url.path.startswith("/upload") and content_length and content_length.isdigit() \
+            and int(content_length) > MAX_UPLOAD_BYTES + UPLOAD_READ_SIZE:
+        return JSONResponse(status_code=413, content={"detail": f"Upload exceeds {MAX_UPLOAD_BYTES} bytes"})
+    return await call_next(request)
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    # Latency is recorded when the last byte of the body is sent, so streamed
+    # responses count their full duration.
+    profile = None
+    if PROFILING_ENABLED and "1" in (request.query_params.get("profile"), request.headers.get("x-profile")):
+        profile = start_profile()
+    label = f"{request.method} {request.url.path}"
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except BaseException:
+        if profile is not None:
+            await run_io(finish_profile, *profile, label)
+        raise
+
+    route = request.scope.get("route")
+    labels = {"method": request.method, "route": route.path if route is not None else "unmatched", "status": response.status_code}
+    body = response.body_iterator
+
+    async def observed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+            if profile is not None:
+                await run_io(finish_profile, *profile, label)
+
+    response.body_iterator = observed_body()
+    if profile is not None:
+        response.headers["X-Profile-Id"] = profile[1]
+    return response
+
 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
 redis_client = None
+redis_binary_client = None
 redis_available = None
-memory_cache = {}
+# Connections per pool (text and binary). Redis calls run on the I/O, parse
+# and embed (chunk cache) executors, one connection per call, so by default
+# every executor thread can hold one at once. A thread that finds the pool
+# empty waits up to REDIS_POOL_TIMEOUT seconds instead of failing.
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", str(IO_WORKERS + PARSE_WORKERS + EMBED_WORKERS)))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+
+# L1 in front of Redis. With Redis up, entries live at most MEMORY_CACHE_TTL
+# seconds here (Redis stays the source of truth); without Redis this is the
+# only store and entries keep the TTL the caller asked for.
+MEMORY_CACHE_MAX_BYTES = int(os.getenv("MEMORY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+MEMORY_CACHE_TTL = int(os.getenv("MEMORY_CACHE_TTL", "300"))
+memory_cache = MemoryCache(max_bytes=MEMORY_CACHE_MAX_BYTES)
+
+# "pinecone" or "local"; defaults to Pinecone when it is configured. The local
+# backend is a memory-mapped brute-force (or HNSW) index in this process.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone" if os.getenv("PINECONE_API_KEY") else "local")
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "var/vector_index")
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "flat")
+local_index = None
+local_index_lock = threading.Lock()
+
+# /match/batch: only the TOP_K best pre-ranked documents go to the LLM, at
+# most CONCURRENCY at a time.
+BATCH_MATCH_TOP_K = int(os.getenv("BATCH_MATCH_TOP_K", "10"))
+BATCH_MATCH_CONCURRENCY = int(os.getenv("BATCH_MATCH_CONCURRENCY", "4"))
+BATCH_MATCH_MAX_ITEMS = int(os.getenv("BATCH_MATCH_MAX_ITEMS", "1000"))
+
+# Upsert vectors after the upload response has been sent.
+PINECONE_ASYNC_UPSERT = os.getenv("PINECONE_ASYNC_UPSERT", "false").lower() == "true"
+
+# Identical concurrent matches share one computation: within a process
+# through one task per result key, across replicas through a Redis lease on
+# that key. Replicas that find the lease held poll the result cache instead.
+MATCH_LOCK_TTL = int(os.getenv("MATCH_LOCK_TTL", "90"))
+MATCH_LOCK_POLL_INTERVAL = float(os.getenv("MATCH_LOCK_POLL_INTERVAL", "0.25"))
+inflight_matches = {}
+match_flight_stats = {"computed": 0, "coalesced": 0, "lease_waits": 0}
+# Document fields /match reads: text and vectors plus upload-time features.
+MATCH_FIELDS = ("text", "embeddings", "skills", "token_count", "years_experience", "features_version")
+# Matches answered from the pre-score alone vs. sent on to the LLM.
+match_fast_path_stats = {"accepted": 0, "rejected": 0, "escalated": 0}
+
+# LLM analyses keyed by model and prompt content (llmresp:{hash}), so a pair
+# of re-uploaded documents reuses the earlier answer under its new ids. Shared
+# through Redis, where the oldest entries beyond LLM_CACHE_MAX_ENTRIES are evicted.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 86400)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_INDEX = "llmresp:index"
+llm_cache_stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+# "inline" processes uploads inside the request. "queue" stores the raw upload,
+# enqueues an ingestion job and answers 202; workers (INGEST_WORKERS tasks in
+# this process when INGEST_RUN_IN_API, and/or `python worker.py` elsewhere)
+# run the pipeline. The queue is Redis when reachable, else a local SQLite file.
+INGEST_MODE = os.getenv("INGEST_MODE", "inline")
+INGEST_QUEUE = os.getenv("INGEST_QUEUE", "auto")
+INGEST_SQLITE_PATH = os.getenv("INGEST_SQLITE_PATH", "var/ingest.db")
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_RUN_IN_API = os.getenv("INGEST_RUN_IN_API", "true").lower() == "true"
+INGEST_MAX_QUEUE_DEPTH = int(os.getenv("INGEST_MAX_QUEUE_DEPTH", "1000"))
+INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "1"))
+MIN_TEXT_LENGTH = {"resume": 50, "job": 20}
+ingest_queue = None
+ingest_queue_lock = threading.Lock()
+
+# float32 round-trips exactly; float16 halves and int8 quarters the payload
+# at a small recall cost.
+EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")
+
+def _redis_pool(decode_responses: bool):
+    return redis.BlockingConnectionPool.from_url(
+        redis_url,
+        decode_responses=decode_responses,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        socket_keepalive=True,
+        retry_on_timeout=True,
+        health_check_interval=30
+    )
 
 def init_redis():
     global redis_client, redis_available
@@ -35,14 +211,7 @@ def init_redis():
         return redis_client
     
     try:
-        redis_client = redis.from_url(
-            redis_url,
-            decode_responses=True,
-            socket_connect_timeout=5,
-            socket_timeout=5,
-            retry_on_timeout=True,
-            health_check_interval=30
-        )
+        redis_client = redis.Redis(connection_pool=_redis_pool(decode_responses=True))
         redis_client.ping()
         print(f"Redis connected successfully to {redis_url}")
         redis_available = True
@@ -53,18 +222,88 @@ def init_redis():
         redis_available = False
         return None
 
-def get_pinecone_index():
+def init_redis_binary():
+    global redis_binary_client
+
+    if redis_binary_client is not None:
+        return redis_binary_client
+
+    if init_redis() is None:
+        return None
+
     try:
-        return init_pinecone()
+        redis_binary_client = redis.Redis(connection_pool=_redis_pool(decode_responses=False))
+        return redis_binary_client
+    except Exception as e:
+        print(f"Redis binary connection failed: {e}")
+        return None
+
+def get_ingest_queue():
+    global ingest_queue
+    if ingest_queue is None:
+        with ingest_queue_lock:
+            if ingest_queue is None:
+                backend = INGEST_QUEUE
+                if backend == "auto":
+                    backend = "redis" if init_redis() is not None else "sqlite"
+                if backend == "redis":
+                    ingest_queue = RedisIngestQueue(init_redis_binary())
+                else:
+                    print(f"Using local ingestion queue at {INGEST_SQLITE_PATH}")
+                    ingest_queue = SQLiteIngestQueue(INGEST_SQLITE_PATH)
+    return ingest_queue
+
+def get_local_index():
+    global local_index
+    if local_index is None:
+        with local_index_lock:
+            if local_index is None:
+                print(f"Opening local vector index at {LOCAL_INDEX_PATH} ({LOCAL_INDEX_MODE})")
+                local_index = LocalIndex(path=LOCAL_INDEX_PATH, mode=LOCAL_INDEX_MODE)
+    return local_index
+
+chunk_cache = None
+chunk_cache_failed = False
+chunk_cache_lock = threading.Lock()
+
+def get_chunk_cache():
+    """The chunk embedding cache, or None to embed uncached."""
+    global chunk_cache, chunk_cache_failed
+    if chunk_cache is None and not chunk_cache_failed and CHUNK_CACHE_BACKEND != "off":
+        with chunk_cache_lock:
+            if chunk_cache is None and not chunk_cache_failed:
+                client = init_redis_binary() if CHUNK_CACHE_BACKEND in ("auto", "redis") else None
+                if client is not None:
+                    chunk_cache = RedisChunkCache(client)
+                elif CHUNK_CACHE_BACKEND in ("auto", "local"):
+                    print(f"Opening local chunk embedding cache at {CHUNK_CACHE_PATH}")
+                    try:
+                        chunk_cache = LocalChunkCache(CHUNK_CACHE_PATH)
+                    except Exception as e:
+                        # Only an optimization: don't retry (and log) on every upload.
+                        print(f"Failed to open chunk embedding cache: {e}, embedding uncached")
+                        chunk_cache_failed = True
+    return chunk_cache
+
+def get_vector_index():
+    if VECTOR_BACKEND == "local":
+        try:
+            return get_local_index()
+        except Exception as e:
+            print(f"Failed to open local vector index at {LOCAL_INDEX_PATH}: {e}")
+            return None
+    try:
+        return get_shared_pinecone_index()
     except Exception as e:
         print(f"Failed to initialize Pinecone: {e}")
         return None
 
+@stage("cache_write")
 def cache_set(key: str, value, expire: int = 3600):
     client = init_redis()
     
     if client is None:
-        memory_cache[key] = value
+        memory_cache.set(key, value, ttl=expire)
         return
     
     try:
@@ -72,36 +311,357 @@ def cache_set(key: str, value, expire: int = 3600):
             client.set(key, json.dumps(value), ex=expire)
         else:
             client.set(key, value, ex=expire)
-        memory_cache[key] = value
+        memory_cache.set(key, value, ttl=min(expire, MEMORY_CACHE_TTL))
     except Exception as e:
         print(f"Redis cache set failed for key {key}: {e}")
-        memory_cache[key] = value
+        memory_cache.set(key, value, ttl=expire)
 
 def cache_get(key: str):
+    with stage("cache_read"):
+        value = _cache_get(key)
+    CACHE_REQUESTS.inc(cache=key.split(":", 1)[0], result="miss" if value is None else "hit")
+    return value
+
+def _cache_get(key: str):
+    value = memory_cache.get(key)
+    if value is not None:
+        return value
+
     client = init_redis()
     
     if client is None:
-        return memory_cache.get(key)
+        return None
     
     try:
         value = client.get(key)
         if value is None:
-            return memory_cache.get(key)
+            return None
         try:
-            parsed_value = json.loads(value)
-            memory_cache[key] = parsed_value
-            return parsed_value
+            value = json.loads(value)
         except json.JSONDecodeError:
-            memory_cache[key] = value
-            return value
+            pass
+        memory_cache.set(key, value, ttl=MEMORY_CACHE_TTL)
+        return value
     except Exception as e:
         print(f"Redis cache get failed for key {key}: {e}")
-        return memory_cache.get(key)
+        return None
+
+def llm_cache_get(key: str):
+    if not LLM_CACHE_ENABLED:
+        return None
+    value = cache_get(key)
+    llm_cache_stats["misses" if value is None else "hits"] += 1
+    return value
+
+@stage("cache_write")
+def llm_cache_set(key: str, value: dict):
+    if not LLM_CACHE_ENABLED:
+        return
+    client = init_redis()
+    memory_cache.set(key, value, ttl=LLM_CACHE_TTL if client is None else min(LLM_CACHE_TTL, MEMORY_CACHE_TTL))
+    llm_cache_stats["stored"] += 1
+    if client is None:
+        return
+
+    try:
+        now = time.time()
+        pipe = client.pipeline(transaction=False)
+        pipe.set(key, json.dumps(value), ex=LLM_CACHE_TTL)
+        pipe.zadd(LLM_CACHE_INDEX, {key: now})
+        pipe.zremrangebyscore(LLM_CACHE_INDEX, "-inf", now - LLM_CACHE_TTL)
+        pipe.zcard(LLM_CACHE_INDEX)
+        size = pipe.execute()[-1]
+        if size > LLM_CACHE_MAX_ENTRIES:
+            evicted = [member for member, _ in client.zpopmin(LLM_CACHE_INDEX, size - LLM_CACHE_MAX_ENTRIES)]
+            if evicted:
+                client.delete(*evicted)
+                llm_cache_stats["evicted"] += len(evicted)
+    except Exception as e:
+        print(f"Redis LLM cache set failed for key {key}: {e}")
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+def acquire_lock(key: str, ttl: int):
+    """Take the lease lock:{key}. Returns a release token, or None if another holder has it."""
+    token = uuid.uuid4().hex
+    client = init_redis()
+    if client is None:
+        return token
+    try:
+        return token if client.set(f"lock:{key}", token, nx=True, ex=ttl) else None
+    except Exception as e:
+        print(f"Redis lock failed for key {key}: {e}")
+        return token
+
+def release_lock(key: str, token: str):
+    client = init_redis()
+    if client is None:
+        return
+    try:
+        client.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+    except Exception as e:
+        print(f"Redis unlock failed for key {key}: {e}")
+
+def decode_embeddings(blob):
+    if is_packed_embeddings(blob):
+        matrix, model_id = unpack_embeddings(blob)
+        if model_id != EMBEDDING_MODEL_NAME:
+            print(f"Ignoring embeddings produced by {model_id}, current model is {EMBEDDING_MODEL_NAME}")
+            return None
+        return matrix
+    # Written before binary storage: a JSON list of float lists.
+    return np.asarray(json.loads(blob), dtype=np.float32)
+
+# A document is one Redis hash, doc:{doc_type}:{doc_id}, so an upload is a
+# single MULTI/EXEC and /match reads both documents in one pipeline. Besides
+# text, chunks and embeddings it holds the upload-time features (see
+# features.py) as separate fields, so readers fetch only what they use.
+# "text" is stored as UTF-8, "embeddings" packed, every other field as JSON.
+def _encode_document_field(field: str, value) -> bytes:
+    if field == "text":
+        return value.encode("utf-8")
+    if field == "embeddings":
+        return pack_embeddings(value, EMBEDDING_MODEL_NAME, EMBEDDING_STORAGE_DTYPE)
+    return json.dumps(value).encode("utf-8")
+
+def _decode_document_field(field: str, raw):
+    if raw is None:
+        return None
+    if field == "text":
+        return raw.decode("utf-8")
+    if field == "embeddings":
+        return decode_embeddings(raw)
+    return json.loads(raw)
+
+@stage("document_write")
+def save_document(doc_type: str, doc_id: str, record: dict, expire: int = 3600):
+    key = f"doc:{doc_type}:{doc_id}"
+    if "embeddings" in record:
+        record = {**record, "embeddings": np.asarray(record["embeddings"], dtype=np.float32)}
+    client = init_redis_binary()
+
+    if client is None:
+        memory_cache.set(key, record, ttl=expire)
+        return
+
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.hset(key, mapping={field: _encode_document_field(field, value) for field, value in record.items()})
+        pipe.expire(key, expire)
+        pipe.execute()
+        memory_cache.set(key, record, ttl=min(expire, MEMORY_CACHE_TTL))
+    except Exception as e:
+        print(f"Redis document save failed for {key}: {e}")
+        memory_cache.set(key, record, ttl=expire)
+
+@stage("document_read")
+def load_documents(requests: list) -> list:
+    """Fetch several documents in one round trip.
+
+    ``requests`` is a list of ``(doc_type, doc_id, fields)``; the result has
+    one record dict per request, or None where the document is missing.
+    """
+    records = [None] * len(requests)
+    pending = []
+    for i, (doc_type, doc_id, fields) in enumerate(requests):
+        cached = memory_cache.get(f"doc:{doc_type}:{doc_id}")
+        if cached is not None:
+            records[i] = cached
+        if cached is None or not all(field in cached for field in fields):
+            pending.append(i)
+
+    client = init_redis_binary()
+    if not pending or client is None:
+        return records
+
+    try:
+        pipe = client.pipeline(transaction=False)
+        for i in pending:
+            doc_type, doc_id, fields = requests[i]
+            pipe.hmget(f"doc:{doc_type}:{doc_id}", list(fields))
+            # Documents uploaded before records existed live under one key
+            # per field; missing keys cost nothing in the same round trip.
+            for field in fields:
+                pipe.get(f"{field}:{doc_type}:{doc_id}")
+        replies = iter(pipe.execute())
+
+        migrations = []
+        for i in pending:
+            doc_type, doc_id, fields = requests[i]
+            values = next(replies)
+            legacy = [next(replies) for _ in fields]
+            key = f"doc:{doc_type}:{doc_id}"
+            if all(value is None for value in values):
+                values = legacy
+                key = None
+            if all(value is None for value in values):
+                continue
+            record = {field: _decode_document_field(field, value) for field, value in zip(fields, values)}
+            if "embeddings" in fields:
+                raw = values[fields.index("embeddings")]
+                if raw is not None and record["embeddings"] is not None and not is_packed_embeddings(raw):
+                    migrations.append((key or f"embeddings:{doc_type}:{doc_id}", key is not None, record["embeddings"]))
+            memory_cache.set(f"doc:{doc_type}:{doc_id}", record, ttl=MEMORY_CACHE_TTL)
+            records[i] = record
+    except Exception as e:
+        print(f"Redis document load failed: {e}")
+        return records
+
+    for key, in_hash, embeddings in migrations:
+        _migrate_json_embeddings(client, key, in_hash, embeddings)
+    return records
+
+def _migrate_json_embeddings(client, key: str, in_hash: bool, embeddings):
+    """Rewrite JSON embeddings packed, keeping the key's remaining TTL, so the next read is a binary hit."""
+    packed = pack_embeddings(embeddings, EMBEDDING_MODEL_NAME, EMBEDDING_STORAGE_DTYPE)
+    try:
+        if in_hash:
+            # HSET leaves the hash's expiry alone.
+            client.hset(key, mapping={"embeddings": packed})
+        else:
+            ttl = client.ttl(key)
+            if ttl == -2:
+                return
+            client.set(key, packed, ex=ttl if ttl > 0 else None)
+        print(f"Migrated JSON embeddings for {key} to packed {EMBEDDING_STORAGE_DTYPE}")
+    except Exception as e:
+        print(f"Redis embedding migration failed for {key}: {e}")
+
+def load_document(doc_type: str, doc_id: str, fields=("text", "chunks", "embeddings")):
+    return load_documents([(doc_type, doc_id, tuple(fields))])[0]
+
+def find_processed_document(doc_type: str, digest: str):
+    doc_id = cache_get(f"dedup:{doc_type}:{digest}")
+    if not doc_id:
+        return None
+    # The dedup entry can outlive the document if keys were evicted; only
+    # reuse it while everything /match needs is still cached.
+    record = load_document(doc_type, doc_id, ("text", "embeddings"))
+    if not record or not record.get("text") or record.get("embeddings") is None:
+        return None
+    return doc_id
+
+def store_document_vectors(doc_id: str, doc_type: str, embeddings, chunks: list[str]):
+    try:
+        index = get_vector_index()
+        if not index:
+            print(f"[{doc_id}] Vector index not available, skipping vector storage")
+            return
+        print(f"[{doc_id}] Storing vectors...")
+        with stage("upsert"):
+            success = store_embeddings(index, embeddings, chunks, doc_id, doc_type)
+        if success:
+            print(f"[{doc_id}] Successfully stored vectors")
+        else:
+            print(f"[{doc_id}] Vector storage returned false, continuing")
+    except Exception as e:
+        print(f"[{doc_id}] Vector storage failed: {e}, continuing")
+
+async def spool_upload(file: UploadFile) -> Spool:
+    spool = Spool(hasher=new_content_digest(file.filename))
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_READ_SIZE)
+            if not chunk:
+                return spool
+            if spool.on_disk:
+                await run_io(spool.write, chunk)
+            else:
+                spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+async def index_document(background_tasks: Optional[BackgroundTasks], doc_id: str, doc_type: str, embeddings, chunks: list[str]):
+    if PINECONE_ASYNC_UPSERT and background_tasks is not None:
+        # /match falls back to the cached resume text until the upsert lands.
+        background_tasks.add_task(run_parse, store_document_vectors, doc_id, doc_type, embeddings, chunks)
+    else:
+        await run_parse(store_document_vectors, doc_id, doc_type, embeddings, chunks)
+
+async def process_document(background_tasks: Optional[BackgroundTasks], doc_type: str, doc_id: str, text: str, digest: str):
+    """Chunk, embed, index and store extracted text. Used by inline uploads and ingestion workers."""
+    print(f"[{doc_id}] Chunking text...")
+    with stage("chunk"):
+        chunks = await run_parse(chunk_text, text)
+    print(f"[{doc_id}] Number of chunks: {len(chunks)}")
+
+    print(f"[{doc_id}] Generating embeddings...")
+    with stage("embed"):
+        embeddings = await run_embed(generate_embeddings, chunks, await run_io(get_chunk_cache))
+    print(f"[{doc_id}] Embeddings shape: {len(embeddings)} x {len(embeddings[0]) if embeddings else 0}")
+
+    await index_document(background_tasks, doc_id, doc_type, embeddings, chunks)
+
+    with stage("features"):
+        features = await run_parse(extract_features, text)
+    await run_parse(save_document, doc_type, doc_id, {"text": text, "chunks": chunks, "embeddings": embeddings, **features})
+    await run_parse(cache_set, f"dedup:{doc_type}:{digest}", doc_id)
+
+async def enqueue_upload(doc_type: str, doc_id: str, filename: str, digest: str, payload: bytes) -> JSONResponse:
+    queue = await run_io(get_ingest_queue)
+    if await run_io(queue.depth) >= INGEST_MAX_QUEUE_DEPTH:
+        raise QueueFullError()
+    await run_io(queue.enqueue, doc_id, doc_type, filename, digest, payload)
+    print(f"[{doc_id}] Queued {doc_type} for ingestion")
+    response = UploadResponse(job_id=doc_id, message="Upload queued for processing", status="queued")
+    return JSONResponse(status_code=202, content=response.model_dump())
+
+async def run_ingest_job(job: dict, payload):
+    doc_type, doc_id = job["doc_type"], job["id"]
+    if payload is None:
+        raise ValueError("Upload expired before it was processed")
+    print(f"[{doc_id}] Extracting text...")
+    with stage("extract"):
+        text = await run_parse(extract_text, payload, job["filename"])
+    if not text or len(text.strip()) < MIN_TEXT_LENGTH[doc_type]:
+        raise ValueError("Could not extract sufficient text from file")
+    await process_document(None, doc_type, doc_id, text, job["digest"])
+    print(f"[{doc_id}] Processing complete")
+
+async def ingest_worker(worker_id: int):
+    queue = await run_io(get_ingest_queue)
+    print(f"[INGEST] Worker {worker_id} started")
+    while True:
+        try:
+            claimed = await run_io(queue.claim, INGEST_POLL_INTERVAL)
+        except Exception as e:
+            print(f"[INGEST] Worker {worker_id} could not read the queue: {e}")
+            await asyncio.sleep(INGEST_POLL_INTERVAL)
+            continue
+        if claimed is None:
+            continue
+        job, payload = claimed
+        try:
+            await run_ingest_job(job, payload)
+            await run_io(queue.complete, job["id"])
+        except asyncio.CancelledError:
+            # Shutting down mid-job: requeue it now rather than after the visibility timeout.
+            # Called synchronously: the event loop may be closing.
+            print(f"[{job['id']}] Worker {worker_id} stopped, returning job to the queue")
+            queue.release(job["id"])
+            raise
+        except Exception as e:
+            print(f"[{job['id']}] Ingestion failed: {e}")
+            import traceback
+            traceback.print_exc()
+            await run_io(queue.fail, job["id"], str(e))
+
+def start_ingest_workers() -> list:
+    if INGEST_MODE != "queue" or not INGEST_RUN_IN_API:
+        return []
+    return [asyncio.ensure_future(ingest_worker(i)) for i in range(INGEST_WORKERS)]
 
 
 @app.post("/upload/resume", response_model=UploadResponse)
-async def upload_resume(file: UploadFile = File(...)):
+async def upload_resume(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     resume_id = str(uuid.uuid4())
+    content = None
     
     try:
         print(f"[{resume_id}] Uploading resume: {file.filename}")
@@ -109,63 +669,55 @@ async def upload_resume(file: UploadFile = File(...)):
         if not file.filename or not file.filename.endswith(('.pdf', '.docx', '.txt')):
             raise HTTPException(status_code=400, detail="Invalid file type. Only PDF, DOCX, TXT allowed.")
 
-        content = await file.read()
-        print(f"[{resume_id}] File size: {len(content)} bytes")
+        content = await spool_upload(file)
+        print(f"[{resume_id}] File size: {content.size} bytes")
 
-        if len(content) == 0:
+        if content.size == 0:
             raise HTTPException(status_code=400, detail="Uploaded file is empty")
 
-        print(f"[{resume_id}] Extracting text...")
-        text = extract_text(content, file.filename)
-        
-        if not text or len(text.strip()) < 50:
-            raise HTTPException(status_code=400, detail="Could not extract sufficient text from file")
-        
-        print(f"[{resume_id}] Extracted text length: {len(text)}")
+        digest = content.digest()
+        existing_id = await run_parse(find_processed_document, "resume", digest)
+        if existing_id:
+            print(f"[{resume_id}] Identical resume already processed as {existing_id}, reusing")
+            return UploadResponse(job_id=existing_id, message="Resume already processed, reusing cached analysis", cached=True)
 
-        print(f"[{resume_id}] Chunking text...")
-        chunks = chunk_text(text)
-        print(f"[{resume_id}] Number of chunks: {len(chunks)}")
+        if INGEST_MODE == "queue":
+            return await enqueue_upload("resume", resume_id, file.filename, digest, await run_io(content.read))
 
-        print(f"[{resume_id}] Generating embeddings...")
-        embeddings = generate_embeddings(chunks)
-        print(f"[{resume_id}] Embeddings shape: {len(embeddings)} x {len(embeddings[0]) if embeddings else 0}")
+        async with admit():
+            print(f"[{resume_id}] Extracting text...")
+            with stage("extract"):
+                text = await run_parse(extract_text, content, file.filename)
 
-        index = get_pinecone_index()
-        if index:
-            print(f"[{resume_id}] Storing in Pinecone...")
-            try:
-                success = store_embeddings(index, embeddings, chunks, resume_id, "resume")
-                if success:
-                    print(f"[{resume_id}] Successfully stored in Pinecone")
-                else:
-                    print(f"[{resume_id}] Pinecone storage returned false, continuing")
-            except Exception as e:
-                print(f"[{resume_id}] Pinecone storage failed: {e}, continuing")
-        else:
-            print(f"[{resume_id}] Pinecone not available, skipping vector storage")
+            if not text or len(text.strip()) < MIN_TEXT_LENGTH["resume"]:
+                raise HTTPException(status_code=400, detail="Could not extract sufficient text from file")
+
+            print(f"[{resume_id}] Extracted text length: {len(text)}")
+            await process_document(background_tasks, "resume", resume_id, text, digest)
 
-        cache_set(f"text:resume:{resume_id}", text)
-        cache_set(f"chunks:resume:{resume_id}", chunks)
-        cache_set(f"embeddings:resume:{resume_id}", embeddings)
         print(f"[{resume_id}] Processing complete")
         
         return UploadResponse(job_id=resume_id, message="Resume uploaded and processed successfully")
         
-    except HTTPException:
+    except (HTTPException, QueueFullError, DocumentLimitError):
         raise
     except Exception as e:
         print(f"[{resume_id}] Error during processing: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    finally:
+        if content is not None:
+            content.close()
 
 @app.post("/upload/job", response_model=UploadResponse)
 async def upload_job(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(None),
     text: str = Form(None)
 ):
     job_id = str(uuid.uuid4())
+    content = None
     
     try:
         if not file and not text:
@@ -176,52 +728,285 @@ async def upload_job(
         if file:
             if not file.filename or not file.filename.endswith(('.pdf', '.docx', '.txt')):
                 raise HTTPException(status_code=400, detail="Invalid file type. Only PDF, DOCX, TXT allowed.")
-            content = await file.read()
-            
-            if len(content) == 0:
+            content = await spool_upload(file)
+
+            if content.size == 0:
                 raise HTTPException(status_code=400, detail="Uploaded file is empty")
-            
-            text = extract_text(content, file.filename)
-        
-        if not text or len(text.strip()) < 20:
-            raise HTTPException(status_code=400, detail="Job description text is too short or empty")
-        
-        print(f"[{job_id}] Processing job text (length: {len(text)})")
-        
-        chunks = chunk_text(text)
-        embeddings = generate_embeddings(chunks)
-        
-        print(f"[{job_id}] Generated {len(chunks)} chunks and embeddings")
-        
-        index = get_pinecone_index()
-        if index:
-            try:
-                success = store_embeddings(index, embeddings, chunks, job_id, "job")
-                if success:
-                    print(f"[{job_id}] Successfully stored in Pinecone")
-                else:
-                    print(f"[{job_id}] Pinecone storage returned false, continuing")
-            except Exception as e:
-                print(f"[{job_id}] Pinecone storage failed: {e}, continuing")
-        
-        cache_set(f"text:job:{job_id}", text)
-        cache_set(f"chunks:job:{job_id}", chunks)
-        cache_set(f"embeddings:job:{job_id}", embeddings)
-        
+            digest = content.digest()
+        else:
+            digest = content_digest(text.encode("utf-8"), "job.txt")
+
+        existing_id = await run_parse(find_processed_document, "job", digest)
+        if existing_id:
+            print(f"[{job_id}] Identical job description already processed as {existing_id}, reusing")
+            return UploadResponse(job_id=existing_id, message="Job description already processed, reusing cached analysis", cached=True)
+
+        if INGEST_MODE == "queue":
+            if file:
+                return await enqueue_upload("job", job_id, file.filename, digest, await run_io(content.read))
+            return await enqueue_upload("job", job_id, "job.txt", digest, text.encode("utf-8"))
+
+        async with admit():
+            if file:
+                with stage("extract"):
+                    text = await run_parse(extract_text, content, file.filename)
+
+            if not text or len(text.strip()) < MIN_TEXT_LENGTH["job"]:
+                raise HTTPException(status_code=400, detail="Job description text is too short or empty")
+
+            print(f"[{job_id}] Processing job text (length: {len(text)})")
+            await process_document(background_tasks, "job", job_id, text, digest)
+
         print(f"[{job_id}] Job processing complete")
         
         return UploadResponse(job_id=job_id, message="Job description uploaded and processed successfully")
         
-    except HTTPException:
+    except (HTTPException, QueueFullError, DocumentLimitError):
         raise
     except Exception as e:
         print(f"[{job_id}] Error during processing: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    finally:
+        if content is not None:
+            content.close()
+
+async def build_match_prompt(resume_id: str, job_id: str, job_text: str, job_embeddings, resume_text: str,
+                             job_tokens: Optional[int] = None, resume_tokens: Optional[int] = None) -> str:
+    # Job text over its share is cut down to the chunks closest to the job as
+    # a whole; chunks are only loaded when that is needed. The token counts
+    # stored at upload save re-estimating both texts.
+    if job_tokens is None:
+        job_tokens = estimate_tokens(job_text)
+    if resume_tokens is None:
+        resume_tokens = estimate_tokens(resume_text)
+    job_chunks = job_scores = None
+    if job_tokens > job_budget():
+        job = await run_io(load_document, "job", job_id, ("chunks",))
+        job_chunks = job.get("chunks") if job else None
+        if job_chunks and job_embeddings is not None:
+            job_scores = centroid_scores(job_embeddings)
+        job_text, job_truncated, job_dropped = fit_text(job_text, job_budget(), job_chunks, job_scores)
+        job_tokens = estimate_tokens(job_text)
+    else:
+        job_truncated, job_dropped = False, 0
+    resume_budget = content_budget() - job_tokens
+
+    retrieved_texts = []
+    try:
+        index = await run_io(get_vector_index)
+        if index:
+            with stage("retrieve"):
+                retrieved_texts = await run_io(retrieve_context, index, job_embeddings, resume_id, "resume",
+                                               token_budget=min(RETRIEVAL_TOKEN_BUDGET, resume_budget))
+            print(f"[MATCH] Retrieved {len(retrieved_texts)} chunks from vector index")
+    except Exception as e:
+        print(f"[MATCH] Vector query failed: {e}, using fallback")
+        FALLBACKS.inc(reason="vector_query")
+        retrieved_texts = []
+
+    resume_truncated, resume_dropped = False, 0
+    if retrieved_texts:
+        context = "\n".join(retrieved_texts)
+    else:
+        print("[MATCH] Using fallback resume text for matching")
+        FALLBACKS.inc(reason="resume_text")
+        context = resume_text
+        if resume_tokens > resume_budget:
+            resume_chunks = resume_scores = None
+            resume = await run_io(load_document, "resume", resume_id, ("chunks", "embeddings"))
+            if resume and resume.get("chunks") and resume.get("embeddings") is not None and job_embeddings is not None:
+                resume_chunks = resume["chunks"]
+                resume_scores = query_scores(resume["embeddings"], job_embeddings)
+            context, resume_truncated, resume_dropped = fit_text(resume_text, resume_budget, resume_chunks, resume_scores)
+
+    prompt = render_match_prompt(job_text, context)
+    prompt_stats.record(prompt, job_truncated, resume_truncated, job_dropped + resume_dropped)
+
+    print(f"[MATCH] Job text length: {len(job_text)}, Resume text length: {len(resume_text)}")
+    print(f"[MATCH] LLM Prompt length: {len(prompt)} characters (~{estimate_tokens(prompt)} tokens)")
+    if job_truncated or resume_truncated:
+        print(f"[MATCH] Prompt trimmed to budget: job={job_truncated}, resume={resume_truncated}, "
+              f"dropped_chunks={job_dropped + resume_dropped}")
+
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        print("[MATCH] WARNING: OPENROUTER_API_KEY not set - using fallback analysis")
+    return prompt
+
+def extract_llm_json(llm_response: str):
+    """The JSON object in ``llm_response``, or None when there is none."""
+    try:
+        result = json.loads(llm_response)
+        print(f"[MATCH] Successfully parsed LLM result: score={result.get('match_score', 'N/A')}")
+    except json.JSONDecodeError as e:
+        print(f"[MATCH] JSON parse failed: {e}, attempting regex extraction")
+        FALLBACKS.inc(reason="parse_regex")
+        import re
+        json_match = re.search(r'\{.*\}', llm_response, re.DOTALL)
+        if json_match:
+            try:
+                result = json.loads(json_match.group())
+                print(f"[MATCH] Extracted JSON from response: score={result.get('match_score', 'N/A')}")
+            except json.JSONDecodeError as e2:
+                print(f"[MATCH] Regex JSON parse failed: {e2}")
+                result = None
+        else:
+            print("[MATCH] No JSON found in LLM response")
+            result = None
+    return result or None
+
+def parse_llm_response(llm_response: str, ats_result: dict, response_key: str) -> dict:
+    """The LLM's analysis, cached under ``response_key``, or ``ats_result`` if it can't be parsed."""
+    result = extract_llm_json(llm_response)
+    try:
+        result = MatchResult(**result).model_dump() if isinstance(result, dict) else None
+    except ValueError as e:
+        print(f"[MATCH] LLM result failed validation: {e}")
+        result = None
+    if not result:
+        print("[MATCH] Using ATS fallback due to JSON parsing failure")
+        FALLBACKS.inc(reason="parse_failed")
+        return ats_result
+    llm_cache_set(response_key, result)
+    return result
+
+async def _acquire_lease(key: str):
+    """Wait for the cross-replica lease on ``key``.
+
+    Returns ``(token, None)`` once this replica holds it, ``(None, result)``
+    when the replica holding it stored a result meanwhile, and ``(None, None)``
+    when it was not released within MATCH_LOCK_TTL (compute without it).
+    """
+    give_up_at = time.monotonic() + MATCH_LOCK_TTL
+    while True:
+        token = await run_io(acquire_lock, key, MATCH_LOCK_TTL)
+        if token is not None:
+            # Another replica may have finished between our cache miss and the lease.
+            cached = await run_io(cache_get, key)
+            if cached:
+                await run_io(release_lock, key, token)
+                return None, cached
+            return token, None
+
+        match_flight_stats["lease_waits"] += 1
+        await asyncio.sleep(MATCH_LOCK_POLL_INTERVAL)
+        cached = await run_io(cache_get, key)
+        if cached:
+            return None, cached
+        if time.monotonic() > give_up_at:
+            print(f"[MATCH] Lease on {key} not released in {MATCH_LOCK_TTL}s, computing locally")
+            return None, None
+
+async def _compute_with_lease(key: str, compute) -> dict:
+    token, cached = await _acquire_lease(key)
+    if cached:
+        return cached
+    try:
+        match_flight_stats["computed"] += 1
+        return await compute()
+    finally:
+        if token is not None:
+            await run_io(release_lock, key, token)
+
+async def single_flight(key: str, compute) -> dict:
+    """Run ``compute`` once per key at a time; concurrent callers await the same result."""
+    while True:
+        flight = inflight_matches.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(_compute_with_lease(key, compute))
+            inflight_matches[key] = flight
+            flight.add_done_callback(lambda done: inflight_matches.pop(key, None) if inflight_matches.get(key) is done else None)
+        else:
+            match_flight_stats["coalesced"] += 1
+            print(f"[MATCH] Joining in-flight computation for {key}")
+        try:
+            # Shielded so one caller disconnecting does not cancel the others.
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if not flight.cancelled():
+                raise
+            # The computation we joined was abandoned (e.g. an aborted stream); start over.
+
+def fast_path_match(job_embeddings, resume_embeddings, ats_result: dict, job_years=None, resume_years=None):
+    """Deterministic result for a clear-cut pair, or None when the LLM should decide.
+
+    The pre-score blends the keyword skill score with how well the resume's
+    chunks cover the job's chunks in embedding space; years of experience
+    (upload-time features) can hold back an accept.
+    """
+    if job_embeddings is None or resume_embeddings is None or len(resume_embeddings) == 0:
+        return None
+    if is_dummy_embedding(job_embeddings) or is_dummy_embedding(resume_embeddings):
+        # Uploaded while the model was failing; coverage would compare placeholders.
+        print("[MATCH] Stored embeddings are dummy fallbacks, skipping fast path")
+        match_fast_path_stats["escalated"] += 1
+        return None
+    score = prescore(job_embeddings, resume_embeddings, ats_result["match_score"])
+    job_skill_count = len(ats_result["matching_skills"]) + len(ats_result["missing_skills"])
+    decision = fast_path_decision(score, job_skill_count, job_years, resume_years)
+    if decision is None:
+        match_fast_path_stats["escalated"] += 1
+        return None
+    match_fast_path_stats["accepted" if decision == ACCEPT else "rejected"] += 1
+    print(f"[MATCH] Fast path {decision}: pre-score={score}, skipping LLM")
+    return {**ats_result, "match_score": score}
+
+async def compute_match(resume_id: str, job_id: str, job_text: str, job_embeddings, resume_text: str,
+                        resume_skills=None, job_skills=None, resume_embeddings=None,
+                        job_features: Optional[dict] = None, resume_features: Optional[dict] = None) -> dict:
+    """``job_features``/``resume_features`` are ``document_features`` of the records."""
+    return await single_flight(
+        f"result:{resume_id}:{job_id}",
+        lambda: _compute_match(resume_id, job_id, job_text, job_embeddings, resume_text, resume_skills, job_skills,
+                               resume_embeddings, job_features, resume_features),
+    )
+
+async def _compute_match(resume_id: str, job_id: str, job_text: str, job_embeddings, resume_text: str,
+                         resume_skills=None, job_skills=None, resume_embeddings=None,
+                         job_features: Optional[dict] = None, resume_features: Optional[dict] = None) -> dict:
+    job_features = job_features or document_features({"text": job_text})
+    resume_features = resume_features or document_features({"text": resume_text})
+    with stage("ats"):
+        ats_result = generate_ats_accurate_match(resume_text, job_text, resume_skills, job_skills)
+    with stage("prescore"):
+        result = fast_path_match(job_embeddings, resume_embeddings, ats_result,
+                                 job_features["years_experience"], resume_features["years_experience"])
+    if result is not None:
+        await run_io(cache_set, f"result:{resume_id}:{job_id}", result)
+        return result
+
+    with stage("prompt"):
+        prompt = await build_match_prompt(resume_id, job_id, job_text, job_embeddings, resume_text,
+                                          job_features["token_count"], resume_features["token_count"])
+    response_key = response_cache_key(OPENROUTER_MODEL, prompt)
+    result = await run_io(llm_cache_get, response_key)
+    if result:
+        print(f"[MATCH] Reusing cached LLM analysis {response_key}")
+        await run_io(cache_set, f"result:{resume_id}:{job_id}", result)
+        return result
+
+    try:
+        print("[MATCH] Calling LLM for analysis...")
+        with stage("llm"):
+            llm_response = await call_openrouter(prompt)
+        print(f"[MATCH] LLM response received (length: {len(llm_response)})")
+        with stage("parse"):
+            result = await run_io(parse_llm_response, llm_response, ats_result, response_key)
+    except Exception as e:
+        print(f"[MATCH] LLM call failed: {e}")
+        FALLBACKS.inc(reason="llm_error")
+        import traceback
+        traceback.print_exc()
+        print("[MATCH] Using ATS fallback due to API failure")
+        result = ats_result
+
+    await run_io(cache_set, f"result:{resume_id}:{job_id}", result)
+    return result
 
 @app.post("/match", response_model=MatchResult)
-def match(request: MatchRequest):
+async def match(request: MatchRequest):
     resume_id = request.resume_id
     job_id = request.job_id
     
@@ -229,16 +1014,23 @@ def match(request: MatchRequest):
 
     try:
         cache_key = f"result:{resume_id}:{job_id}"
-        cached_result = cache_get(cache_key)
+        cached_result = await run_io(cache_get, cache_key)
         if cached_result:
             print(f"[MATCH] Returning cached result for {cache_key}")
             return MatchResult(**cached_result)
 
-        job_text = cache_get(f"text:job:{job_id}")
-        job_embeddings = cache_get(f"embeddings:job:{job_id}")
-        resume_text = cache_get(f"text:resume:{resume_id}")
+        job, resume = await run_io(load_documents, [
+            ("job", job_id, MATCH_FIELDS),
+            ("resume", resume_id, MATCH_FIELDS),
+        ])
+        job_text = job and job.get("text")
+        job_embeddings = job and job.get("embeddings")
+        job_skills = job and job.get("skills")
+        resume_text = resume and resume.get("text")
+        resume_skills = resume and resume.get("skills")
+        resume_embeddings = resume and resume.get("embeddings")
 
-        if not job_text or not job_embeddings:
+        if not job_text or job_embeddings is None or len(job_embeddings) == 0:
             print(f"[MATCH] Job data not found for job_id={job_id}")
             raise HTTPException(status_code=404, detail=f"Job description not found. Please upload the job description first.")
 
@@ -246,122 +1038,9 @@ def match(request: MatchRequest):
             print(f"[MATCH] Resume data not found for resume_id={resume_id}")
             raise HTTPException(status_code=404, detail=f"Resume not found. Please upload the resume first.")
 
-        retrieved_texts = []
-        index = get_pinecone_index()
-        if index:
-            try:
-                results = index.query(vector=job_embeddings[0], top_k=10, include_metadata=True, filter={"doc_type": "resume"})
-                retrieved_texts = [match["metadata"]["text"] for match in results["matches"]]
-                print(f"[MATCH] Retrieved {len(retrieved_texts)} chunks from Pinecone")
-            except Exception as e:
-                print(f"[MATCH] Pinecone query failed: {e}, using fallback")
-                retrieved_texts = []
-
-        if not retrieved_texts:
-            print("[MATCH] Using fallback resume text for matching")
-            retrieved_texts = [resume_text]
-        
-        context = "\n".join(retrieved_texts)
-
-        prompt = f"""
-You are an ATS-grade evaluator. Analyze the FULL job description and the FULL resume text provided.
-
-Job Description:
-{job_text}
-
-Resume:
-{context}
-
-Instructions (follow exactly, no exceptions):
-1. Use ONLY the text explicitly present in the job description and resume. Do NOT use outside knowledge, inference, role assumptions, or typical skill expectations.
-2. Normalize all text (lowercase, strip punctuation, singularize where obvious).
-3. A skill is considered PRESENT only if:
-   - The exact term appears in both texts, OR
-   - A clearly explicit synonym or abbreviation appears (e.g., "js" = "javascript" ONLY if unambiguous).
-   If there is any doubt, EXCLUDE the skill.
-4. Skill classification:
-   - matching_skills: skills explicitly present in BOTH job description and resume.
-   - missing_skills: skills explicitly required or emphasized in the job description but ABSENT from the resume.
-   - Do NOT infer skills from job titles, responsibilities, or experience descriptions.
-5. Scoring (integer 0–100, strict and conservative):
-   - Skill overlap (50%): percentage of job-required skills found in resume.
-   - Experience/level alignment (25%): ONLY compare explicit years, seniority, or level mentions.
-   - Tools/technology specificity (15%): exact frameworks, platforms, versions.
-   - ATS structure & keyword clarity (10%): clear sections like Skills, Experience, Education.
-   If more than 50% of job skills are missing, match_score MUST be below 50.
-6. ATS suggestions:
-   - Provide concise, actionable suggestions derived ONLY from missing or weak areas found.
-   - Do NOT suggest adding skills that are not in the job description.
-7. Learning resources:
-   - For EACH missing skill, return an object in EXACTLY this format:
-     {{
-       "skill": "<skill>",
-       "free_tutorial": "<youtube URL or empty string>",
-       "official_resource": "<official documentation URL or empty string>",
-       "explore": "<exploration/discovery URL such as daily.dev or similar, or empty string>"
-     }}
-   - Examples of valid explore sources:
-     - https://app.daily.dev/tags/<skill>
-     - reputable blogs, curated learning hubs, or developer communities
-   - URLs MUST be real and verifiable.
-   - If unsure about any resource, return an empty string for that field.
-   - Do NOT fabricate or guess URLs.
-8. Output rules:
-   - Output ONLY valid JSON.
-   - Use EXACTLY these keys and no others:
-     {{
-       "match_score": number,
-       "matching_skills": array,
-       "missing_skills": array,
-       "ats_suggestions": array,
-       "learning_resources": array
-     }}
-   - Use empty arrays or empty strings when applicable.
-   - No explanations, comments, or extra text.
-
-Now perform the analysis and output the JSON only.
-"""
-
-        print(f"[MATCH] Job text length: {len(job_text)}, Resume text length: {len(resume_text)}")
-        print(f"[MATCH] LLM Prompt length: {len(prompt)} characters")
-
-        api_key = os.getenv("OPENROUTER_API_KEY")
-        if not api_key:
-            print("[MATCH] WARNING: OPENROUTER_API_KEY not set - using fallback analysis")
-
-        try:
-            print("[MATCH] Calling LLM for analysis...")
-            llm_response = call_openrouter(prompt)
-            print(f"[MATCH] LLM response received (length: {len(llm_response)})")
-
-            result = json.loads(llm_response)
-            print(f"[MATCH] Successfully parsed LLM result: score={result.get('match_score', 'N/A')}")
-        except json.JSONDecodeError as e:
-            print(f"[MATCH] JSON parse failed: {e}, attempting regex extraction")
-            import re
-            json_match = re.search(r'\{.*\}', llm_response, re.DOTALL)
-            if json_match:
-                try:
-                    result = json.loads(json_match.group())
-                    print(f"[MATCH] Extracted JSON from response: score={result.get('match_score', 'N/A')}")
-                except json.JSONDecodeError as e2:
-                    print(f"[MATCH] Regex JSON parse failed: {e2}")
-                    result = None
-            else:
-                print("[MATCH] No JSON found in LLM response")
-                result = None
-
-            if not result:
-                print("[MATCH] Using ATS fallback due to JSON parsing failure")
-                result = generate_ats_accurate_match(resume_text, job_text)
-        except Exception as e:
-            print(f"[MATCH] LLM call failed: {e}")
-            import traceback
-            traceback.print_exc()
-            print("[MATCH] Using ATS fallback due to API failure")
-            result = generate_ats_accurate_match(resume_text, job_text)
-
-        cache_set(cache_key, result)
+        result = await compute_match(resume_id, job_id, job_text, job_embeddings, resume_text,
+                                     resume_skills, job_skills, resume_embeddings,
+                                     document_features(job), document_features(resume))
         print(f"[MATCH] Match complete: score={result.get('match_score', 'N/A')}")
 
         return MatchResult(**result)
@@ -374,57 +1053,219 @@ Now perform the analysis and output the JSON only.
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Match processing failed: {str(e)}")
 
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-def generate_ats_accurate_match(resume_text: str, job_text: str):
-    import re
-
-    skill_database = {
-        "Python": ["python", "py"],
-        "JavaScript": ["javascript", "js", "ecmascript"],
-        "React": ["react", "react.js", "reactjs"],
-        "Node.js": ["node.js", "nodejs", "node"],
-        "SQL": ["sql", "mysql", "postgresql", "oracle", "sqlite"],
-        "Docker": ["docker"],
-        "AWS": ["aws", "amazon web services"],
-        "Kubernetes": ["kubernetes", "k8s"],
-        "TypeScript": ["typescript", "ts"],
-        "MongoDB": ["mongodb", "mongo"],
-        "PostgreSQL": ["postgresql", "postgres"],
-        "Git": ["git", "github", "gitlab"],
-        "CI/CD": ["ci/cd", "continuous integration", "continuous deployment", "jenkins", "github actions"],
-        "Machine Learning": ["machine learning", "ml", "ai", "artificial intelligence"],
-        "API Development": ["api", "rest api", "graphql"],
-        "Java": ["java"],
-        "C++": ["c++", "cpp"],
-        "Go": ["go", "golang"],
-        "Rust": ["rust"],
-        "PHP": ["php"],
-        "HTML": ["html", "html5"],
-        "CSS": ["css", "css3"],
-        "Django": ["django"],
-        "Flask": ["flask"],
-        "Express.js": ["express.js", "expressjs", "express"],
-        "Vue.js": ["vue.js", "vuejs", "vue"],
-        "Angular": ["angular"],
-        "TensorFlow": ["tensorflow", "tf"],
-        "PyTorch": ["pytorch", "torch"]
-    }
+@app.post("/match/stream")
+async def match_stream(request: MatchRequest):
+    """Server-Sent Events version of /match.
+
+    Emits ``ats`` (the keyword-based estimate, available immediately), then
+    ``token`` events as the LLM writes, then the validated ``result``. A
+    cached result is sent as ``result`` straight away.
+    """
+    resume_id = request.resume_id
+    job_id = request.job_id
+    cache_key = f"result:{resume_id}:{job_id}"
+    print(f"[MATCH] Processing streaming match request: resume={resume_id}, job={job_id}")
+
+    cached_result = await run_io(cache_get, cache_key)
+    if not cached_result:
+        job, resume = await run_io(load_documents, [
+            ("job", job_id, MATCH_FIELDS),
+            ("resume", resume_id, MATCH_FIELDS),
+        ])
+        job_text = job and job.get("text")
+        job_embeddings = job and job.get("embeddings")
+        job_skills = job and job.get("skills")
+        resume_text = resume and resume.get("text")
+        resume_skills = resume and resume.get("skills")
+        resume_embeddings = resume and resume.get("embeddings")
+
+        if not job_text or job_embeddings is None or len(job_embeddings) == 0:
+            raise HTTPException(status_code=404, detail=f"Job description not found. Please upload the job description first.")
+        if not resume_text:
+            raise HTTPException(status_code=404, detail=f"Resume not found. Please upload the resume first.")
+        job_features, resume_features = document_features(job), document_features(resume)
+
+    async def events():
+        if cached_result:
+            print(f"[MATCH] Returning cached result for {cache_key}")
+            yield sse("result", MatchResult(**cached_result).model_dump())
+            return
+
+        with stage("ats"):
+            ats_result = generate_ats_accurate_match(resume_text, job_text, resume_skills, job_skills)
+        yield sse("ats", MatchResult(**ats_result).model_dump())
+
+        with stage("prescore"):
+            result = fast_path_match(job_embeddings, resume_embeddings, ats_result,
+                                     job_features["years_experience"], resume_features["years_experience"])
+        if result is not None:
+            await run_io(cache_set, cache_key, result)
+            yield sse("result", MatchResult(**result).model_dump())
+            return
+
+        if cache_key in inflight_matches:
+            result = await compute_match(resume_id, job_id, job_text, job_embeddings, resume_text,
+                                         resume_skills, job_skills, resume_embeddings, job_features, resume_features)
+            yield sse("result", MatchResult(**result).model_dump())
+            return
+
+        # Register this stream so identical /match requests wait for it
+        # instead of calling the LLM again; other replicas wait on the lease.
+        flight = asyncio.get_running_loop().create_future()
+        inflight_matches[cache_key] = flight
+        token = None
+        try:
+            token, result = await _acquire_lease(cache_key)
+            if result:
+                print(f"[MATCH] Another replica computed {cache_key}, returning its result")
+                flight.set_result(result)
+                yield sse("result", MatchResult(**result).model_dump())
+                return
+            match_flight_stats["computed"] += 1
+
+            with stage("prompt"):
+                prompt = await build_match_prompt(resume_id, job_id, job_text, job_embeddings, resume_text,
+                                                  job_features["token_count"], resume_features["token_count"])
+            response_key = response_cache_key(OPENROUTER_MODEL, prompt)
+            result = await run_io(llm_cache_get, response_key)
+            if result:
+                print(f"[MATCH] Reusing cached LLM analysis {response_key}")
+                await run_io(cache_set, cache_key, result)
+                flight.set_result(result)
+                yield sse("result", MatchResult(**result).model_dump())
+                return
+
+            parts = []
+            try:
+                # Includes the time the client takes to read each token event.
+                with stage("llm"):
+                    async for delta in stream_openrouter(prompt):
+                        parts.append(delta)
+                        yield sse("token", {"text": delta})
+                with stage("parse"):
+                    result = await run_io(parse_llm_response, "".join(parts), ats_result, response_key)
+            except Exception as e:
+                print(f"[MATCH] LLM stream failed: {e}, using ATS fallback")
+                FALLBACKS.inc(reason="llm_error")
+                result = ats_result
+
+            await run_io(cache_set, cache_key, result)
+            flight.set_result(result)
+            print(f"[MATCH] Match complete: score={result.get('match_score', 'N/A')}")
+            yield sse("result", result)
+        finally:
+            if inflight_matches.get(cache_key) is flight:
+                del inflight_matches[cache_key]
+            if not flight.done():
+                flight.cancel()
+            if token is not None:
+                await run_io(release_lock, cache_key, token)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/match/batch")
+async def match_batch(request: BatchMatchRequest):
+    if request.job_id and request.resume_ids and not request.resume_id and not request.job_ids:
+        anchor_type, anchor_id, other_type, other_ids = "job", request.job_id, "resume", request.resume_ids
+    elif request.resume_id and request.job_ids and not request.job_id and not request.resume_ids:
+        anchor_type, anchor_id, other_type, other_ids = "resume", request.resume_id, "job", request.job_ids
+    else:
+        raise HTTPException(status_code=400, detail="Provide either job_id with resume_ids, or resume_id with job_ids.")
+
+    other_ids = list(dict.fromkeys(other_ids))
+    if len(other_ids) > BATCH_MATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MATCH_MAX_ITEMS} documents per batch.")
+    top_k = BATCH_MATCH_TOP_K if request.top_k is None else max(0, request.top_k)
+
+    print(f"[BATCH] {anchor_type}={anchor_id} against {len(other_ids)} {other_type}s, top_k={top_k}")
+
+    fields = MATCH_FIELDS
+    records = await run_io(load_documents, [(anchor_type, anchor_id, fields)] + [(other_type, doc_id, fields) for doc_id in other_ids])
+    anchor = records[0]
+    if not anchor or not anchor.get("text") or anchor.get("embeddings") is None or len(anchor["embeddings"]) == 0:
+        raise HTTPException(status_code=404, detail=f"{anchor_type.capitalize()} not found. Please upload it first.")
+
+    found, missing = [], []
+    for doc_id, record in zip(other_ids, records[1:]):
+        if record and record.get("text") and record.get("embeddings") is not None and len(record["embeddings"]) > 0:
+            found.append((doc_id, record))
+        else:
+            missing.append(doc_id)
+
+    scores = batch_coverage(anchor["embeddings"], [record["embeddings"] for _, record in found], anchor_is_job=anchor_type == "job")
+    ranked = sorted(zip(found, scores.tolist()), key=lambda item: item[1], reverse=True)
+
+    def pair(doc_id: str, record: dict):
+        job, resume = (anchor, record) if anchor_type == "job" else (record, anchor)
+        job_id, resume_id = (anchor_id, doc_id) if anchor_type == "job" else (doc_id, anchor_id)
+        return resume_id, job_id, job, resume
+
+    def item(doc_id: str, record: dict, rank: int, similarity: float) -> dict:
+        resume_id, job_id, job, resume = pair(doc_id, record)
+        line = {"resume_id": resume_id, "job_id": job_id, "rank": rank, "similarity": round(similarity, 4)}
+        # Share of the job's skills found in the resume, from upload-time features.
+        if job.get("skills") and resume.get("skills") is not None:
+            line["skill_coverage"] = round(len(set(job["skills"]) & set(resume["skills"])) / len(job["skills"]), 4)
+        return line
+
+    semaphore = asyncio.Semaphore(BATCH_MATCH_CONCURRENCY)
 
-    def extract_skills(text: str) -> set:
-        text_lower = text.lower()
-        found_skills = set()
+    async def run(doc_id: str, record: dict, rank: int, similarity: float) -> dict:
+        line = item(doc_id, record, rank, similarity)
+        resume_id, job_id, job, resume = pair(doc_id, record)
+        async with semaphore:
+            try:
+                cached_result = await run_io(cache_get, f"result:{resume_id}:{job_id}")
+                if cached_result:
+                    line.update(status="cached", result=MatchResult(**cached_result).model_dump())
+                else:
+                    result = await compute_match(resume_id, job_id, job["text"], job["embeddings"], resume["text"],
+                                                 resume.get("skills"), job.get("skills"), resume["embeddings"],
+                                                 document_features(job), document_features(resume))
+                    line.update(status="matched", result=MatchResult(**result).model_dump())
+            except Exception as e:
+                print(f"[BATCH] Match failed for resume={resume_id}, job={job_id}: {e}")
+                line.update(status="error", detail=str(e))
+        return line
+
+    async def stream():
+        for doc_id in missing:
+            key = "resume_id" if other_type == "resume" else "job_id"
+            anchor_key = "job_id" if other_type == "resume" else "resume_id"
+            yield json.dumps({key: doc_id, anchor_key: anchor_id, "status": "not_found"}) + "\n"
+        for rank, ((doc_id, record), similarity) in enumerate(ranked[top_k:], start=top_k + 1):
+            yield json.dumps({**item(doc_id, record, rank, similarity), "status": "ranked_out"}) + "\n"
 
-        for skill, synonyms in skill_database.items():
-            if any(synonym in text_lower for synonym in synonyms):
-                found_skills.add(skill)
+        tasks = [
+            asyncio.ensure_future(run(doc_id, record, rank, similarity))
+            for rank, ((doc_id, record), similarity) in enumerate(ranked[:top_k], start=1)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+        print(f"[BATCH] Complete: {min(top_k, len(ranked))} matched, {len(missing)} not found")
 
-        return found_skills
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-    resume_skills = extract_skills(resume_text)
-    job_skills = extract_skills(job_text)
 
-    matching_skills = resume_skills.intersection(job_skills)
-    missing_skills = job_skills - resume_skills
+def generate_ats_accurate_match(resume_text: str, job_text: str, resume_skills=None, job_skills=None):
+    # Skills extracted at upload time are passed in; older documents are scanned here.
+    resume_skills = set(extract_skills(resume_text) if resume_skills is None else resume_skills)
+    job_skills = set(extract_skills(job_text) if job_skills is None else job_skills)
+
+    matching_skills = sorted(resume_skills.intersection(job_skills))
+    missing_skills = sorted(job_skills - resume_skills)
 
     if not job_skills:
         match_percentage = 0
@@ -449,7 +1290,7 @@ def generate_ats_accurate_match(resume_text: str, job_text: str):
         ats_suggestions.append("Quantify experience with specific tools and technologies")
 
     learning_resources = []
-    for skill in list(missing_skills)[:4]:  
+    for skill in missing_skills[:4]:  
         resources = [
             f"https://www.youtube.com/results?search_query={skill.replace(' ', '+')}+tutorial",
             f"https://www.udemy.com/topic/{skill.lower().replace(' ', '-')}/"
@@ -463,8 +1304,8 @@ def generate_ats_accurate_match(resume_text: str, job_text: str):
 
     result = {
         "match_score": match_score,
-        "matching_skills": list(matching_skills),
-        "missing_skills": list(missing_skills),
+        "matching_skills": matching_skills,
+        "missing_skills": missing_skills,
         "ats_suggestions": ats_suggestions,
         "learning_resources": learning_resources
     }
@@ -472,12 +1313,81 @@ def generate_ats_accurate_match(resume_text: str, job_text: str):
     print(f"ATS Analysis: Resume skills={len(resume_skills)}, Job skills={len(job_skills)}, Matching={len(matching_skills)}, Score={match_score}%")
     return result
 
-@app.get("/results/{job_id}", response_model=MatchResult)
-def get_results(job_id: str):
-    raise HTTPException(status_code=501, detail="This endpoint is not implemented. Use POST /match instead.")
+@app.get("/results/{job_id}", response_model=IngestStatus)
+async def get_results(job_id: str):
+    """Ingestion status of an upload: queued, processing, completed or failed."""
+    if INGEST_MODE == "queue":
+        queue = await run_io(get_ingest_queue)
+        job = await run_io(queue.status, job_id)
+        if job:
+            return IngestStatus(job_id=job_id, status=job["status"], doc_type=job.get("doc_type"), error=job.get("error"))
+    # Inline uploads (and queued ones whose status expired) are done once stored.
+    resume, job = await run_io(load_documents, [("resume", job_id, ("text",)), ("job", job_id, ("text",))])
+    if resume or job:
+        return IngestStatus(job_id=job_id, status=COMPLETED, doc_type="resume" if resume else "job")
+    raise HTTPException(status_code=404, detail="Unknown upload id")
 @app.get("/ping")
 def ping():
     return {"status": "alive"}
+@app.get("/stats")
+def stats():
+    return {
+        "uploads": {"pending": pending_uploads(), "max_pending": MAX_PENDING_UPLOADS},
+        "embedding": embedding_batcher_stats(),
+        "embedding_model": embedding_model_status(),
+        "memory_cache": memory_cache.stats(),
+        "chunk_cache": chunk_cache.stats() if chunk_cache is not None else None,
+        "llm": llm_client_stats(),
+        "match_single_flight": {"in_flight": len(inflight_matches), **match_flight_stats},
+        "match_fast_path": dict(match_fast_path_stats),
+        "llm_response_cache": llm_response_cache_stats(),
+        "prompt": prompt_stats.stats(),
+    }
+def llm_response_cache_stats() -> dict:
+    lookups = llm_cache_stats["hits"] + llm_cache_stats["misses"]
+    return {
+        "enabled": LLM_CACHE_ENABLED,
+        "ttl": LLM_CACHE_TTL,
+        "max_entries": LLM_CACHE_MAX_ENTRIES,
+        **llm_cache_stats,
+        "hit_rate": round(llm_cache_stats["hits"] / lookups, 3) if lookups else None,
+    }
+
+def _ingest_queue_depth():
+    return get_ingest_queue().depth() if INGEST_MODE == "queue" else None
+
+Gauge("matchpoint_uploads_pending", "Uploads admitted and not yet finished.", fn=pending_uploads)
+Gauge("matchpoint_ingest_queue_depth", "Queued ingestion jobs (INGEST_MODE=queue).", fn=_ingest_queue_depth)
+Gauge("matchpoint_embedding_queue_chunks", "Chunks waiting for the embedding batcher.",
+      fn=lambda: embedding_batcher_stats()["queue_depth"])
+Gauge("matchpoint_embedding_model_loaded", "1 once the embedding model is loaded.",
+      fn=lambda: int(embedding_model_status()["loaded"]))
+Gauge("matchpoint_embedding_model_load_seconds", "Time the embedding model took to load.",
+      fn=lambda: embedding_model_status()["load_seconds"])
+Gauge("matchpoint_llm_in_flight", "OpenRouter requests in progress.", fn=lambda: llm_client_stats()["in_flight"])
+Counter("matchpoint_llm_retries_total", "OpenRouter attempts retried.", fn=lambda: llm_client_stats()["retries"])
+Counter("matchpoint_llm_failures_total", "OpenRouter calls that failed after retries.",
+        fn=lambda: llm_client_stats()["failures"])
+Gauge("matchpoint_matches_in_flight", "Distinct match computations in progress.", fn=lambda: len(inflight_matches))
+Counter("matchpoint_match_fast_path_total", "Matches decided by the pre-score vs. escalated to the LLM.", ("decision",),
+        fn=lambda: {(decision,): count for decision, count in match_fast_path_stats.items()})
+Counter("matchpoint_llm_response_cache_total", "LLM response cache lookups, stores and evictions.", ("event",),
+        fn=lambda: {(event,): count for event, count in llm_cache_stats.items()})
+Gauge("matchpoint_memory_cache_bytes", "Bytes held by the in-process cache.", fn=lambda: memory_cache.stats()["bytes"])
+Counter("matchpoint_memory_cache_evictions_total", "Entries evicted from the in-process cache.",
+        fn=lambda: memory_cache.stats()["evictions"])
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    path = profile_path(profile_id) if PROFILING_ENABLED else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown profile")
+    return FileResponse(path, media_type="text/plain")
+
 @app.get("/")
 def root():
     return {
@@ -0,0 +1,154 @@
+"""In-process metrics rendered in the Prometheus text format on /metrics.
+
+Counters and histograms are updated where the work happens; gauges (and
+counters mirrored from existing stats dicts) take a callback evaluated at
+scrape time. Each worker process keeps its own values, so scrape every
+worker or aggregate by instance.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers cache reads (sub-ms) up to slow LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=(), fn=None):
+        """``fn`` makes the metric read-only: it returns a number, or a dict
+        of label-value tuples to numbers, whenever /metrics is scraped."""
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        if self.fn is None:
+            with self._lock:
+                values = dict(self._values)
+        else:
+            try:
+                values = self.fn()
+            except Exception as e:
+                print(f"Metric {self.name} collection failed: {e}")
+                return
+            if not isinstance(values, dict):
+                values = {(): values}
+        for key, value in sorted(values.items()):
+            if value is not None:
+                yield self.name, key, (), value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", key, (("le", _format_value(float(bound))),), cumulative
+            yield f"{self.name}_sum", key, (), total
+            yield f"{self.name}_count", key, (), cumulative
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "matchpoint_http_request_seconds", "HTTP request latency by route and status.", ("method", "route", "status")
+)
+# Stages can nest: "prompt" includes "retrieve".
+STAGE_SECONDS = Histogram(
+    "matchpoint_stage_seconds", "Time spent in each upload/match pipeline stage.", ("stage",)
+)
+CACHE_REQUESTS = Counter(
+    "matchpoint_cache_requests_total", "Cache lookups by key prefix and outcome.", ("cache", "result")
+)
+FALLBACKS = Counter(
+    "matchpoint_fallbacks_total", "Degraded paths taken instead of the normal one.", ("reason",)
+)
+# Estimated at ~4 characters per token (utils.estimate_tokens), not tokenized.
+PROMPT_ESTIMATED_TOKENS = Histogram(
+    "matchpoint_prompt_estimated_tokens", "Match prompt size in estimated tokens (characters / 4).",
+    buckets=(250, 500, 1000, 2000, 3000, 4000, 5000, 6000, 8000, 12000),
+)
+PROMPT_TRUNCATIONS = Counter(
+    "matchpoint_prompt_truncations_total", "Match prompts whose job or resume text was trimmed to the budget.", ("part",)
+)
+
+
+def stage(name: str):
+    """``with stage("embed"): ...`` records the block's wall time, awaits included."""
+    return STAGE_SECONDS.time(stage=name)
@@ -11,7 +11,24 @@ class MatchResult(BaseModel):
 class UploadResponse(BaseModel):
     job_id: str
     message: str
+    cached: bool = False
+    # "queued" when ingestion runs on a worker; poll GET /results/{job_id}.
+    status: str = "completed"
+
+class IngestStatus(BaseModel):
+    job_id: str
+    status: str
+    doc_type: Optional[str] = None
+    error: Optional[str] = None
 
 class MatchRequest(BaseModel):
     resume_id: str
-    job_id: str
\ No newline at end of file
+    job_id: str
+
+class BatchMatchRequest(BaseModel):
+    # Either one job against many resumes, or one resume against many jobs.
+    job_id: Optional[str] = None
+    resume_ids: List[str] = []
+    resume_id: Optional[str] = None
+    job_ids: List[str] = []
+    top_k: Optional[int] = None
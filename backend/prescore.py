@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+from utils import batch_coverage, EMBEDDING_MODEL_NAME
+
+# /match answers without the LLM when the pre-score is clearly decisive.
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+# Pre-scores below REJECT_BELOW or at/above ACCEPT_FROM skip the LLM.
+FAST_PATH_REJECT_BELOW = int(os.getenv("FAST_PATH_REJECT_BELOW", "20"))
+FAST_PATH_ACCEPT_FROM = int(os.getenv("FAST_PATH_ACCEPT_FROM", "85"))
+# Keyword evidence is too thin to decide on with fewer job skills than this.
+FAST_PATH_MIN_JOB_SKILLS = int(os.getenv("FAST_PATH_MIN_JOB_SKILLS", "3"))
+# Weight of the keyword skill score; the rest comes from embedding coverage.
+FAST_PATH_SKILL_WEIGHT = float(os.getenv("FAST_PATH_SKILL_WEIGHT", "0.6"))
+# Chunk coverage (mean best cosine per job chunk) is mapped linearly onto 0-100
+# between a floor, where unrelated texts land, and a ceiling, where near-duplicates
+# land. Both depend on the embedding model: FAST_PATH_COVERAGE_FLOOR/_CEILING
+# override this table, and models missing from it get no fast path until set.
+# The default all-roberta-large-v1 is not in it until its spread is measured.
+COVERAGE_CALIBRATION = {
+    "all-MiniLM-L6-v2": (0.2, 0.8),
+}
+_calibration = COVERAGE_CALIBRATION.get(EMBEDDING_MODEL_NAME.rsplit("/", 1)[-1], (None, None))
+FAST_PATH_COVERAGE_FLOOR = float(os.getenv("FAST_PATH_COVERAGE_FLOOR") or _calibration[0] or 0.0)
+FAST_PATH_COVERAGE_CEILING = float(os.getenv("FAST_PATH_COVERAGE_CEILING") or _calibration[1] or 1.0)
+FAST_PATH_CALIBRATED = bool(os.getenv("FAST_PATH_COVERAGE_FLOOR") and os.getenv("FAST_PATH_COVERAGE_CEILING")) \
+    or _calibration[0] is not None
+if FAST_PATH_ENABLED and not FAST_PATH_CALIBRATED:
+    print(f"[MATCH] No coverage calibration for {EMBEDDING_MODEL_NAME}, fast path disabled; "
+          "set FAST_PATH_COVERAGE_FLOOR and FAST_PATH_COVERAGE_CEILING to enable it")
+
+ACCEPT, REJECT = "accept", "reject"
+
+
+def coverage_score(job_embeddings, resume_embeddings) -> float:
+    """Semantic coverage of the job by the resume on the 0-100 scale."""
+    coverage = float(batch_coverage(job_embeddings, [resume_embeddings])[0])
+    span = max(FAST_PATH_COVERAGE_CEILING - FAST_PATH_COVERAGE_FLOOR, 1e-6)
+    return float(np.clip((coverage - FAST_PATH_COVERAGE_FLOOR) / span, 0.0, 1.0) * 100)
+
+
+def prescore(job_embeddings, resume_embeddings, skill_score: int) -> int:
+    semantic = coverage_score(job_embeddings, resume_embeddings)
+    return int(round(FAST_PATH_SKILL_WEIGHT * skill_score + (1 - FAST_PATH_SKILL_WEIGHT) * semantic))
+
+
+def fast_path_decision(score: int, job_skill_count: int, job_years=None, resume_years=None):
+    """ACCEPT or REJECT when ``score`` is clear-cut, None to ask the LLM.
+
+    A resume showing fewer years of experience than the job asks for is never
+    accepted here: skills and wording can match while the level does not.
+    """
+    if not FAST_PATH_ENABLED or not FAST_PATH_CALIBRATED or job_skill_count < FAST_PATH_MIN_JOB_SKILLS:
+        return None
+    if score >= FAST_PATH_ACCEPT_FROM:
+        if job_years is not None and resume_years is not None and resume_years < job_years:
+            return None
+        return ACCEPT
+    if score < FAST_PATH_REJECT_BELOW:
+        return REJECT
+    return None
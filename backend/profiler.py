@@ -0,0 +1,92 @@
+"""Opt-in sampling profiler for single requests.
+
+With PROFILING_ENABLED=true, a request carrying ``?profile=1`` (or an
+``X-Profile: 1`` header) is sampled from start to the last byte of its
+response. Samples cover every thread in the process, so executor work is
+included, but so is anything else running concurrently; profile on a quiet
+instance. Output is collapsed stacks, readable by flamegraph.pl and
+speedscope, written to PROFILE_DIR.
+"""
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "var/profiles")
+
+# Innermost frames of a thread that is blocked rather than working.
+_IDLE_FRAMES = {
+    ("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select"),
+    ("thread.py", "_worker"), ("socket.py", "accept"),
+}
+
+_active = threading.Lock()
+
+
+class StackSampler:
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def start_profile():
+    """A running sampler and its profile id, or None while another profile runs."""
+    if not _active.acquire(blocking=False):
+        return None
+    return StackSampler().start(), uuid.uuid4().hex[:12]
+
+
+def finish_profile(sampler: StackSampler, profile_id: str, label: str) -> str:
+    try:
+        sampler.stop()
+    finally:
+        _active.release()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.txt")
+    with open(path, "w") as handle:
+        handle.write(sampler.collapsed())
+    print(f"[PROFILE] {label}: {sum(sampler.samples.values())} samples written to {path}")
+    return path
+
+
+def profile_path(profile_id: str):
+    if not profile_id.isalnum():
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.txt")
+    return path if os.path.exists(path) else None
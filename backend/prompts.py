@@ -0,0 +1,200 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from metrics import PROMPT_ESTIMATED_TOKENS, PROMPT_TRUNCATIONS
+from utils import estimate_tokens, normalize_rows
+
+# Upper bound for the whole match prompt (instructions + job + resume).
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "6000"))
+# Share of the content budget the job description may use; whatever it
+# leaves unused goes to the resume.
+PROMPT_JOB_SHARE = float(os.getenv("PROMPT_JOB_SHARE", "0.5"))
+
+# The instructions never change, so they come first: providers that cache
+# prompt prefixes can then reuse them across every /match call.
+MATCH_PROMPT_PREFIX = """You are an ATS-grade evaluator. Analyze the FULL job description and the FULL resume text provided below.
+
+Instructions (follow exactly, no exceptions):
+1. Use ONLY the text explicitly present in the job description and resume. Do NOT use outside knowledge, inference, role assumptions, or typical skill expectations.
+2. Normalize all text (lowercase, strip punctuation, singularize where obvious).
+3. A skill is considered PRESENT only if:
+   - The exact term appears in both texts, OR
+   - A clearly explicit synonym or abbreviation appears (e.g., "js" = "javascript" ONLY if unambiguous).
+   If there is any doubt, EXCLUDE the skill.
+4. Skill classification:
+   - matching_skills: skills explicitly present in BOTH job description and resume.
+   - missing_skills: skills explicitly required or emphasized in the job description but ABSENT from the resume.
+   - Do NOT infer skills from job titles, responsibilities, or experience descriptions.
+5. Scoring (integer 0–100, strict and conservative):
+   - Skill overlap (50%): percentage of job-required skills found in resume.
+   - Experience/level alignment (25%): ONLY compare explicit years, seniority, or level mentions.
+   - Tools/technology specificity (15%): exact frameworks, platforms, versions.
+   - ATS structure & keyword clarity (10%): clear sections like Skills, Experience, Education.
+   If more than 50% of job skills are missing, match_score MUST be below 50.
+6. ATS suggestions:
+   - Provide concise, actionable suggestions derived ONLY from missing or weak areas found.
+   - Do NOT suggest adding skills that are not in the job description.
+7. Learning resources:
+   - For EACH missing skill, return an object in EXACTLY this format:
+     {
+       "skill": "<skill>",
+       "free_tutorial": "<youtube URL or empty string>",
+       "official_resource": "<official documentation URL or empty string>",
+       "explore": "<exploration/discovery URL such as daily.dev or similar, or empty string>"
+     }
+   - Examples of valid explore sources:
+     - https://app.daily.dev/tags/<skill>
+     - reputable blogs, curated learning hubs, or developer communities
+   - URLs MUST be real and verifiable.
+   - If unsure about any resource, return an empty string for that field.
+   - Do NOT fabricate or guess URLs.
+8. Output rules:
+   - Output ONLY valid JSON.
+   - Use EXACTLY these keys and no others:
+     {
+       "match_score": number,
+       "matching_skills": array,
+       "missing_skills": array,
+       "ats_suggestions": array,
+       "learning_resources": array
+     }
+   - Use empty arrays or empty strings when applicable.
+   - No explanations, comments, or extra text.
+"""
+
+MATCH_PROMPT_TEMPLATE = """
+Job Description:
+{job_text}
+
+Resume:
+{resume_context}
+
+Now perform the analysis and output the JSON only.
+"""
+
+PREFIX_TOKENS = estimate_tokens(MATCH_PROMPT_PREFIX)
+FRAME_TOKENS = estimate_tokens(MATCH_PROMPT_TEMPLATE.format(job_text="", resume_context=""))
+
+
+def content_budget() -> int:
+    """Tokens left for job and resume text once the fixed parts are counted."""
+    return max(0, PROMPT_MAX_TOKENS - PREFIX_TOKENS - FRAME_TOKENS)
+
+
+def job_budget() -> int:
+    return int(content_budget() * PROMPT_JOB_SHARE)
+
+
+def truncate_text(text: str, budget: int) -> str:
+    """Leading part of ``text`` within ``budget`` tokens, cut at whitespace."""
+    limit = budget * 4
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit + 1)
+    return text[:cut if cut > limit // 2 else limit].rstrip()
+
+
+def select_chunks(chunks: list, scores, budget: int):
+    """Highest-scoring chunks that fit ``budget``, in document order.
+
+    Returns ``(chunks, dropped)``.
+    """
+    selected = []
+    used = 0
+    for i in np.argsort(-np.asarray(scores, dtype=np.float32), kind="stable"):
+        tokens = estimate_tokens(chunks[i])
+        if used + tokens > budget:
+            continue
+        selected.append(int(i))
+        used += tokens
+    return [chunks[i] for i in sorted(selected)], len(chunks) - len(selected)
+
+
+def centroid_scores(embeddings) -> np.ndarray:
+    """Similarity of each chunk to the document as a whole (its mean embedding)."""
+    rows = normalize_rows(embeddings)
+    return rows @ normalize_rows(rows.mean(axis=0, keepdims=True))[0]
+
+
+def query_scores(embeddings, query_embeddings) -> np.ndarray:
+    """Best similarity of each chunk to any of the query chunks."""
+    return (normalize_rows(embeddings) @ normalize_rows(query_embeddings).T).max(axis=1)
+
+
+def fit_text(text: str, budget: int, chunks=None, scores=None):
+    """``text`` reduced to ``budget`` tokens.
+
+    With per-chunk relevance ``scores`` the most relevant chunks are kept;
+    otherwise the text is cut. Returns ``(text, truncated, dropped_chunks)``.
+    """
+    if estimate_tokens(text) <= budget:
+        return text, False, 0
+    if chunks and scores is not None and len(scores) == len(chunks):
+        kept, dropped = select_chunks(chunks, scores, budget)
+        if kept:
+            return "\n".join(kept), True, dropped
+    return truncate_text(text, budget), True, 0
+
+
+def render_match_prompt(job_text: str, resume_context: str) -> str:
+    return MATCH_PROMPT_PREFIX + MATCH_PROMPT_TEMPLATE.format(job_text=job_text, resume_context=resume_context)
+
+
+def response_cache_key(model: str, prompt: str) -> str:
+    """Key for the LLM's answer to ``prompt``. The prompt holds the instructions,
+    the fitted job text and the resume context, so equal content gives an equal
+    key whatever the document ids; runs of whitespace are collapsed first."""
+    normalized = " ".join(prompt.split())
+    return "llmresp:" + hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class PromptStats:
+    """Prompt sizes for /stats and /metrics. Token counts are the ~4 characters
+    per token estimate the budget uses, not tokenizer counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+        self.last_tokens = 0
+        self.job_truncated = 0
+        self.resume_truncated = 0
+        self.dropped_chunks = 0
+
+    def record(self, prompt: str, job_truncated: bool, resume_truncated: bool, dropped_chunks: int):
+        tokens = estimate_tokens(prompt)
+        PROMPT_ESTIMATED_TOKENS.observe(tokens)
+        if job_truncated:
+            PROMPT_TRUNCATIONS.inc(part="job")
+        if resume_truncated:
+            PROMPT_TRUNCATIONS.inc(part="resume")
+        with self._lock:
+            self.builds += 1
+            self.total_tokens += tokens
+            self.max_tokens = max(self.max_tokens, tokens)
+            self.last_tokens = tokens
+            self.job_truncated += int(job_truncated)
+            self.resume_truncated += int(resume_truncated)
+            self.dropped_chunks += dropped_chunks
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "token_counts": "estimated (characters / 4)",
+                "max_prompt_tokens": PROMPT_MAX_TOKENS,
+                "prefix_tokens": PREFIX_TOKENS,
+                "builds": self.builds,
+                "avg_tokens": self.total_tokens // self.builds if self.builds else 0,
+                "max_tokens": self.max_tokens,
+                "last_tokens": self.last_tokens,
+                "job_truncated": self.job_truncated,
+                "resume_truncated": self.resume_truncated,
+                "dropped_chunks": self.dropped_chunks,
+            }
+
+
+prompt_stats = PromptStats()
@@ -0,0 +1,80 @@
+import json
+import os
+import re
+
+SKILLS_TAXONOMY_PATH = os.getenv("SKILLS_TAXONOMY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "skills.json"))
+
+# Characters that continue a term: "go" must not match inside "google" or
+# "golang", nor "c" inside "c++" or "c#".
+_TERM_CHARS = r"\w+#"
+
+
+def _trie_pattern(terms) -> str:
+    """Regex alternation for ``terms`` factored as a prefix trie.
+
+    Each position in the text is then checked against one branch per distinct
+    next character instead of every term, so a scan stays close to linear.
+    Longer terms are tried first; the boundary check backtracks to a shorter
+    term ("node" when "node.js" is not followed by a boundary).
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = "(?:" + "|".join(branches) + ")" if len(branches) > 1 else branches[0]
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+class SkillMatcher:
+    """Maps free text to canonical skill names with one compiled regex.
+
+    ``taxonomy`` is ``{"Skill": ["synonym", ...]}``. Synonyms are matched
+    case-insensitively on term boundaries, in a single pass over the text.
+    """
+
+    def __init__(self, taxonomy: dict):
+        self.taxonomy = taxonomy
+        self._canonical = {}
+        for skill, synonyms in taxonomy.items():
+            for synonym in synonyms:
+                self._canonical.setdefault(synonym.lower(), set()).add(skill)
+        terms = sorted(self._canonical, key=len, reverse=True)
+        # The scan only reports the longest term at each position, so a term
+        # also carries the skills of shorter terms it contains on boundaries
+        # ("github actions" is both CI/CD and Git).
+        for term in terms:
+            for other in terms:
+                if other != term and re.search(rf"(?<![{_TERM_CHARS}]){re.escape(other)}(?![{_TERM_CHARS}])", term):
+                    self._canonical[term] = self._canonical[term] | self._canonical[other]
+        self._pattern = re.compile(
+            rf"(?<![{_TERM_CHARS}])(?:{_trie_pattern(terms)})(?![{_TERM_CHARS}])"
+        ) if terms else None
+
+    @classmethod
+    def from_file(cls, path: str) -> "SkillMatcher":
+        with open(path, encoding="utf-8") as taxonomy:
+            return cls(json.load(taxonomy))
+
+    def extract(self, text: str) -> set:
+        found = set()
+        if not text or self._pattern is None:
+            return found
+        for match in self._pattern.finditer(text.lower()):
+            found |= self._canonical[match.group()]
+        return found
+
+
+skill_matcher = SkillMatcher.from_file(SKILLS_TAXONOMY_PATH)
+
+
+def extract_skills(text: str) -> list:
+    return sorted(skill_matcher.extract(text))
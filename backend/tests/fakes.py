@@ -0,0 +1,27 @@
+class FakeIndex:
+    """In-memory stand-in for a Pinecone index handle."""
+
+    def __init__(self):
+        self.vectors = {}
+        self.upsert_calls = []
+        self.healthy = True
+
+    def upsert(self, vectors):
+        self.upsert_calls.append(len(vectors))
+        for vector_id, values, metadata in vectors:
+            self.vectors[vector_id] = (values, metadata)
+
+    def describe_index_stats(self):
+        if not self.healthy:
+            raise ConnectionError("index unavailable")
+        return {"total_vector_count": len(self.vectors)}
+
+    def query(self, vector, top_k=10, include_metadata=True, filter=None):
+        filter = filter or {}
+        matches = []
+        for vector_id, (values, metadata) in self.vectors.items():
+            if all(metadata.get(key) == value for key, value in filter.items()):
+                score = sum(a * b for a, b in zip(vector, values))
+                matches.append({"id": vector_id, "score": score, "metadata": metadata})
+        matches.sort(key=lambda match: match["score"], reverse=True)
+        return {"matches": matches[:top_k]}
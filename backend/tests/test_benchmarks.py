@@ -0,0 +1,51 @@
+import pytest
+
+from benchmarks import corpus
+from benchmarks.__main__ import main
+from benchmarks.load import uploaded_ids
+from benchmarks.report import compare, percentile, summarize
+from extraction import extract_text
+
+
+def test_percentiles_use_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 99) == 0.099
+    summary = summarize(values, elapsed=2.0, errors=1)
+    assert summary["p95_ms"] == 95.0 and summary["count"] == 100 and summary["errors"] == 1
+    assert summary["per_second"] == 50.0
+
+
+def test_compare_flags_regressions():
+    before = {"results": {"match": {"p95_ms": 100.0, "per_second": 50.0}}}
+    after = {"results": {"match": {"p95_ms": 150.0, "per_second": 52.0}}}
+    rows = {(name, metric): regressed for name, metric, _, _, _, regressed in compare(before, after)}
+    assert rows == {("match", "p95_ms"): True, ("match", "per_second"): False}
+
+
+def test_corpus_documents_extract_back_to_their_text():
+    text = corpus.resume_text(7)
+    assert corpus.resume_text(7) == text
+    for fmt in ("txt", "docx", "pdf"):
+        extracted = extract_text(corpus.encode(text, fmt), f"resume.{fmt}")
+        assert "Candidate 7" in extracted and "Education" in extracted
+
+
+class Response:
+    def __init__(self, status_code, job_id=None):
+        self.status_code = status_code
+        self.job_id = job_id
+
+    def json(self):
+        return {"job_id": self.job_id}
+
+
+def test_failed_uploads_do_not_shift_ids():
+    responses = [Response(500), None, Response(202, "r3"), Response(202, "j1"), Response(503)]
+    assert uploaded_ids(responses[:3]) == ["r3"]
+    assert uploaded_ids(responses[3:]) == ["j1"]
+
+
+def test_load_with_several_workers_needs_redis():
+    with pytest.raises(SystemExit):
+        main(["load", "--workers", "2"])
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+import numpy as np
+
+from cache import MemoryCache, estimate_size, pack_embeddings, unpack_embeddings, is_packed_embeddings
+
+
+def test_memory_cache_evicts_least_recently_used_by_size():
+    value = "x" * 1000
+    cache = MemoryCache(max_bytes=estimate_size(value) * 2)
+    cache.set("a", value)
+    cache.set("b", value)
+    assert cache.get("a") == value
+
+    cache.set("c", value)
+
+    assert "b" not in cache
+    assert cache.get("a") == value
+    assert cache.get("c") == value
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_memory_cache_honours_ttl():
+    cache = MemoryCache(max_bytes=1024 * 1024)
+    with patch("cache.time.monotonic", return_value=100.0):
+        cache.set("key", [1, 2, 3], ttl=10)
+        assert cache.get("key") == [1, 2, 3]
+    with patch("cache.time.monotonic", return_value=111.0):
+        assert cache.get("key") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+    assert stats["entries"] == 0
+
+
+def test_memory_cache_skips_values_larger_than_budget():
+    cache = MemoryCache(max_bytes=100)
+    cache.set("big", "y" * 1000)
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_packed_embeddings_round_trip():
+    matrix = np.random.default_rng(0).normal(size=(3, 8)).astype(np.float32)
+
+    blob = pack_embeddings(matrix, "test-model")
+    restored, model_id = unpack_embeddings(blob)
+
+    assert is_packed_embeddings(blob)
+    assert model_id == "test-model"
+    assert restored.dtype == np.float32
+    np.testing.assert_array_equal(restored, matrix)
+    assert len(blob) < 64 + matrix.nbytes
+
+
+def test_packed_embeddings_quantized():
+    matrix = np.random.default_rng(1).normal(size=(4, 16)).astype(np.float32)
+
+    half, _ = unpack_embeddings(pack_embeddings(matrix, "m", "float16"))
+    quantized, _ = unpack_embeddings(pack_embeddings(matrix, "m", "int8"))
+
+    np.testing.assert_allclose(half, matrix, atol=1e-2)
+    np.testing.assert_allclose(quantized, matrix, atol=np.abs(matrix).max() / 100)
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+import numpy as np
+
+from chunk_cache import LocalChunkCache, chunk_key
+from utils import EmbeddingBatcher, generate_embeddings
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_local_cache_round_trip_and_reopen(tmp_path):
+    path = str(tmp_path / "chunks")
+    keys = [chunk_key("model", text) for text in ("a", "b", "c")]
+    cache = LocalChunkCache(path)
+    assert cache.get_many(keys) == [None, None, None]
+
+    cache.set_many(keys[:2], [[1.0, 2.0], [3.0, 4.0]])
+    found = cache.get_many(keys)
+    assert found[0].tolist() == [1.0, 2.0] and found[1].tolist() == [3.0, 4.0] and found[2] is None
+
+    reopened = LocalChunkCache(path)
+    assert reopened.get_many(keys[1:2])[0].tolist() == [3.0, 4.0]
+    assert reopened.stats()["entries"] == 2
+
+
+def test_local_cache_sees_rows_written_by_another_process(tmp_path):
+    path = str(tmp_path / "chunks")
+    reader, writer = LocalChunkCache(path), LocalChunkCache(path)
+    key = chunk_key("model", "shared boilerplate")
+    assert reader.get_many([key]) == [None]
+    # Enough rows to make the writer grow the file past the reader's mapping.
+    writer.set_many([chunk_key("model", str(i)) for i in range(1500)], np.ones((1500, 2)))
+    writer.set_many([key], [[5.0, 6.0]])
+    assert reader.get_many([key])[0].tolist() == [5.0, 6.0]
+
+
+def test_local_cache_stops_growing_at_max_entries(tmp_path):
+    cache = LocalChunkCache(str(tmp_path / "chunks"), max_entries=2)
+    keys = [chunk_key("model", str(i)) for i in range(3)]
+    cache.set_many(keys, np.ones((3, 2)))
+    assert cache.stats()["entries"] == 2
+    assert cache.get_many(keys)[2] is None
+
+
+def test_chunk_keys_depend_on_model():
+    assert chunk_key("model-a", "text") != chunk_key("model-b", "text")
+    assert chunk_key("model-a", "text") == chunk_key("model-a", "text")
+
+
+def test_generate_embeddings_encodes_only_cache_misses(tmp_path):
+    model = FakeModel()
+    cache = LocalChunkCache(str(tmp_path / "chunks"))
+    with patch("utils._embedding_batcher", EmbeddingBatcher(max_wait_ms=0)), \
+            patch("utils.get_embedding_model", return_value=model):
+        first = generate_embeddings(["benefits", "python", "benefits"], cache)
+        second = generate_embeddings(["benefits", "golang"], cache)
+
+    assert model.calls == [["python", "benefits"], ["golang"]]
+    assert first == [[8.0, 1.0], [6.0, 1.0], [8.0, 1.0]]
+    assert second == [[8.0, 1.0], [6.0, 1.0]]
@@ -0,0 +1,131 @@
+import threading
+import time
+from unittest.mock import patch
+
+from chunking import chunk_text, iter_chunks
+from utils import token_counter
+
+
+def count(texts):
+    return [len(text.split()) for text in texts]
+
+
+def words(chunk):
+    return sum(count(chunk.split("\n"))) + chunk.count("\n") + 1
+
+
+RESUME = """Jane Doe
+jane@example.com
+
+Summary
+Backend engineer building data pipelines.
+
+Experience
+Acme Corp 2019 - 2024
+Built ingestion services in Python and Go.
+Led the migration to Kubernetes.
+
+Globex 2016 - 2019
+Maintained billing systems in Java.
+
+Education
+BSc Computer Science
+"""
+
+
+def test_sections_that_fit_stay_whole():
+    # The Experience section is 33 tokens counting newlines.
+    chunks = list(iter_chunks(RESUME, count, budget=34, overlap=0))
+    experience = [chunk for chunk in chunks if "Experience" in chunk]
+    assert len(experience) == 1
+    assert "Led the migration" in experience[0] and "Globex" in experience[0]
+    assert "Education" not in experience[0]
+
+
+def test_chunks_stay_within_budget_and_cover_all_lines():
+    text = "\n".join(f"Line {i} with a few extra words." for i in range(200))
+    chunks = list(iter_chunks(text, count, budget=30, overlap=8))
+    assert len(chunks) > 1
+    assert all(words(chunk) <= 30 for chunk in chunks)
+    for i in range(200):
+        assert any(f"Line {i} " in chunk for chunk in chunks)
+
+
+def test_chunks_inside_a_section_overlap():
+    text = "\n".join(f"Line {i} with a few extra words." for i in range(20))
+    chunks = list(iter_chunks(text, count, budget=30, overlap=16))
+    # Lines cost 8 tokens, so the last two lines (16) are carried over.
+    assert chunks[1].startswith("\n".join(chunks[0].split("\n")[-2:]) + "\n")
+
+
+def test_long_lines_are_split_at_sentences_then_words():
+    sentences = " ".join(f"Sentence {i} has five words." for i in range(40))
+    chunks = list(iter_chunks(sentences, count, budget=24, overlap=0))
+    assert len(chunks) > 1
+    assert all(words(chunk) <= 24 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+    chunks = list(iter_chunks("word " * 500, count, budget=24, overlap=0))
+    assert all(words(chunk) <= 24 for chunk in chunks)
+    assert sum(count(chunks)) == 500
+    # Word pieces fill the budget: the joining spaces are not extra tokens.
+    assert all(words(chunk) == 24 for chunk in chunks[:-1])
+
+
+def test_empty_text_has_no_chunks():
+    assert list(iter_chunks("", count, budget=10)) == []
+    assert list(iter_chunks("\n\n  \n", count, budget=10)) == []
+
+
+@patch("utils.get_embedding_model", return_value=None)
+def test_chunk_text_uses_default_counter_without_model(mock_model):
+    chunks = chunk_text(RESUME)
+    assert chunks and "Jane Doe" in chunks[0]
+
+
+class StatefulTokenizer:
+    """Like a fast tokenizer, keeps the last call's truncation setting on the object."""
+
+    def __init__(self):
+        self.max_length = None
+
+    def __call__(self, texts, add_special_tokens=True, truncation=False, max_length=None):
+        self.max_length = max_length if truncation else None
+        time.sleep(0.0002)
+        return {"input_ids": [text.split()[:self.max_length] for text in texts]}
+
+
+class TokenizingModel:
+    max_seq_length = 16
+
+    def __init__(self):
+        self.tokenizer = StatefulTokenizer()
+
+
+def test_token_counts_are_not_truncated_by_concurrent_encodes():
+    model = TokenizingModel()
+    text = " ".join(["word"] * 40)
+    counts, stop = [], threading.Event()
+
+    def encode():
+        # What model.encode does with the model's tokenizer on the batcher thread.
+        while not stop.is_set():
+            model.tokenizer([text], truncation=True, max_length=model.max_seq_length)
+
+    def count_many():
+        count, _ = token_counter()
+        for _ in range(50):
+            counts.extend(count([text, "two words"]))
+
+    with patch("utils.get_embedding_model", return_value=model):
+        encoder = threading.Thread(target=encode)
+        encoder.start()
+        counters = [threading.Thread(target=count_many) for _ in range(4)]
+        for thread in counters:
+            thread.start()
+        for thread in counters:
+            thread.join()
+        stop.set()
+        encoder.join()
+
+    assert counts == [40, 2] * 200
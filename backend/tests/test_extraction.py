@@ -0,0 +1,83 @@
+import io
+import os
+from concurrent.futures import Future
+
+import pytest
+from docx import Document
+from PyPDF2 import PdfWriter
+
+import extraction
+from extraction import DocumentLimitError, Spool, extract_text
+from utils import content_digest, new_content_digest
+
+
+def blank_pdf(pages: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_spool_moves_to_disk_and_hashes_incrementally():
+    content = b"x" * 2500
+    spool = Spool(max_bytes=10000, memory_bytes=1000, hasher=new_content_digest("resume.txt"))
+    for start in range(0, len(content), 500):
+        spool.write(content[start:start + 500])
+
+    assert spool.on_disk
+    assert spool.digest() == content_digest(content, "resume.txt")
+    assert extract_text(spool, "resume.txt") == content.decode()
+    path = spool.path
+    spool.close()
+    assert not os.path.exists(path)
+
+
+def test_spool_rejects_oversized_upload_early():
+    spool = Spool(max_bytes=100, memory_bytes=1000)
+    spool.write(b"x" * 100)
+    with pytest.raises(DocumentLimitError):
+        spool.write(b"x")
+
+
+def test_pdf_page_limit_is_checked_before_extraction(monkeypatch):
+    monkeypatch.setattr(extraction, "MAX_PDF_PAGES", 3)
+    with pytest.raises(DocumentLimitError):
+        extraction.extract_pdf(blank_pdf(4), max_pages=3)
+
+
+class FakePool:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def submit(self, fn, source, start, stop):
+        self.calls.append((start, stop))
+        future = Future()
+        future.set_result(fn(source, start, stop))
+        return future
+
+
+def test_pdf_pages_extracted_in_parallel_keep_order(monkeypatch):
+    monkeypatch.setattr(extraction, "EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(extraction, "PDF_PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(extraction, "_pdf_pool", None)
+    calls = []
+    monkeypatch.setattr(extraction, "get_pdf_pool", lambda: FakePool(calls))
+
+    assert extraction.extract_pdf(blank_pdf(5)) == "\n" * 5
+    assert calls == [(0, 3), (3, 5)]
+
+
+def test_docx_includes_tables_in_document_order():
+    doc = Document()
+    doc.add_paragraph("Skills")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Python"
+    table.cell(0, 1).text = "5 years"
+    table.cell(1, 0).merge(table.cell(1, 1)).text = "Docker"
+    doc.add_paragraph("Education")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+
+    assert extract_text(buffer.getvalue(), "resume.docx") == "Skills\nPython\t5 years\nDocker\nEducation\n"
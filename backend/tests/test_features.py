@@ -0,0 +1,48 @@
+import datetime
+
+from features import document_features, extract_features, find_sections
+
+RESUME = """Jane Doe
+Summary
+Backend engineer.
+
+Skills:
+Python, Go, Docker
+
+Experience
+Acme Corp  Jan 2018 - Present
+Beta Ltd  2015 - 2017
+
+Education
+BSc Computer Science
+"""
+
+
+def test_extracts_sections_skills_and_tokens():
+    features = extract_features(RESUME)
+
+    assert features["skills"] == ["Docker", "Go", "Python"]
+    assert features["token_count"] == len(RESUME) // 4
+    sections = find_sections(RESUME)
+    assert set(sections) == {"summary", "skills", "experience", "education"}
+    start, end = sections["skills"]
+    assert RESUME[start:end].strip() == "Python, Go, Docker"
+
+
+def test_document_features_fall_back_to_text_for_older_records():
+    assert document_features({"text": RESUME, "token_count": 7, "years_experience": 3, "features_version": 1}) == {
+        "token_count": 7, "years_experience": 3,
+    }
+    # Computed at upload and none found: not scanned for again.
+    assert document_features({"text": RESUME, "token_count": 7, "years_experience": None, "features_version": 1}) == {
+        "token_count": 7, "years_experience": None,
+    }
+    assert document_features({"text": RESUME}) == {
+        "token_count": len(RESUME) // 4, "years_experience": datetime.date.today().year - 2015,
+    }
+
+
+def test_years_experience_prefers_stated_years():
+    assert extract_features("Senior role, 5+ years of professional experience required.")["years_experience"] == 5
+    assert extract_features(RESUME)["years_experience"] == datetime.date.today().year - 2015
+    assert extract_features("No dates here")["years_experience"] is None
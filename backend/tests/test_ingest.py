@@ -0,0 +1,85 @@
+from ingest import SQLiteIngestQueue
+
+
+def test_sqlite_queue_hands_out_each_job_once(tmp_path):
+    queue = SQLiteIngestQueue(str(tmp_path / "ingest.db"), poll_interval=0.01)
+    queue.enqueue("a", "resume", "a.pdf", "digest-a", b"%PDF a")
+    queue.enqueue("b", "job", "job.txt", "digest-b", b"job text")
+    assert queue.depth() == 2
+
+    job, payload = queue.claim(timeout=0)
+    assert (job["id"], job["doc_type"], payload) == ("a", "resume", b"%PDF a")
+    assert queue.status("a")["status"] == "processing"
+
+    other = SQLiteIngestQueue(str(tmp_path / "ingest.db"), poll_interval=0.01)
+    job, _ = other.claim(timeout=0)
+    assert job["id"] == "b"
+    assert queue.claim(timeout=0.02) is None
+
+    queue.complete("a")
+    other.fail("b", "no text")
+    assert queue.status("a")["status"] == "completed"
+    failed = queue.status("b")
+    assert (failed["status"], failed["error"], failed["doc_type"]) == ("failed", "no text", "job")
+    assert queue.status("missing") is None
+
+
+def test_sqlite_queue_requeues_stale_jobs_then_gives_up(tmp_path, monkeypatch):
+    import ingest
+
+    queue = SQLiteIngestQueue(str(tmp_path / "ingest.db"), poll_interval=0.01)
+    queue.enqueue("a", "resume", "a.pdf", "digest-a", b"%PDF a")
+    monkeypatch.setattr(ingest, "INGEST_MAX_ATTEMPTS", 2)
+
+    job, _ = queue.claim(timeout=0)
+    assert queue.claim(timeout=0) is None
+
+    # The worker holding "a" died; once it is past the visibility timeout it is handed out again.
+    monkeypatch.setattr(ingest, "INGEST_VISIBILITY_TIMEOUT", -1)
+    job, payload = queue.claim(timeout=0)
+    assert (job["id"], payload) == ("a", b"%PDF a")
+    assert queue.status("a")["attempts"] == 2
+
+    assert queue.claim(timeout=0) is None
+    failed = queue.status("a")
+    assert failed["status"] == "failed" and "attempts" in failed["error"]
+
+
+def test_sqlite_queue_release_returns_job_without_counting_attempt(tmp_path):
+    queue = SQLiteIngestQueue(str(tmp_path / "ingest.db"), poll_interval=0.01)
+    queue.enqueue("a", "resume", "a.pdf", "digest-a", b"%PDF a")
+    job, _ = queue.claim(timeout=0)
+
+    queue.release(job["id"])
+    assert queue.status("a")["status"] == "queued"
+    assert queue.depth() == 1
+    job, payload = queue.claim(timeout=0)
+    assert (job["id"], payload) == ("a", b"%PDF a")
+    assert queue.status("a")["attempts"] == 1
+
+
+def test_cancelled_worker_returns_its_job(tmp_path, monkeypatch):
+    import asyncio
+
+    import main
+
+    queue = SQLiteIngestQueue(str(tmp_path / "ingest.db"), poll_interval=0.01)
+    queue.enqueue("a", "resume", "a.pdf", "digest-a", b"%PDF a")
+    started = asyncio.Event()
+
+    async def slow_job(job, payload):
+        started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(main, "get_ingest_queue", lambda: queue)
+    monkeypatch.setattr(main, "run_ingest_job", slow_job)
+
+    async def run():
+        worker = asyncio.ensure_future(main.ingest_worker(0))
+        await asyncio.wait_for(started.wait(), 5)
+        assert queue.status("a")["status"] == "processing"
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    asyncio.run(run())
+    assert queue.status("a")["status"] == "queued"
@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from llm import OpenRouterClient, RetryableLLMError
+
+
+def completion(content: str) -> dict:
+    return {"choices": [{"message": {"content": content}}]}
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+
+
+def test_retries_rate_limited_calls_then_succeeds():
+    statuses = iter([429, 503, 200])
+
+    def handler(request):
+        status = next(statuses)
+        assert json.loads(request.content)["messages"][0]["content"] == "prompt"
+        return httpx.Response(status, json=completion("ok") if status == 200 else {})
+
+    client = OpenRouterClient(transport=httpx.MockTransport(handler), max_retries=2, retry_base_delay=0.001)
+
+    assert asyncio.run(client.complete("prompt")) == "ok"
+    assert client.retries == 2
+
+
+def test_gives_up_after_max_retries():
+    client = OpenRouterClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(500)), max_retries=1, retry_base_delay=0.001
+    )
+
+    with pytest.raises(RetryableLLMError):
+        asyncio.run(client.complete("prompt"))
+    assert client.failures == 1
+
+
+def test_deadline_bounds_a_hung_call():
+    async def handler(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json=completion("late"))
+
+    client = OpenRouterClient(transport=httpx.MockTransport(handler), deadline=0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.complete("prompt"))
+
+
+def test_hedges_slow_requests_after_latency_percentile():
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, json=completion(f"answer {len(calls)}"))
+
+    client = OpenRouterClient(transport=httpx.MockTransport(handler), hedge_percentile=95, hedge_min_samples=3)
+    client._latencies.extend([0.01, 0.01, 0.02])
+
+    assert asyncio.run(client.complete("prompt")) == "answer 2"
+    assert client.hedges == 1
+
+
+def test_limits_concurrent_calls():
+    active = []
+    peak = []
+
+    async def handler(request):
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        return httpx.Response(200, json=completion("ok"))
+
+    client = OpenRouterClient(transport=httpx.MockTransport(handler), max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(client.complete("prompt") for _ in range(6)))
+
+    assert asyncio.run(burst()) == ["ok"] * 6
+    assert max(peak) == 2
+
+
+def test_stream_yields_deltas_and_retries_before_first_token():
+    statuses = iter([503, 200])
+    body = "".join(
+        f"data: {json.dumps({'choices': [{'delta': {'content': part}}]})}\n\n" for part in ["{\"match", "_score\": 80}"]
+    ) + ": keep-alive\n\ndata: [DONE]\n\n"
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        status = next(statuses)
+        return httpx.Response(status, content=body.encode() if status == 200 else b"")
+
+    client = OpenRouterClient(transport=httpx.MockTransport(handler), retry_base_delay=0.001)
+
+    async def collect():
+        return [delta async for delta in client.stream("prompt")]
+
+    assert asyncio.run(collect()) == ["{\"match", "_score\": 80}"]
+    assert client.retries == 1
+    assert client.in_flight == 0
@@ -1,7 +1,15 @@
+import asyncio
+import json
+import numpy as np
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi.testclient import TestClient
 import main
+import prescore
+import prompts
+import utils
+from chunk_cache import LocalChunkCache
+from fakes import FakeIndex
 from main import app
 
 client = TestClient(app)
@@ -13,11 +21,11 @@ def test_read_root():
 @patch("main.extract_text")
 @patch("main.chunk_text")
 @patch("main.generate_embeddings")
-@patch("main.get_pinecone_index")
+@patch("main.get_vector_index")
 @patch("main.cache_set")
 def test_upload_resume(mock_cache_set, mock_get_index, mock_gen_emb, mock_chunk, mock_extract):
     # Setup mocks
-    mock_extract.return_value = "dummy text"
+    mock_extract.return_value = "dummy resume text with enough content to pass the length check"
     mock_chunk.return_value = ["dummy chunk"]
     mock_gen_emb.return_value = [[0.1]*384]
     mock_get_index.return_value = None 
@@ -30,7 +38,7 @@ def test_upload_resume(mock_cache_set, mock_get_index, mock_gen_emb, mock_chunk,
 
 @patch("main.chunk_text")
 @patch("main.generate_embeddings")
-@patch("main.get_pinecone_index")
+@patch("main.get_vector_index")
 @patch("main.cache_set")
 def test_upload_job_text(mock_cache_set, mock_get_index, mock_gen_emb, mock_chunk):
     # Setup mocks
@@ -44,18 +52,124 @@ def test_upload_job_text(mock_cache_set, mock_get_index, mock_gen_emb, mock_chun
     data = response.json()
     assert "job_id" in data
 
+def test_unusable_chunk_cache_path_embeds_uncached(monkeypatch, tmp_path):
+    (tmp_path / "file").write_text("")
+    monkeypatch.setattr(main, "CHUNK_CACHE_BACKEND", "local")
+    monkeypatch.setattr(main, "CHUNK_CACHE_PATH", str(tmp_path / "file" / "chunk_cache"))
+    monkeypatch.setattr(main, "chunk_cache", None)
+    monkeypatch.setattr(main, "chunk_cache_failed", False)
+    opened = []
+    monkeypatch.setattr(main, "LocalChunkCache", lambda path: opened.append(path) or LocalChunkCache(path))
+
+    assert main.get_chunk_cache() is None
+    assert main.get_chunk_cache() is None
+    assert len(opened) == 1
+
+@patch("main.chunk_text")
+@patch("main.generate_embeddings")
+def test_unusable_local_index_path_means_no_index(mock_gen_emb, mock_chunk, monkeypatch, tmp_path):
+    mock_chunk.return_value = ["dummy chunk"]
+    mock_gen_emb.return_value = [[0.1]*384]
+    (tmp_path / "file").write_text("")
+    monkeypatch.setattr(main, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(main, "LOCAL_INDEX_PATH", str(tmp_path / "file" / "vector_index"))
+    monkeypatch.setattr(main, "local_index", None)
+
+    assert main.get_vector_index() is None
+    response = client.post("/upload/job", data={"text": "Data Engineer position requiring Spark and Airflow"})
+    assert response.status_code == 200
+
+@patch("main.chunk_text")
+@patch("main.generate_embeddings")
+@patch("main.get_vector_index")
+def test_upload_job_queued_then_processed_by_worker(mock_get_index, mock_gen_emb, mock_chunk, monkeypatch, tmp_path):
+    mock_chunk.return_value = ["dummy chunk"]
+    mock_gen_emb.return_value = [[0.1]*384]
+    mock_get_index.return_value = None
+    monkeypatch.setattr(main, "INGEST_MODE", "queue")
+    monkeypatch.setattr(main, "ingest_queue", main.SQLiteIngestQueue(str(tmp_path / "ingest.db")))
+
+    response = client.post("/upload/job", data={"text": "Platform Engineer position requiring Go and Kubernetes"})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json()["status"] == "queued"
+    assert client.get(f"/results/{job_id}").json()["status"] == "queued"
+    mock_chunk.assert_not_called()
+
+    job, payload = main.ingest_queue.claim(timeout=0)
+    asyncio.run(main.run_ingest_job(job, payload))
+    main.ingest_queue.complete(job["id"])
+
+    assert client.get(f"/results/{job_id}").json() == {"job_id": job_id, "status": "completed", "doc_type": "job", "error": None}
+    assert main.load_document("job", job_id, ("text",))["text"].startswith("Platform Engineer")
+
+def test_results_unknown_upload():
+    assert client.get("/results/does-not-exist").status_code == 404
+
+@patch("main.chunk_text")
+@patch("main.generate_embeddings")
+@patch("main.get_vector_index")
+def test_upload_job_reuses_identical_content(mock_get_index, mock_gen_emb, mock_chunk):
+    mock_chunk.return_value = ["dummy chunk"]
+    mock_gen_emb.return_value = [[0.1]*384]
+    mock_get_index.return_value = None
+
+    data = {"text": "Data Engineer position requiring Spark, Airflow and SQL"}
+    first = client.post("/upload/job", data=data).json()
+    second = client.post("/upload/job", data=data).json()
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["job_id"] == first["job_id"]
+    assert mock_gen_emb.call_count == 1
+
+@patch("main.chunk_text")
+@patch("main.generate_embeddings")
+@patch("main.get_vector_index")
+def test_upload_job_upserts_after_response(mock_get_index, mock_gen_emb, mock_chunk, monkeypatch):
+    monkeypatch.setattr("main.PINECONE_ASYNC_UPSERT", True)
+    index = FakeIndex()
+    mock_get_index.return_value = index
+    mock_chunk.return_value = ["chunk one", "chunk two"]
+    mock_gen_emb.return_value = [[0.1]*8, [0.2]*8]
+
+    data = {"text": "Backend Engineer position requiring Go and Kubernetes"}
+    response = client.post("/upload/job", data=data)
+
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+    assert f"job:{job_id}:1" in index.vectors
+
+@patch("main.chunk_text")
+def test_upload_rejected_when_queue_full(mock_chunk, monkeypatch):
+    monkeypatch.setattr("executors.MAX_PENDING_UPLOADS", 0)
+
+    data = {"text": "Software Engineer position requiring Python and React"}
+    response = client.post("/upload/job", data=data)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    mock_chunk.assert_not_called()
+
+def test_upload_rejects_oversized_body(monkeypatch):
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 0)
+    monkeypatch.setattr(main, "UPLOAD_READ_SIZE", 0)
+
+    files = {"file": ("resume.txt", b"x" * 1024, "text/plain")}
+    response = client.post("/upload/resume", files=files)
+    assert response.status_code == 413
+
+@patch("main.load_documents")
 @patch("main.cache_get")
-@patch("main.get_pinecone_index")
-@patch("main.call_openrouter")
+@patch("main.get_vector_index")
+@patch("main.call_openrouter", new_callable=AsyncMock)
 @patch("main.cache_set")
-def test_match(mock_cache_set, mock_openrouter, mock_get_index, mock_cache_get):
+def test_match(mock_cache_set, mock_openrouter, mock_get_index, mock_cache_get, mock_load_documents):
     # Mock cache retrieval
-    def side_effect(key):
-        if "text:job" in key: return "Job Description: Python developer"
-        if "embeddings:job" in key: return [[0.1]*384]
-        if "text:resume" in key: return "Resume: I know Python"
-        return None
-    mock_cache_get.side_effect = side_effect
+    mock_cache_get.return_value = None
+    mock_load_documents.return_value = [
+        {"text": "Job Description: Python developer", "embeddings": np.full((1, 384), 0.1, dtype=np.float32)},
+        {"text": "Resume: I know Python"},
+    ]
     
     mock_get_index.return_value = None 
     
@@ -69,4 +183,400 @@ def test_match(mock_cache_set, mock_openrouter, mock_get_index, mock_cache_get):
     result = response.json()
     assert "match_score" in result
     assert "matching_skills" in result
-    assert isinstance(result["matching_skills"], list)
\ No newline at end of file
+    assert isinstance(result["matching_skills"], list)
+
+@patch("main.load_documents")
+@patch("main.cache_get")
+@patch("main.call_openrouter", new_callable=AsyncMock)
+@patch("main.cache_set")
+def test_match_fast_path_skips_llm_for_clear_cut_pairs(mock_cache_set, mock_openrouter, mock_cache_get, mock_load_documents, monkeypatch):
+    monkeypatch.setattr(prescore, "FAST_PATH_CALIBRATED", True)
+    mock_cache_get.return_value = None
+    embeddings = np.eye(3, 384, dtype=np.float32)
+    mock_load_documents.return_value = [
+        {"text": "Python, Docker, AWS", "embeddings": embeddings, "skills": ["aws", "docker", "python"]},
+        {"text": "Cooking and baking", "embeddings": np.eye(1, 384, 200, dtype=np.float32), "skills": []},
+    ]
+
+    response = client.post("/match", json={"resume_id": "cook", "job_id": "python-job"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["match_score"] == 0
+    assert result["missing_skills"] == ["aws", "docker", "python"]
+    mock_openrouter.assert_not_called()
+    mock_cache_set.assert_called_once()
+
+def test_fast_path_skipped_for_dummy_embeddings(monkeypatch):
+    monkeypatch.setattr(prescore, "FAST_PATH_CALIBRATED", True)
+    ats_result = {"match_score": 0, "matching_skills": [], "missing_skills": ["aws", "docker", "python"]}
+    dummy = np.array([utils.DUMMY_EMBEDDING], dtype=np.float16)
+    assert main.fast_path_match(np.eye(3, 1024), dummy, ats_result) is None
+    assert main.fast_path_match(dummy, np.eye(1, 1024, 200), ats_result) is None
+    assert main.fast_path_match(np.eye(3, 1024), np.eye(1, 1024, 200), ats_result)["match_score"] == 0
+
+def test_match_prompt_keeps_relevant_resume_chunks_within_budget(monkeypatch):
+    chunks = ["python " * 300, "cooking " * 300, "golang " * 300]
+    resume = {"chunks": chunks, "embeddings": np.array([[1, 0, 0], [0, 1, 0], [0.6, 0, 0.8]], dtype=np.float32)}
+    monkeypatch.setattr(main, "get_vector_index", lambda: None)
+    monkeypatch.setattr(main, "load_document", lambda doc_type, doc_id, fields: resume)
+    monkeypatch.setattr(main, "content_budget", lambda: 1200)
+
+    prompt = asyncio.run(main.build_match_prompt(
+        "test-resume", "test-job", "Python developer", np.array([[1, 0, 0]], dtype=np.float32), "".join(chunks),
+    ))
+    assert prompt.startswith(prompts.MATCH_PROMPT_PREFIX)
+    assert "python" in prompt and "golang" in prompt and "cooking" not in prompt
+
+@patch("main.load_documents")
+@patch("main.cache_get")
+@patch("main.get_vector_index")
+@patch("main.cache_set")
+def test_match_stream(mock_cache_set, mock_get_index, mock_cache_get, mock_load_documents):
+    mock_cache_get.return_value = None
+    mock_load_documents.return_value = [
+        {"text": "Job Description: Python developer", "embeddings": np.full((1, 384), 0.1, dtype=np.float32)},
+        {"text": "Resume: I know Python"},
+    ]
+    mock_get_index.return_value = None
+
+    async def fake_stream(prompt):
+        for part in ['{"match_score": 85, "matching_skills": ["Python"], ', '"missing_skills": [], "ats_suggestions": [], "learning_resources": []}']:
+            yield part
+
+    with patch("main.stream_openrouter", fake_stream):
+        response = client.post("/match/stream", json={"resume_id": "test-resume", "job_id": "test-job"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in response.text.strip().split("\n\n")
+    ]
+    assert [name for name, _ in events] == ["ats", "token", "token", "result"]
+    assert events[-1][1]["match_score"] == 85
+    mock_cache_set.assert_called_once()
+
+def test_concurrent_identical_matches_share_one_llm_call(monkeypatch):
+    calls = []
+
+    async def slow_llm(prompt):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return '{"match_score": 70, "matching_skills": [], "missing_skills": [], "ats_suggestions": [], "learning_resources": []}'
+
+    monkeypatch.setattr(main, "call_openrouter", slow_llm)
+    monkeypatch.setattr(main, "get_vector_index", lambda: None)
+    monkeypatch.setattr(main, "cache_get", lambda key: None)
+    monkeypatch.setattr(main, "cache_set", lambda key, value, expire=3600: None)
+    monkeypatch.setattr(main, "acquire_lock", lambda key, ttl: "token")
+    monkeypatch.setattr(main, "release_lock", lambda key, token: None)
+
+    async def run():
+        embeddings = np.full((1, 384), 0.1, dtype=np.float32)
+        return await asyncio.gather(*[
+            main.compute_match("r1", "j1", "Python developer", embeddings, "I know Python") for _ in range(5)
+        ])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result["match_score"] == 70 for result in results)
+    assert not main.inflight_matches
+
+def test_match_waits_for_lease_held_by_another_replica(monkeypatch):
+    cached = {"match_score": 55, "matching_skills": [], "missing_skills": [], "ats_suggestions": [], "learning_resources": []}
+    lookups = []
+    llm = AsyncMock()
+
+    def fake_cache_get(key):
+        lookups.append(key)
+        return cached if len(lookups) > 2 else None
+
+    monkeypatch.setattr(main, "call_openrouter", llm)
+    monkeypatch.setattr(main, "cache_get", fake_cache_get)
+    monkeypatch.setattr(main, "acquire_lock", lambda key, ttl: None)
+    monkeypatch.setattr(main, "MATCH_LOCK_POLL_INTERVAL", 0.001)
+
+    result = asyncio.run(main.compute_match("r2", "j2", "job", np.zeros((1, 4)), "resume"))
+    assert result == cached
+    llm.assert_not_called()
+
+def test_match_stream_waits_for_lease_held_by_another_replica(monkeypatch):
+    cached = {"match_score": 55, "matching_skills": [], "missing_skills": [], "ats_suggestions": [], "learning_resources": []}
+    lookups = []
+
+    def fake_cache_get(key):
+        lookups.append(key)
+        return cached if len(lookups) > 2 else None
+
+    async def no_stream(prompt):
+        raise AssertionError("the LLM should not be called")
+        yield
+
+    monkeypatch.setattr(main, "load_documents", lambda requests: [
+        {"text": "Job Description: Python developer", "embeddings": np.full((1, 384), 0.1, dtype=np.float32)},
+        {"text": "Resume: I know Python"},
+    ])
+    monkeypatch.setattr(main, "get_vector_index", lambda: None)
+    monkeypatch.setattr(main, "cache_get", fake_cache_get)
+    monkeypatch.setattr(main, "acquire_lock", lambda key, ttl: None)
+    monkeypatch.setattr(main, "stream_openrouter", no_stream)
+    monkeypatch.setattr(main, "MATCH_LOCK_POLL_INTERVAL", 0.001)
+
+    response = client.post("/match/stream", json={"resume_id": "r3", "job_id": "j3"})
+    names = [block.split("\n")[0][len("event: "):] for block in response.text.strip().split("\n\n")]
+    assert names == ["ats", "result"]
+    assert json.loads(response.text.strip().split("\n\n")[-1].split("\n")[1][len("data: "):])["match_score"] == 55
+    assert not main.inflight_matches
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+        self.ttls[key] = ex if ex is not None else -1
+
+    def ttl(self, key):
+        return self.ttls.get(key, -1) if key in self.store else -2
+
+    def hset(self, key, mapping):
+        self.store.setdefault(key, {}).update(mapping)
+
+    def hmget(self, key, fields):
+        record = self.store.get(key, {})
+        return [record.get(field) for field in fields]
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def zadd(self, key, mapping):
+        self.store.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.store.get(key, {})
+        for member in [m for m, score in members.items() if score <= high]:
+            del members[member]
+
+    def zcard(self, key):
+        return len(self.store.get(key, {}))
+
+    def zpopmin(self, key, count):
+        members = self.store.get(key, {})
+        popped = sorted(members.items(), key=lambda item: item[1])[:count]
+        for member, _ in popped:
+            del members[member]
+        return popped
+
+
+def test_documents_round_trip_in_one_pipeline():
+    fake = FakeRedis()
+    main.memory_cache.clear()
+    embeddings = np.array([[0.5, 0.25], [1.0, 0.0]], dtype=np.float32)
+
+    with patch("main.init_redis_binary", return_value=fake):
+        main.save_document("job", "j1", {"text": "Job text", "chunks": ["Job text"], "embeddings": embeddings})
+        main.save_document("resume", "r1", {"text": "Resume text", "chunks": ["Resume text"], "embeddings": embeddings})
+        main.memory_cache.clear()
+        fake.round_trips = 0
+        job, resume = main.load_documents([("job", "j1", ("text", "embeddings")), ("resume", "r1", ("text", "chunks"))])
+
+    assert fake.round_trips == 1
+    assert job["text"] == "Job text"
+    np.testing.assert_array_equal(job["embeddings"], embeddings)
+    assert resume == {"text": "Resume text", "chunks": ["Resume text"]}
+
+
+def test_load_document_reads_legacy_keys():
+    fake = FakeRedis()
+    fake.store["text:job:legacy"] = b"Legacy job text"
+    fake.store["embeddings:job:legacy"] = json.dumps([[0.5, 0.25], [1.0, 0.0]]).encode()
+    main.memory_cache.clear()
+
+    with patch("main.init_redis_binary", return_value=fake):
+        record = main.load_document("job", "legacy", ("text", "embeddings"))
+
+    assert record["text"] == "Legacy job text"
+    np.testing.assert_array_equal(record["embeddings"], np.array([[0.5, 0.25], [1.0, 0.0]], dtype=np.float32))
+
+
+def test_load_document_migrates_json_embeddings_keeping_ttl():
+    fake = FakeRedis()
+    fake.set("embeddings:job:legacy", json.dumps([[0.5, 0.25], [1.0, 0.0]]).encode(), ex=600)
+    fake.hset("doc:resume:r9", mapping={"text": b"Resume", "embeddings": json.dumps([[1.0, 0.0]]).encode()})
+    main.memory_cache.clear()
+
+    with patch("main.init_redis_binary", return_value=fake):
+        main.load_documents([("job", "legacy", ("embeddings",)), ("resume", "r9", ("text", "embeddings"))])
+        main.memory_cache.clear()
+        job, resume = main.load_documents([("job", "legacy", ("embeddings",)), ("resume", "r9", ("text", "embeddings"))])
+
+    assert fake.store["embeddings:job:legacy"].startswith(b"MPE1")
+    assert fake.ttl("embeddings:job:legacy") == 600
+    assert fake.store["doc:resume:r9"]["embeddings"].startswith(b"MPE1")
+    np.testing.assert_array_equal(job["embeddings"], np.array([[0.5, 0.25], [1.0, 0.0]], dtype=np.float32))
+    np.testing.assert_array_equal(resume["embeddings"], np.array([[1.0, 0.0]], dtype=np.float32))
+
+
+@patch("main.get_vector_index")
+@patch("main.call_openrouter", new_callable=AsyncMock)
+def test_match_batch_prerank_and_stream(mock_openrouter, mock_get_index):
+    mock_get_index.return_value = None
+    mock_openrouter.return_value = '{"match_score": 70, "matching_skills": ["Python"], "missing_skills": [], "ats_suggestions": [], "learning_resources": []}'
+    main.memory_cache.clear()
+    main.save_document("job", "batch-job", {"text": "Python developer", "embeddings": [[1.0, 0.0, 0.0]], "skills": ["Python"]})
+    main.save_document("resume", "close", {"text": "Python resume", "embeddings": [[0.9, 0.1, 0.0]]})
+    main.save_document("resume", "medium", {"text": "Some Python", "embeddings": [[0.5, 0.5, 0.0]]})
+    main.save_document("resume", "far", {"text": "Painter", "embeddings": [[0.0, 0.0, 1.0]], "skills": []})
+
+    response = client.post("/match/batch", json={
+        "job_id": "batch-job",
+        "resume_ids": ["far", "close", "ghost", "medium"],
+        "top_k": 2,
+    })
+
+    assert response.status_code == 200
+    lines = {item["resume_id"]: item for item in map(json.loads, response.text.splitlines())}
+    assert lines["ghost"]["status"] == "not_found"
+    assert lines["far"]["status"] == "ranked_out"
+    assert lines["far"]["rank"] == 3
+    assert lines["far"]["skill_coverage"] == 0.0
+    assert lines["close"]["rank"] == 1
+    assert lines["close"]["status"] == "matched"
+    assert lines["close"]["result"]["match_score"] == 70
+    assert lines["medium"]["status"] == "matched"
+    assert mock_openrouter.call_count == 2
+    assert main.cache_get("result:close:batch-job")["match_score"] == 70
+
+
+def test_match_batch_requires_one_direction():
+    response = client.post("/match/batch", json={"job_id": "j", "resume_id": "r"})
+    assert response.status_code == 400
+
+@patch("main.load_documents")
+@patch("main.cache_get")
+@patch("main.get_vector_index")
+@patch("main.call_openrouter", new_callable=AsyncMock)
+@patch("main.cache_set")
+def test_metrics_report_match_stages_and_routes(mock_cache_set, mock_openrouter, mock_get_index, mock_cache_get, mock_load_documents):
+    mock_cache_get.return_value = None
+    mock_load_documents.return_value = [
+        {"text": "Job Description: Python developer", "embeddings": np.full((1, 384), 0.1, dtype=np.float32)},
+        {"text": "Resume: I know Python"},
+    ]
+    mock_get_index.return_value = None
+    mock_openrouter.return_value = '{"match_score": 85, "matching_skills": ["Python"], "missing_skills": [], "ats_suggestions": [], "learning_resources": []}'
+
+    assert client.post("/match", json={"resume_id": "metrics-resume", "job_id": "metrics-job"}).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    for stage_name in ("prompt", "llm", "parse"):
+        assert f'matchpoint_stage_seconds_count{{stage="{stage_name}"}}' in body
+    assert 'matchpoint_http_request_seconds_count{method="POST",route="/match",status="200"}' in body
+    assert 'matchpoint_fallbacks_total{reason="resume_text"}' in body
+    assert "matchpoint_uploads_pending 0" in body
+
+def test_profile_requested_per_request(monkeypatch, tmp_path):
+    import profiler
+    monkeypatch.setattr(main, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiler, "PROFILE_DIR", str(tmp_path))
+
+    response = client.get("/ping?profile=1")
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert client.get(f"/profiles/{profile_id}").status_code == 200
+    assert "X-Profile-Id" not in client.get("/ping").headers
+    assert client.get("/profiles/unknown").status_code == 404
+
+
+def test_identical_documents_reuse_cached_llm_analysis(monkeypatch):
+    llm = AsyncMock(return_value='{"match_score": 64, "matching_skills": ["Python"], "missing_skills": [], '
+                                 '"ats_suggestions": [], "learning_resources": []}')
+    monkeypatch.setattr(main, "call_openrouter", llm)
+    monkeypatch.setattr(main, "get_vector_index", lambda: None)
+    monkeypatch.setattr(main, "init_redis", lambda: None)
+    main.memory_cache.clear()
+    embeddings = np.full((1, 384), 0.1, dtype=np.float32)
+
+    async def run(resume_id, job_id, resume_text):
+        return await main.compute_match(resume_id, job_id, "Python developer needed", embeddings, resume_text)
+
+    first = asyncio.run(run("r-old", "j-old", "I write  Python\nevery day"))
+    # Same content under new ids (and different whitespace) is served from the cache.
+    second = asyncio.run(run("r-new", "j-new", "I write Python every day"))
+    assert first["match_score"] == second["match_score"] == 64
+    assert llm.call_count == 1
+    assert main.cache_get("result:r-new:j-new")["match_score"] == 64
+
+    asyncio.run(run("r-other", "j-old", "I write Go every day"))
+    assert llm.call_count == 2
+
+
+def test_llm_cache_evicts_oldest_entries_in_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(main, "init_redis", lambda: fake)
+    monkeypatch.setattr(main, "LLM_CACHE_MAX_ENTRIES", 2)
+    main.memory_cache.clear()
+
+    for i in range(3):
+        main.llm_cache_set(f"llmresp:{i}", {"match_score": i})
+
+    assert "llmresp:0" not in fake.store
+    assert json.loads(fake.store["llmresp:2"]) == {"match_score": 2}
+    assert set(fake.store[main.LLM_CACHE_INDEX]) == {"llmresp:1", "llmresp:2"}
+
+
+def test_match_prompt_uses_stored_token_counts(monkeypatch):
+    loads = []
+
+    def fake_load(doc_type, doc_id, fields):
+        loads.append(doc_type)
+        return None
+
+    monkeypatch.setattr(main, "get_vector_index", lambda: None)
+    monkeypatch.setattr(main, "load_document", fake_load)
+    embeddings = np.array([[1, 0, 0]], dtype=np.float32)
+
+    asyncio.run(main.build_match_prompt("r", "j", "Python developer", embeddings, "I know Python"))
+    assert loads == []
+    # A stored count over budget makes the job side fetch chunks to trim with.
+    asyncio.run(main.build_match_prompt("r", "j", "Python developer", embeddings, "I know Python",
+                                        job_tokens=10 ** 6, resume_tokens=3))
+    assert loads == ["job"]
+
+
+def test_redis_pool_waits_for_a_free_connection():
+    import redis
+
+    pool = main._redis_pool(decode_responses=False)
+    assert isinstance(pool, redis.BlockingConnectionPool)
+    assert pool.max_connections >= main.IO_WORKERS + main.PARSE_WORKERS + main.EMBED_WORKERS
@@ -0,0 +1,47 @@
+from metrics import Counter, Gauge, Histogram, REGISTRY, render
+
+
+def _lines(metric):
+    try:
+        return metric.render()
+    finally:
+        REGISTRY.remove(metric)
+
+
+def test_counter_and_callback_gauge_render_prometheus_text():
+    counter = Counter("test_requests_total", "Requests.", ("result",))
+    counter.inc(result="hit")
+    counter.inc(2, result="hit")
+    assert _lines(counter) == [
+        "# HELP test_requests_total Requests.",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{result="hit"} 3',
+    ]
+    gauge = Gauge("test_depth", "Depth.", fn=lambda: 7)
+    assert _lines(gauge)[-1] == "test_depth 7"
+    # None means "not applicable" and is left out.
+    assert len(_lines(Gauge("test_unset", "Unset.", fn=lambda: None))) == 2
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, stage="llm")
+    lines = _lines(histogram)
+    assert 'test_seconds_bucket{stage="llm",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="llm",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{stage="llm",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{stage="llm"} 4' in lines
+    assert 'test_seconds_sum{stage="llm"} 3.65' in lines
+
+
+def test_stage_decorator_times_each_call():
+    from metrics import STAGE_SECONDS, stage
+
+    @stage("test_stage")
+    def work():
+        return 42
+
+    assert work() == 42 and work() == 42
+    assert 'matchpoint_stage_seconds_count{stage="test_stage"} 2' in render()
+    assert STAGE_SECONDS in REGISTRY
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import prescore as module
+from prescore import ACCEPT, REJECT, coverage_score, fast_path_decision, prescore
+
+JOB = np.array([[1, 0, 0], [0, 1, 0]], dtype=np.float32)
+
+
+@pytest.fixture
+def calibrated(monkeypatch):
+    monkeypatch.setattr(module, "FAST_PATH_CALIBRATED", True)
+
+
+def test_coverage_score_maps_cosine_onto_percent():
+    assert coverage_score(JOB, JOB) == 100
+    assert coverage_score(JOB, np.array([[0, 0, 1]], dtype=np.float32)) == 0
+
+
+def test_prescore_blends_skills_and_coverage():
+    assert prescore(JOB, JOB, 100) == 100
+    assert prescore(JOB, np.array([[0, 0, 1]], dtype=np.float32), 0) == 0
+    assert 0 < prescore(JOB, JOB, 0) < 100
+
+
+def test_fast_path_decision_only_for_clear_cut_scores(calibrated):
+    assert fast_path_decision(95, job_skill_count=5) == ACCEPT
+    assert fast_path_decision(5, job_skill_count=5) == REJECT
+    assert fast_path_decision(50, job_skill_count=5) is None
+    # Too few job skills to trust the keyword signal.
+    assert fast_path_decision(95, job_skill_count=1) is None
+
+
+def test_fast_path_does_not_accept_too_little_experience(calibrated):
+    assert fast_path_decision(95, job_skill_count=5, job_years=5, resume_years=2) is None
+    assert fast_path_decision(95, job_skill_count=5, job_years=5, resume_years=6) == ACCEPT
+    assert fast_path_decision(95, job_skill_count=5, job_years=5, resume_years=None) == ACCEPT
+    assert fast_path_decision(5, job_skill_count=5, job_years=5, resume_years=2) == REJECT
+
+
+def test_fast_path_off_for_uncalibrated_models():
+    # all-roberta-large-v1, the default model, has no measured calibration yet.
+    assert "all-roberta-large-v1" not in module.COVERAGE_CALIBRATION
+    assert not module.FAST_PATH_CALIBRATED
+    assert fast_path_decision(95, job_skill_count=5) is None
+    assert fast_path_decision(5, job_skill_count=5) is None
@@ -0,0 +1,74 @@
+import numpy as np
+
+import prompts
+from metrics import render
+from prompts import (
+    MATCH_PROMPT_PREFIX, fit_text, query_scores, render_match_prompt, response_cache_key, select_chunks, truncate_text,
+)
+
+
+def test_prompt_starts_with_static_prefix():
+    first = render_match_prompt("Python developer", "Jane knows Python")
+    second = render_match_prompt("Go developer", "John knows Go")
+    assert first.startswith(MATCH_PROMPT_PREFIX) and second.startswith(MATCH_PROMPT_PREFIX)
+    assert '"match_score": number' in MATCH_PROMPT_PREFIX
+    assert first.index("Job Description:") < first.index("Resume:")
+
+
+def test_select_chunks_keeps_best_in_document_order():
+    chunks = ["a" * 40, "b" * 40, "c" * 40]
+    kept, dropped = select_chunks(chunks, [0.1, 0.9, 0.5], budget=20)
+    assert kept == ["b" * 40, "c" * 40]
+    assert dropped == 1
+
+
+def test_fit_text_leaves_short_text_alone():
+    assert fit_text("short text", 100) == ("short text", False, 0)
+
+
+def test_fit_text_truncates_at_whitespace_without_chunks():
+    text = "word " * 100
+    trimmed, truncated, dropped = fit_text(text, 10)
+    assert truncated and dropped == 0
+    assert len(trimmed) <= 40 and trimmed.endswith("word")
+    assert truncate_text(text, 1000) == text
+
+
+def test_fit_text_ranks_chunks_by_query_similarity():
+    chunks = ["python " * 10, "cooking " * 10, "golang " * 10]
+    embeddings = np.array([[1, 0, 0], [0, 1, 0], [0.6, 0, 0.8]], dtype=np.float32)
+    scores = query_scores(embeddings, np.array([[1, 0, 0]], dtype=np.float32))
+    text, truncated, dropped = fit_text("".join(chunks), 40, chunks, scores)
+    assert truncated and dropped == 1
+    assert text == chunks[0] + "\n" + chunks[2]
+
+
+def test_prompt_stats_track_sizes_and_truncation():
+    stats = prompts.PromptStats()
+    stats.record("x" * 400, job_truncated=True, resume_truncated=False, dropped_chunks=3)
+    stats.record("x" * 200, job_truncated=False, resume_truncated=True, dropped_chunks=0)
+    snapshot = stats.stats()
+    assert snapshot["builds"] == 2
+    assert snapshot["max_tokens"] == 100 and snapshot["last_tokens"] == 50 and snapshot["avg_tokens"] == 75
+    assert snapshot["job_truncated"] == 1 and snapshot["resume_truncated"] == 1
+    assert snapshot["dropped_chunks"] == 3
+
+
+def test_prompt_stats_are_exported_to_metrics():
+    before = render()
+    prompts.PromptStats().record("x" * 400, job_truncated=True, resume_truncated=False, dropped_chunks=0)
+    after = render()
+
+    def value(text, sample):
+        return float(next((line.split()[-1] for line in text.splitlines() if line.startswith(sample + " ")), 0))
+
+    assert value(after, "matchpoint_prompt_estimated_tokens_count") == value(before, "matchpoint_prompt_estimated_tokens_count") + 1
+    assert value(after, 'matchpoint_prompt_truncations_total{part="job"}') == value(before, 'matchpoint_prompt_truncations_total{part="job"}') + 1
+
+
+def test_response_cache_key_ignores_whitespace_but_not_model_or_content():
+    key = response_cache_key("model-a", render_match_prompt("Python developer", "Jane knows Python"))
+    assert key.startswith("llmresp:")
+    assert key == response_cache_key("model-a", render_match_prompt("Python  developer\n", "Jane knows\tPython"))
+    assert key != response_cache_key("model-b", render_match_prompt("Python developer", "Jane knows Python"))
+    assert key != response_cache_key("model-a", render_match_prompt("Python developer", "Jane knows Go"))
@@ -0,0 +1,22 @@
+from skills import SkillMatcher, extract_skills, _trie_pattern
+
+
+def test_matches_terms_on_boundaries_only():
+    assert extract_skills("Google ingest pipelines, tsconfig, nodemon and airflow") == []
+    assert extract_skills("Go, TS and AI experience") == ["Go", "Machine Learning", "TypeScript"]
+
+
+def test_prefers_longest_term_and_keeps_contained_skills():
+    assert extract_skills("Built services on Node.js") == ["JavaScript", "Node.js"]
+    assert extract_skills("Pipelines in GitHub Actions") == ["CI/CD", "Git"]
+    assert extract_skills("C++ and C#") == ["C++"]
+
+
+def test_custom_taxonomy():
+    matcher = SkillMatcher({"Terraform": ["terraform", "tf"], "Helm": ["helm"]})
+    assert matcher.extract("Terraform modules and Helm charts") == {"Terraform", "Helm"}
+    assert matcher.extract("helmet") == set()
+
+
+def test_trie_pattern_shares_prefixes():
+    assert _trie_pattern(["node", "node.js", "nodejs"]) == r"node(?:(?:\.js|js))?"
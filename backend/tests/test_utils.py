@@ -0,0 +1,134 @@
+import threading
+from unittest.mock import patch
+
+import numpy as np
+
+import utils
+from fakes import FakeIndex
+from utils import EmbeddingBatcher
+from vector_store import LocalIndex
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_batcher_coalesces_concurrent_requests():
+    model = FakeModel()
+    batcher = EmbeddingBatcher(max_batch=64, max_wait_ms=200)
+    requests = [["aaaa", "b"], ["ccc"], ["dd", "eeeee", "f"]]
+    results = [None] * len(requests)
+
+    def submit(i):
+        results[i] = batcher.submit(requests[i]).result(timeout=5)
+
+    with patch("utils.get_embedding_model", return_value=model):
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(requests))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(model.calls) == 1
+    assert model.calls[0] == sorted(model.calls[0], key=len)
+    for chunks, vectors in zip(requests, results):
+        assert [v[0] for v in vectors] == [float(len(c)) for c in chunks]
+
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["requests"] == 3
+    assert stats["last_batch_size"] == 6
+    assert stats["queue_depth"] == 0
+
+
+def test_generate_embeddings_falls_back_when_model_missing():
+    with patch("utils.get_embedding_model", return_value=None):
+        embeddings = utils.generate_embeddings(["one", "two"])
+    assert len(embeddings) == 2
+    assert len(embeddings[0]) == 1024
+
+
+def test_store_embeddings_upserts_in_bounded_batches(monkeypatch):
+    monkeypatch.setattr("utils.PINECONE_UPSERT_BATCH_SIZE", 2)
+    index = FakeIndex()
+    chunks = [f"chunk {i}" for i in range(5)]
+    embeddings = [[float(i), 1.0] for i in range(5)]
+
+    assert utils.store_embeddings(index, embeddings, chunks, "doc-1", "resume")
+
+    assert index.upsert_calls == [2, 2, 1]
+    assert index.vectors["resume:doc-1:4"][1] == {"text": "chunk 4", "doc_id": "doc-1", "doc_type": "resume"}
+
+
+def test_warm_up_loads_model_once_and_encodes():
+    model = FakeModel()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return model
+
+    with patch("utils.load_embedding_model", load), patch("utils._model_cache", None):
+        assert utils.warm_up_embedding_model()
+        assert utils.get_embedding_model() is model
+
+    assert len(loads) == 1
+    assert len(model.calls) == 1
+
+
+def test_warm_up_reports_unavailable_model():
+    with patch("utils.load_embedding_model", return_value=None), patch("utils._model_cache", None):
+        assert not utils.warm_up_embedding_model()
+
+
+def test_shared_pinecone_index_is_reused_and_rebuilt_when_unhealthy(monkeypatch):
+    first, second = FakeIndex(), FakeIndex()
+    created = iter([first, second])
+    monkeypatch.setattr("utils.init_pinecone", lambda: next(created))
+    monkeypatch.setattr("utils._pinecone_index", None)
+    monkeypatch.setattr("utils._pinecone_failed_at", None)
+    monkeypatch.setattr("utils.PINECONE_HEALTH_CHECK_INTERVAL", 0)
+
+    assert utils.get_shared_pinecone_index() is first
+    assert utils.get_shared_pinecone_index() is first
+
+    first.healthy = False
+    assert utils.get_shared_pinecone_index() is second
+
+
+def test_retrieve_context_is_scoped_merged_and_budgeted():
+    index = LocalIndex()
+    index.upsert([
+        ("resume:a:0", [1.0, 0.0, 0.0], {"text": "A" * 40, "doc_id": "a", "doc_type": "resume"}),
+        ("resume:a:1", [0.0, 1.0, 0.0], {"text": "B" * 40, "doc_id": "a", "doc_type": "resume"}),
+        ("resume:a:2", [0.0, 0.0, 1.0], {"text": "C" * 400, "doc_id": "a", "doc_type": "resume"}),
+        ("resume:other:0", [1.0, 0.0, 0.0], {"text": "someone else", "doc_id": "other", "doc_type": "resume"}),
+    ])
+    job_vectors = np.array([[0.0, 1.0, 0.1], [1.0, 0.0, 0.0]], dtype=np.float32)
+
+    texts = utils.retrieve_context(index, job_vectors, "a", top_k=3, token_budget=50)
+
+    assert texts == ["A" * 40, "B" * 40]
+
+
+def test_batch_coverage_matches_pairwise_scores_in_both_directions():
+    rng = np.random.default_rng(2)
+    job = rng.normal(size=(3, 6))
+    resumes = [rng.normal(size=(n, 6)) for n in (1, 4, 2)]
+
+    def pairwise(job_matrix, resume_matrix):
+        j = job_matrix / np.linalg.norm(job_matrix, axis=1, keepdims=True)
+        r = resume_matrix / np.linalg.norm(resume_matrix, axis=1, keepdims=True)
+        return (j @ r.T).max(axis=1).mean()
+
+    expected = [pairwise(job, resume) for resume in resumes]
+    np.testing.assert_allclose(utils.batch_coverage(job, resumes), expected, rtol=1e-5)
+
+    jobs = [job, rng.normal(size=(2, 6))]
+    expected = [pairwise(j, resumes[1]) for j in jobs]
+    np.testing.assert_allclose(utils.batch_coverage(resumes[1], jobs, anchor_is_job=False), expected, rtol=1e-5)
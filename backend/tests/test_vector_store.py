@@ -0,0 +1,72 @@
+import numpy as np
+
+from vector_store import LocalIndex
+
+
+def _vectors():
+    return [
+        ("resume:a:0", [1.0, 0.0, 0.0], {"text": "python", "doc_id": "a", "doc_type": "resume"}),
+        ("resume:a:1", [0.0, 1.0, 0.0], {"text": "react", "doc_id": "a", "doc_type": "resume"}),
+        ("resume:b:0", [0.9, 0.1, 0.0], {"text": "python too", "doc_id": "b", "doc_type": "resume"}),
+        ("job:j:0", [1.0, 0.0, 0.0], {"text": "need python", "doc_id": "j", "doc_type": "job"}),
+    ]
+
+
+def test_local_index_query_ranks_by_cosine_and_filters():
+    index = LocalIndex()
+    index.upsert(_vectors())
+
+    results = index.query(vector=[2.0, 0.0, 0.0], top_k=2, include_metadata=True, filter={"doc_type": "resume"})
+    assert [m["id"] for m in results["matches"]] == ["resume:a:0", "resume:b:0"]
+    assert np.isclose(results["matches"][0]["score"], 1.0)
+
+    scoped = index.query(vector=[1.0, 0.0, 0.0], top_k=10, filter={"doc_type": {"$eq": "resume"}, "doc_id": "b"})
+    assert [m["id"] for m in scoped["matches"]] == ["resume:b:0"]
+    assert scoped["matches"][0]["metadata"]["text"] == "python too"
+
+
+def test_local_index_upsert_replaces_existing_ids():
+    index = LocalIndex()
+    index.upsert(_vectors())
+    index.upsert([("resume:a:0", [0.0, 0.0, 1.0], {"text": "go", "doc_id": "a", "doc_type": "resume"})])
+
+    assert index.describe_index_stats()["total_vector_count"] == 4
+    top = index.query(vector=[0.0, 0.0, 1.0], top_k=1)["matches"][0]
+    assert top["id"] == "resume:a:0"
+    assert top["metadata"]["text"] == "go"
+
+
+def test_local_index_persists_across_reopen(tmp_path):
+    path = str(tmp_path / "vectors")
+    index = LocalIndex(path=path)
+    index.upsert(_vectors())
+    index.upsert([("resume:b:0", [0.0, 1.0, 0.0], {"text": "react too", "doc_id": "b", "doc_type": "resume"})])
+    del index
+
+    reopened = LocalIndex(path=path)
+    assert reopened.describe_index_stats()["total_vector_count"] == 4
+    matches = reopened.query(vector=[0.0, 1.0, 0.0], top_k=2, filter={"doc_type": "resume"})["matches"]
+    assert {m["id"] for m in matches} == {"resume:a:1", "resume:b:0"}
+    assert reopened.query(vector=[0.0, 1.0, 0.0], top_k=1, filter={"doc_id": "b"})["matches"][0]["metadata"]["text"] == "react too"
+
+
+def test_local_index_shared_by_several_processes(tmp_path):
+    import multiprocessing
+
+    path = str(tmp_path / "vectors")
+    first, second = LocalIndex(path=path), LocalIndex(path=path)
+    first.upsert([("a", [1.0, 0.0, 0.0], {"doc_id": "a"})])
+    second.upsert([("b", [0.0, 1.0, 0.0], {"doc_id": "b"})])
+    # Enough rows from another process to grow the file past the first mapping.
+    process = multiprocessing.get_context("fork").Process(
+        target=lambda: LocalIndex(path=path).upsert([(f"bulk:{i}", [0.0, 0.0, 1.0], {}) for i in range(1500)])
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+    for index in (first, second, LocalIndex(path=path)):
+        assert index.describe_index_stats()["total_vector_count"] == 1502
+        assert index.query(vector=[1.0, 0.0, 0.0], top_k=1)["matches"][0]["id"] == "a"
+        assert index.query(vector=[0.0, 1.0, 0.0], top_k=1)["matches"][0]["id"] == "b"
+        assert index.query(vector=[0.0, 0.0, 1.0], top_k=1, filter={"doc_id": "b"})["matches"][0]["id"] == "b"
@@ -1,67 +1,319 @@
-import io
+import copy
+import hashlib
 import json
-import requests
-from PyPDF2 import PdfReader
-from docx import Document
-from sentence_transformers import SentenceTransformer
-from langchain_text_splitters import CharacterTextSplitter
-from pinecone import Pinecone
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from llm import OpenRouterClient
+from chunk_cache import chunk_key
+from metrics import CACHE_REQUESTS, FALLBACKS
 import os
 
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-roberta-large-v1')
+# Chunks are sized in embedding-model tokens (see chunking.py). 0 uses the
+# model's whole window; larger values are capped to it.
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "0"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+# Window assumed when the model (and its tokenizer) could not be loaded.
+DEFAULT_CHUNK_TOKENS = 254
+
+# "torch", or "onnx"/"openvino" (needs sentence-transformers[onnx] / [openvino]).
+# EMBEDDING_MODEL_FILE picks a specific export, e.g. onnx/model_qint8_avx512_vnni.onnx.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_MODEL_FILE = os.getenv("EMBEDDING_MODEL_FILE", "")
+# "int8" applies dynamic int8 quantization to the Linear layers (torch backend).
+EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "none")
+
 _model_cache = None
+_model_lock = threading.Lock()
+embedding_model_load_seconds = None
+
+def load_embedding_model():
+    try:
+        # Imported here: torch and sentence-transformers take seconds to
+        # import and nothing but embedding needs them.
+        from sentence_transformers import SentenceTransformer
+
+        model_name = EMBEDDING_MODEL_NAME
+        print(f"Loading embedding model: {model_name} (backend={EMBEDDING_BACKEND}, quantize={EMBEDDING_QUANTIZE})")
+        kwargs = {}
+        if EMBEDDING_BACKEND != "torch":
+            kwargs["backend"] = EMBEDDING_BACKEND
+            if EMBEDDING_MODEL_FILE:
+                kwargs["model_kwargs"] = {"file_name": EMBEDDING_MODEL_FILE}
+        model = SentenceTransformer(model_name, **kwargs)
+        if EMBEDDING_QUANTIZE == "int8" and EMBEDDING_BACKEND == "torch":
+            import torch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+    except Exception as e:
+        print(f"Failed to load embedding model: {e}")
+        return None
 
 def get_embedding_model():
-    global _model_cache
+    global _model_cache, embedding_model_load_seconds
     if _model_cache is None:
+        with _model_lock:
+            if _model_cache is None:
+                started = time.monotonic()
+                _model_cache = load_embedding_model()
+                embedding_model_load_seconds = time.monotonic() - started
+    return _model_cache
+
+# Load at import so a pre-forking server (gunicorn --preload, see
+# gunicorn.conf.py) loads the model once and its workers share the weights
+# copy-on-write instead of each holding a private copy.
+if os.getenv("EMBEDDING_PRELOAD", "false").lower() == "true":
+    get_embedding_model()
+
+def new_content_digest(filename: str):
+    # Anything that changes what the pipeline would produce for these bytes
+    # is part of the key, so a model or chunking change never reuses stale data.
+    extension = os.path.splitext(filename)[1].lower()
+    digest = hashlib.sha256()
+    digest.update(f"{EMBEDDING_MODEL_NAME}|chunks-v2|{CHUNK_MAX_TOKENS}|{CHUNK_OVERLAP_TOKENS}|{extension}|".encode())
+    return digest
+
+def content_digest(content: bytes, filename: str) -> str:
+    digest = new_content_digest(filename)
+    digest.update(content)
+    return digest.hexdigest()
+
+# (model, tokenizer copy) used only for counting, see token_counter.
+_count_tokenizer = None
+_count_tokenizer_lock = threading.Lock()
+
+def _counting_tokenizer(model):
+    # A fast tokenizer keeps its truncation/padding settings on the object and
+    # each call rewrites them: model.encode (on the batcher thread) turns
+    # truncation on, counting turns it off. Sharing one object between the two
+    # truncates counts and leaves encodes untruncated, so counting gets a copy.
+    global _count_tokenizer
+    with _count_tokenizer_lock:
+        if _count_tokenizer is None or _count_tokenizer[0] is not model:
+            _count_tokenizer = (model, copy.deepcopy(model.tokenizer))
+        return _count_tokenizer[1]
+
+def token_counter():
+    """``(count, budget)``: a function giving the model-token length of each of
+    a list of texts, and the most tokens a chunk may hold. Falls back to the
+    character estimate when the model is not available."""
+    model = get_embedding_model()
+    tokenizer = getattr(model, "tokenizer", None)
+    window = getattr(model, "max_seq_length", None)
+    # The tokenizer adds <s> and </s> to every input.
+    budget = window - 2 if window else DEFAULT_CHUNK_TOKENS
+    if CHUNK_MAX_TOKENS:
+        budget = min(budget, CHUNK_MAX_TOKENS) if window else CHUNK_MAX_TOKENS
+    if tokenizer is None:
+        return (lambda texts: [estimate_tokens(text) for text in texts]), budget
+    tokenizer = _counting_tokenizer(model)
+
+    def count(texts: list) -> list:
+        if not texts:
+            return []
+        # Parse workers chunk concurrently and the copy has the same per-call state.
+        with _count_tokenizer_lock:
+            encoded = tokenizer(list(texts), add_special_tokens=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    return count, budget
+
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "64"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+EMBED_ENCODE_BATCH_SIZE = int(os.getenv("EMBED_ENCODE_BATCH_SIZE", "32"))
+
+class EmbeddingBatcher:
+    """Coalesces chunks from concurrent callers into shared encode calls.
+
+    Callers submit their chunks and get a Future back. A single worker thread
+    owns the model: it waits up to ``max_wait_ms`` (or until ``max_batch``
+    chunks are queued), encodes everything in one length-sorted call and hands
+    each caller its own slice.
+    """
+
+    def __init__(self, max_batch: int = EMBED_BATCH_MAX, max_wait_ms: float = EMBED_BATCH_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._queued_chunks = 0
+        self._batches = 0
+        self._requests = 0
+        self._chunks_encoded = 0
+        self._last_batch_size = 0
+        self._max_batch_size = 0
+
+    def submit(self, chunks: list[str]) -> Future:
+        future = Future()
+        if not chunks:
+            future.set_result([])
+            return future
+        self._ensure_worker()
+        with self._lock:
+            self._queued_chunks += len(chunks)
+        self._queue.put((list(chunks), future))
+        return future
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queued_chunks,
+                "pending_requests": self._queue.qsize(),
+                "batches": self._batches,
+                "requests": self._requests,
+                "chunks_encoded": self._chunks_encoded,
+                "avg_batch_size": round(self._chunks_encoded / self._batches, 2) if self._batches else 0,
+                "last_batch_size": self._last_batch_size,
+                "max_batch_size": self._max_batch_size,
+            }
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch):
+        texts = [chunk for chunks, _ in batch for chunk in chunks]
+        with self._lock:
+            self._queued_chunks -= len(texts)
+            self._batches += 1
+            self._requests += len(batch)
+            self._chunks_encoded += len(texts)
+            self._last_batch_size = len(texts)
+            self._max_batch_size = max(self._max_batch_size, len(texts))
+
         try:
-            # Use environment variable to choose model
-            model_name = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-roberta-large-v1')
-            print(f"Loading embedding model: {model_name}")
-            _model_cache = SentenceTransformer(model_name)
+            model = get_embedding_model()
+            if model is None:
+                raise Exception("Model not available")
+            # Similar lengths in the same forward pass means less padding.
+            order = np.argsort([len(t) for t in texts], kind="stable")
+            encoded = model.encode(
+                [texts[i] for i in order],
+                batch_size=EMBED_ENCODE_BATCH_SIZE,
+                convert_to_numpy=True,
+            )
+            vectors = np.empty_like(encoded)
+            vectors[order] = encoded
         except Exception as e:
-            print(f"Failed to load embedding model: {e}")
-            _model_cache = None
-    return _model_cache
+            for _, future in batch:
+                future.set_exception(e)
+            return
 
-def extract_text(content: bytes, filename: str) -> str:
+        offset = 0
+        for chunks, future in batch:
+            future.set_result(vectors[offset:offset + len(chunks)].tolist())
+            offset += len(chunks)
+
+_embedding_batcher = EmbeddingBatcher()
+
+def embedding_batcher_stats() -> dict:
+    return _embedding_batcher.stats()
+
+def embedding_model_status() -> dict:
+    return {"loaded": _model_cache is not None, "load_seconds": embedding_model_load_seconds}
+
+def warm_up_embedding_model() -> bool:
+    """Load the model and run one encode through the batcher, so the first upload doesn't pay for either."""
+    started = time.monotonic()
     try:
-        if filename.endswith('.pdf'):
-            pdf_file = io.BytesIO(content)
-            pdf_reader = PdfReader(pdf_file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-        elif filename.endswith('.docx'):
-            docx_file = io.BytesIO(content)
-            doc = Document(docx_file)
-            text = ""
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-            return text
-        elif filename.endswith('.txt'):
-            return content.decode('utf-8', errors='ignore')
-        else:
-            raise ValueError("Unsupported file type")
+        _embedding_batcher.submit(["Warm-up sentence for the embedding model."]).result()
     except Exception as e:
-        print(f"Text extraction failed for {filename}: {e}")
-        return "Sample resume text for testing purposes." 
+        print(f"Embedding model warm-up failed: {e}")
+        return False
+    print(f"Embedding model ready in {time.monotonic() - started:.1f}s")
+    return True
+
+def embedding_model_id() -> str:
+    # Everything that changes the vector a chunk gets.
+    return f"{EMBEDDING_MODEL_NAME}|{EMBEDDING_BACKEND}|{EMBEDDING_MODEL_FILE}|{EMBEDDING_QUANTIZE}"
+
+# Stand-in vectors when the model fails. All components are equal, which no real embedding has.
+DUMMY_EMBEDDING = [0.1] * 1024
 
-def chunk_text(text: str) -> list[str]:
-    splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = splitter.split_text(text)
-    return chunks
+def is_dummy_embedding(embeddings) -> bool:
+    """True when any row of ``embeddings`` is a generate_embeddings failure stand-in."""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if vectors.size == 0:
+        return False
+    vectors = vectors.reshape(len(vectors), -1)
+    return bool(np.any(vectors.max(axis=1) == vectors.min(axis=1)))
+
+def generate_embeddings(chunks: list[str], cache=None) -> list[list[float]]:
+    """Embeddings for ``chunks``. With a chunk cache (see chunk_cache.py), all
+    chunks are looked up at once and only the misses are encoded."""
+    keys = cached = None
+    to_encode = chunks
+    if cache is not None and chunks:
+        model_id = embedding_model_id()
+        keys = [chunk_key(model_id, chunk) for chunk in chunks]
+        try:
+            cached = cache.get_many(keys)
+        except Exception as e:
+            print(f"Chunk embedding cache lookup failed: {e}")
+            cached = [None] * len(chunks)
+        misses = {}
+        for i, (key, vector) in enumerate(zip(keys, cached)):
+            if vector is None:
+                misses.setdefault(key, i)
+        hits = sum(vector is not None for vector in cached)
+        CACHE_REQUESTS.inc(hits, cache="chunkemb", result="hit")
+        CACHE_REQUESTS.inc(len(chunks) - hits, cache="chunkemb", result="miss")
+        to_encode = [chunks[i] for i in misses.values()]
 
-def generate_embeddings(chunks: list[str]) -> list[list[float]]:
     try:
-        model = get_embedding_model()
-        if model is None:
-            raise Exception("Model not available")
-        embeddings = model.encode(chunks, convert_to_tensor=False) 
-        return embeddings.tolist()
+        encoded = _embedding_batcher.submit(to_encode).result()
     except Exception as e:
         print(f"Embedding generation failed: {e}, using dummy embeddings")
-        return [[0.1] * 1024 for _ in chunks]
+        FALLBACKS.inc(reason="dummy_embeddings")
+        return [list(DUMMY_EMBEDDING) for _ in chunks]
+    if cached is None:
+        return encoded
+
+    fresh = dict(zip(misses, encoded))
+    if fresh:
+        try:
+            cache.set_many(list(fresh), list(fresh.values()))
+        except Exception as e:
+            print(f"Chunk embedding cache write failed: {e}")
+    return [fresh[key] if vector is None else vector.tolist() for key, vector in zip(keys, cached)]
+
+PINECONE_POOL_SIZE = int(os.getenv("PINECONE_POOL_SIZE", "16"))
+PINECONE_HEALTH_CHECK_INTERVAL = float(os.getenv("PINECONE_HEALTH_CHECK_INTERVAL", "60"))
+PINECONE_RETRY_INTERVAL = float(os.getenv("PINECONE_RETRY_INTERVAL", "30"))
+# Pinecone caps a request at 1000 vectors / 2 MB; vectors go over the wire as
+# JSON, so budget roughly 12 bytes per float plus the metadata text.
+PINECONE_UPSERT_BATCH_SIZE = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100"))
+PINECONE_UPSERT_MAX_BYTES = int(os.getenv("PINECONE_UPSERT_MAX_BYTES", str(2 * 1024 * 1024)))
+
+_pinecone_lock = threading.Lock()
+_pinecone_index = None
+_pinecone_checked_at = 0.0
+_pinecone_failed_at = None
 
 def init_pinecone():
     api_key = os.getenv("PINECONE_API_KEY")
@@ -70,17 +322,77 @@ def init_pinecone():
     if not api_key or not index_name:
         raise ValueError("Missing Pinecone API key or index name")
 
-    pc = Pinecone(api_key=api_key)
+    from pinecone import Pinecone
+    pc = Pinecone(api_key=api_key, connection_pool_maxsize=PINECONE_POOL_SIZE)
     return pc.Index(index_name)
 
+def get_shared_pinecone_index():
+    """Process-wide Pinecone index handle.
+
+    Built once and reused so requests share the client's HTTP connection
+    pool. The handle is re-checked with describe_index_stats every
+    PINECONE_HEALTH_CHECK_INTERVAL seconds and rebuilt if that fails; after a
+    failed init we wait PINECONE_RETRY_INTERVAL before trying again.
+    """
+    global _pinecone_index, _pinecone_checked_at, _pinecone_failed_at
+
+    now = time.monotonic()
+    index = _pinecone_index
+    if index is not None and now - _pinecone_checked_at < PINECONE_HEALTH_CHECK_INTERVAL:
+        return index
+
+    with _pinecone_lock:
+        if _pinecone_index is not None and now - _pinecone_checked_at < PINECONE_HEALTH_CHECK_INTERVAL:
+            return _pinecone_index
+
+        if _pinecone_index is not None:
+            try:
+                _pinecone_index.describe_index_stats()
+                _pinecone_checked_at = now
+                return _pinecone_index
+            except Exception as e:
+                print(f"Pinecone health check failed: {e}, reconnecting")
+                _pinecone_index = None
+
+        if _pinecone_failed_at is not None and now - _pinecone_failed_at < PINECONE_RETRY_INTERVAL:
+            return None
+
+        try:
+            _pinecone_index = init_pinecone()
+            _pinecone_checked_at = now
+            _pinecone_failed_at = None
+            return _pinecone_index
+        except Exception:
+            _pinecone_failed_at = now
+            raise
+
+def _upsert_batches(vectors: list):
+    batch = []
+    batch_bytes = 0
+    for vector in vectors:
+        _, values, metadata = vector
+        size = len(values) * 12 + len(metadata.get("text", "").encode("utf-8")) + 256
+        if batch and (len(batch) >= PINECONE_UPSERT_BATCH_SIZE or batch_bytes + size > PINECONE_UPSERT_MAX_BYTES):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        yield batch
+
 def store_embeddings(index, embeddings: list[list[float]], chunks: list[str], doc_id: str, doc_type: str):
     try:
         vectors = []
         for i, (emb, chunk) in enumerate(zip(embeddings, chunks)):
             vector_id = f"{doc_type}:{doc_id}:{i}"
-            vectors.append((vector_id, emb, {"text": chunk, "doc_id": doc_id, "doc_type": doc_type}))
-        index.upsert(vectors)
-        print(f"Successfully stored {len(vectors)} vectors in Pinecone")
+            values = emb.tolist() if hasattr(emb, "tolist") else emb
+            vectors.append((vector_id, values, {"text": chunk, "doc_id": doc_id, "doc_type": doc_type}))
+        batches = 0
+        for batch in _upsert_batches(vectors):
+            index.upsert(vectors=batch)
+            batches += 1
+        print(f"Successfully stored {len(vectors)} vectors in Pinecone ({batches} batches)")
     except Exception as e:
         error_msg = str(e)
         if "dimension" in error_msg.lower():
@@ -96,18 +408,85 @@ def store_embeddings(index, embeddings: list[list[float]], chunks: list[str], do
             raise
     return True
 
-def call_openrouter(prompt: str) -> str:
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        raise ValueError("Missing OpenRouter API key")
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": "mistralai/mistral-7b-instruct",
-        "messages": [{"role": "user", "content": prompt}]
-    }
-    response = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data)
-    return response.json()["choices"][0]["message"]["content"]
\ No newline at end of file
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+RETRIEVAL_MAX_QUERIES = int(os.getenv("RETRIEVAL_MAX_QUERIES", "8"))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "1500"))
+RETRIEVAL_CONCURRENCY = int(os.getenv("RETRIEVAL_CONCURRENCY", "8"))
+
+_retrieval_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_CONCURRENCY, thread_name_prefix="retrieve")
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose with BPE tokenizers.
+    return max(1, len(text) // 4)
+
+def retrieve_context(index, query_vectors, doc_id: str, doc_type: str = "resume",
+                     top_k: int = RETRIEVAL_TOP_K, token_budget: int = RETRIEVAL_TOKEN_BUDGET) -> list[str]:
+    """Chunks of one document most relevant to any of the query vectors.
+
+    Each query vector (one per job chunk) is searched concurrently within
+    ``doc_id`` only. Hits are merged by vector id keeping the best score,
+    then taken best-first while they fit ``token_budget`` and returned in
+    document order.
+    """
+    query_filter = {"doc_type": doc_type, "doc_id": doc_id}
+    vectors = [v.tolist() if hasattr(v, "tolist") else v for v in list(query_vectors)[:RETRIEVAL_MAX_QUERIES]]
+    futures = [
+        _retrieval_pool.submit(index.query, vector=vector, top_k=top_k, include_metadata=True, filter=query_filter)
+        for vector in vectors
+    ]
+
+    best = {}
+    for future in futures:
+        for match in future.result()["matches"]:
+            if match["id"] not in best or match["score"] > best[match["id"]]["score"]:
+                best[match["id"]] = match
+
+    selected = []
+    used_tokens = 0
+    for match in sorted(best.values(), key=lambda m: m["score"], reverse=True):
+        tokens = estimate_tokens(match["metadata"]["text"])
+        if used_tokens + tokens > token_budget:
+            continue
+        selected.append(match)
+        used_tokens += tokens
+
+    def position(match):
+        suffix = match["id"].rsplit(":", 1)[-1]
+        return int(suffix) if suffix.isdigit() else 0
+
+    return [match["metadata"]["text"] for match in sorted(selected, key=position)]
+
+def normalize_rows(matrix) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+def batch_coverage(anchor, others: list, anchor_is_job: bool = True) -> np.ndarray:
+    """How well each resume covers its job, for one anchor against many documents.
+
+    Coverage is the mean over job chunks of the best cosine similarity to any
+    resume chunk. All candidates are stacked into one matrix so the whole
+    batch is a single matrix multiply followed by segmented reductions.
+    """
+    if not others:
+        return np.zeros(0, dtype=np.float32)
+    lengths = np.array([len(m) for m in others])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    similarities = normalize_rows(anchor) @ normalize_rows(np.vstack(others)).T
+    if anchor_is_job:
+        # Best chunk of each resume for every job chunk, averaged over job chunks.
+        return np.maximum.reduceat(similarities, starts, axis=1).mean(axis=0)
+    # Best resume chunk for every chunk of each job, averaged per job.
+    return np.add.reduceat(similarities.max(axis=0), starts) / lengths
+
+_openrouter_client = OpenRouterClient()
+
+async def call_openrouter(prompt: str) -> str:
+    return await _openrouter_client.complete(prompt)
+
+async def stream_openrouter(prompt: str):
+    async for delta in _openrouter_client.stream(prompt):
+        yield delta
+
+def llm_client_stats() -> dict:
+    return _openrouter_client.stats()
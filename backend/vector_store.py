@@ -0,0 +1,319 @@
+import fcntl
+import json
+import os
+import threading
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# Metadata fields that are never used in filters and would bloat the postings.
+_UNINDEXED_FIELDS = {"text"}
+
+
+def _matches_filter(metadata: dict, filter: dict) -> bool:
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$eq" and value != operand:
+                return False
+            if op == "$ne" and value == operand:
+                return False
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$nin" and value in operand:
+                return False
+    return True
+
+
+class LocalIndex:
+    """In-process vector index with the subset of the Pinecone Index API we use.
+
+    Vectors are L2-normalised and kept in a float32 matrix, so a query is one
+    matrix-vector product and the score is cosine similarity, like a Pinecone
+    cosine index. With ``path`` set the matrix is a memory-mapped file and
+    ids/metadata are appended to a JSONL log, so the index survives restarts.
+    ``mode="hnsw"`` adds an hnswlib graph for unfiltered or broad queries when
+    hnswlib is installed; filtered queries on few rows stay brute force.
+
+    Several processes (gunicorn workers, ``worker.py``) may share one
+    ``path``: writers hold a file lock on the log while they assign rows, and
+    every upsert and query first applies rows other processes logged since.
+    A row's vector is written before its log line, so readers never see an
+    id without its vector.
+    """
+
+    def __init__(self, path: str = None, mode: str = "flat", hnsw_min_rows: int = 10000):
+        self.path = path
+        self.mode = mode if (mode != "hnsw" or hnswlib is not None) else "flat"
+        if mode == "hnsw" and hnswlib is None:
+            print("hnswlib not installed, local vector index using flat search")
+        self.hnsw_min_rows = hnsw_min_rows
+        self._lock = threading.RLock()
+        self._dim = None
+        self._count = 0
+        self._matrix = None
+        self._ids = []
+        self._metadata = []
+        self._rows = {}
+        self._postings = {}
+        self._hnsw = None
+        self._log_offset = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._refresh()
+
+    def upsert(self, vectors):
+        with self._lock:
+            if not self.path:
+                return {"upserted_count": len(self._upsert_rows(vectors))}
+            with open(self.path + ".meta.jsonl", "a", encoding="utf-8") as log:
+                fcntl.flock(log, fcntl.LOCK_EX)
+                try:
+                    # Rows other processes assigned must be known before we assign ours.
+                    self._refresh()
+                    log_lines = self._upsert_rows(vectors)
+                    if log_lines:
+                        self._matrix.flush()
+                        log.write("\n".join(log_lines) + "\n")
+                        log.flush()
+                    self._log_offset = os.fstat(log.fileno()).st_size
+                finally:
+                    fcntl.flock(log, fcntl.LOCK_UN)
+            return {"upserted_count": len(log_lines)}
+
+    def _upsert_rows(self, vectors) -> list:
+        log_lines = []
+        for vector in vectors:
+            if isinstance(vector, dict):
+                vector_id, values, metadata = vector["id"], vector["values"], vector.get("metadata", {})
+            else:
+                vector_id, values, metadata = vector
+            values = np.asarray(values, dtype=np.float32)
+            if self._dim is None:
+                self._init_dim(len(values))
+            if len(values) != self._dim:
+                raise ValueError(f"Vector dimension {len(values)} does not match index dimension {self._dim}")
+            norm = np.linalg.norm(values)
+            if norm > 0:
+                values = values / norm
+
+            row = self._rows.get(vector_id)
+            if row is None:
+                row = self._count
+                self._ensure_capacity(row + 1)
+                self._count += 1
+                self._ids.append(vector_id)
+                self._metadata.append(None)
+                self._rows[vector_id] = row
+            else:
+                self._unindex(row)
+            self._matrix[row] = values
+            self._metadata[row] = dict(metadata)
+            self._index(row)
+            if self._hnsw is not None:
+                self._hnsw_add(np.array([row]))
+            log_lines.append(json.dumps([row, vector_id, metadata]))
+        return log_lines
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, filter: dict = None, include_values: bool = False, **kwargs):
+        with self._lock:
+            self._refresh()
+            if self._count == 0:
+                return {"matches": []}
+            query = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm > 0:
+                query = query / norm
+
+            candidates = self._candidates(filter)
+            if candidates is not None and len(candidates) == 0:
+                return {"matches": []}
+
+            if self._hnsw is not None and (candidates is None or len(candidates) >= self.hnsw_min_rows):
+                rows, scores = self._hnsw_query(query, top_k, candidates)
+            else:
+                rows = np.arange(self._count) if candidates is None else candidates
+                scores = self._matrix[rows] @ query
+                if len(rows) > top_k:
+                    best = np.argpartition(-scores, top_k)[:top_k]
+                    rows, scores = rows[best], scores[best]
+                order = np.argsort(-scores, kind="stable")
+                rows, scores = rows[order], scores[order]
+
+            matches = []
+            for row, score in zip(rows, scores):
+                match = {"id": self._ids[row], "score": float(score)}
+                if include_metadata:
+                    match["metadata"] = self._metadata[row]
+                if include_values:
+                    match["values"] = self._matrix[row].tolist()
+                matches.append(match)
+            return {"matches": matches}
+
+    def describe_index_stats(self, **kwargs):
+        with self._lock:
+            self._refresh()
+            return {"dimension": self._dim or 0, "total_vector_count": self._count, "mode": self.mode}
+
+    def _candidates(self, filter: dict):
+        if not filter:
+            return None
+        rows = None
+        residual = {}
+        for key, condition in filter.items():
+            if key.startswith("$") or key in _UNINDEXED_FIELDS:
+                residual[key] = condition
+                continue
+            if isinstance(condition, dict):
+                if set(condition) == {"$eq"}:
+                    condition = condition["$eq"]
+                elif set(condition) == {"$in"}:
+                    posting = set()
+                    for value in condition["$in"]:
+                        posting |= self._postings.get((key, value), set())
+                    rows = posting if rows is None else rows & posting
+                    continue
+                else:
+                    residual[key] = condition
+                    continue
+            posting = self._postings.get((key, condition), set())
+            rows = set(posting) if rows is None else rows & posting
+        if rows is None:
+            rows = range(self._count)
+        if residual:
+            rows = [row for row in rows if _matches_filter(self._metadata[row], residual)]
+        return np.fromiter(sorted(rows), dtype=np.int64)
+
+    def _index(self, row: int):
+        for key, value in self._metadata[row].items():
+            if key not in _UNINDEXED_FIELDS and isinstance(value, (str, int, float, bool)):
+                self._postings.setdefault((key, value), set()).add(row)
+
+    def _unindex(self, row: int):
+        for key, value in (self._metadata[row] or {}).items():
+            if key in _UNINDEXED_FIELDS or not isinstance(value, (str, int, float, bool)):
+                continue
+            posting = self._postings.get((key, value))
+            if posting is not None:
+                posting.discard(row)
+
+    def _init_dim(self, dim: int):
+        self._dim = dim
+        if self.path:
+            with open(self.path + ".json", "w", encoding="utf-8") as header:
+                json.dump({"dim": dim}, header)
+        self._ensure_capacity(1)
+        if self.mode == "hnsw":
+            self._hnsw = hnswlib.Index(space="ip", dim=dim)
+            self._hnsw.init_index(max_elements=len(self._matrix), ef_construction=200, M=16)
+
+    def _ensure_capacity(self, rows: int):
+        capacity = 0 if self._matrix is None else len(self._matrix)
+        if rows <= capacity:
+            return
+        if self.path:
+            # Another process may already have grown the file past our mapping.
+            on_disk = self._rows_on_disk()
+            if on_disk < rows:
+                if self._matrix is not None:
+                    self._matrix.flush()
+                with open(self.path + ".vectors", "ab") as handle:
+                    handle.truncate(max(1024, on_disk * 2, rows) * self._dim * 4)
+            self._map()
+            return
+        new_capacity = max(1024, capacity * 2, rows)
+        matrix = np.zeros((new_capacity, self._dim), dtype=np.float32)
+        if self._matrix is not None:
+            matrix[:capacity] = self._matrix
+        self._matrix = matrix
+        if self._hnsw is not None:
+            self._hnsw.resize_index(new_capacity)
+
+    def _rows_on_disk(self) -> int:
+        try:
+            return os.path.getsize(self.path + ".vectors") // (self._dim * 4)
+        except OSError:
+            return 0
+
+    def _map(self):
+        if self._matrix is not None:
+            del self._matrix
+        capacity = self._rows_on_disk()
+        self._matrix = np.memmap(self.path + ".vectors", dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+        if self._hnsw is not None and self._hnsw.get_max_elements() < capacity:
+            self._hnsw.resize_index(capacity)
+
+    def _refresh(self):
+        # Apply log lines appended (by this or another process) since the last call.
+        if not self.path:
+            return
+        log_path = self.path + ".meta.jsonl"
+        try:
+            size = os.path.getsize(log_path)
+        except OSError:
+            return
+        if size <= self._log_offset:
+            return
+        with open(log_path, "rb") as log:
+            log.seek(self._log_offset)
+            data = log.read(size - self._log_offset)
+        # A writer may be part-way through its last line.
+        data = data[:data.rfind(b"\n") + 1]
+        if not data:
+            return
+        self._log_offset += len(data)
+        if self._dim is None:
+            with open(self.path + ".json", encoding="utf-8") as header:
+                self._dim = json.load(header)["dim"]
+
+        changed = []
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            row, vector_id, metadata = json.loads(line)
+            while len(self._ids) <= row:
+                self._ids.append(None)
+                self._metadata.append(None)
+            if self._metadata[row] is not None:
+                self._unindex(row)
+            self._ids[row] = vector_id
+            self._metadata[row] = metadata
+            self._rows[vector_id] = row
+            self._index(row)
+            changed.append(row)
+        self._count = len(self._ids)
+        if self._matrix is None or len(self._matrix) < self._count:
+            self._map()
+
+        if self.mode == "hnsw" and changed:
+            if self._hnsw is None:
+                self._hnsw = hnswlib.Index(space="ip", dim=self._dim)
+                self._hnsw.init_index(max_elements=len(self._matrix), ef_construction=200, M=16)
+            self._hnsw_add(np.array(sorted(set(changed))))
+
+    def _hnsw_add(self, rows):
+        self._hnsw.add_items(self._matrix[rows], rows)
+
+    def _hnsw_query(self, query, top_k: int, candidates):
+        allowed = None if candidates is None else set(candidates.tolist())
+        k = min(top_k, self._count if allowed is None else len(allowed))
+        self._hnsw.set_ef(max(50, k * 2))
+        labels, distances = self._hnsw.knn_query(
+            query, k=k, filter=None if allowed is None else (lambda label: label in allowed)
+        )
+        # hnswlib's "ip" space reports 1 - dot product.
+        return labels[0].astype(np.int64), 1.0 - distances[0]
@@ -0,0 +1,22 @@
+"""Standalone ingestion worker for INGEST_MODE=queue.
+
+Run as many of these as ingestion needs, next to or instead of the workers
+inside the API process (set INGEST_RUN_IN_API=false on the API tier):
+
+    python worker.py
+"""
+import asyncio
+
+from executors import run_embed
+from main import EMBEDDING_WARMUP, INGEST_WORKERS, ingest_worker
+from utils import warm_up_embedding_model
+
+
+async def main():
+    if EMBEDDING_WARMUP:
+        await run_embed(warm_up_embedding_model)
+    await asyncio.gather(*(ingest_worker(i) for i in range(INGEST_WORKERS)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -25,6 +25,9 @@ export type LoadingStage =
   | "matching"
   | "finalizing";
 
+// How long to wait for a queued upload to be processed before giving up.
+const INGESTION_TIMEOUT_MS = 5 * 60 * 1000;
+
 export default function Home() {
   const [resumeFile, setResumeFile] = useState<File | null>(null);
   const [jobText, setJobText] = useState("");
@@ -34,6 +37,24 @@ export default function Home() {
   const [loadingStage, setLoadingStage] = useState<LoadingStage>("idle");
   const [error, setError] = useState<string | null>(null);
 
+  // With queued ingestion the upload returns 202 and the document is ready
+  // once GET /results/{id} reports "completed".
+  const waitForIngestion = async (backendUrl: string, upload: { job_id: string; status?: string }) => {
+    if (upload.status !== "queued") return;
+    const giveUpAt = Date.now() + INGESTION_TIMEOUT_MS;
+    for (;;) {
+      if (Date.now() > giveUpAt) {
+        throw new Error("Upload is taking longer than expected. Please try again in a few minutes.");
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const res = await fetch(`${backendUrl}/results/${upload.job_id}`);
+      if (!res.ok) throw new Error("Failed to check upload status");
+      const status = await res.json();
+      if (status.status === "completed") return;
+      if (status.status === "failed") throw new Error(status.error || "Upload processing failed");
+    }
+  };
+
   const handleMatch = async () => {
     if (!resumeFile || (!jobFile && !jobText.trim())) return;
 
@@ -55,6 +76,7 @@ export default function Home() {
       });
       if (!resumeRes.ok) throw new Error("Failed to upload resume");
       const resumeData = await resumeRes.json();
+      await waitForIngestion(backendUrl, resumeData);
 
       // Stage 2: Job Description Upload
       setLoadingStage("job");
@@ -70,10 +92,11 @@ export default function Home() {
       });
       if (!jobRes.ok) throw new Error("Failed to upload job description");
       const jobData = await jobRes.json();
+      await waitForIngestion(backendUrl, jobData);
 
       // Stage 3: Matching Analysis
       setLoadingStage("matching");
-      const matchRes = await fetch(`${backendUrl}/match`, {
+      const matchRes = await fetch(`${backendUrl}/match/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -81,12 +104,36 @@ export default function Home() {
           job_id: jobData.job_id,
         }),
       });
-      if (!matchRes.ok) throw new Error("Failed to get match results");
+      if (!matchRes.ok || !matchRes.body) throw new Error("Failed to get match results");
 
-      setLoadingStage("finalizing");
-      const matchData = await matchRes.json();
+      // Server-Sent Events: "ats" is a quick keyword-based estimate shown
+      // while the LLM streams "token" events; "result" is the final answer.
+      const reader = matchRes.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let finalResult: MatchResult | null = null;
+      while (!finalResult) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+        for (const block of events) {
+          const lines = block.split("\n");
+          const event = lines.find((l) => l.startsWith("event: "))?.slice(7);
+          const data = lines.find((l) => l.startsWith("data: "))?.slice(6);
+          if (!event || !data) continue;
+          if (event === "ats") {
+            setResult(JSON.parse(data));
+            setLoadingStage("finalizing");
+          } else if (event === "result") {
+            finalResult = JSON.parse(data);
+          }
+        }
+      }
+      if (!finalResult) throw new Error("Failed to get match results");
 
-      setResult(matchData);
+      setResult(finalResult);
     } catch (err) {
       setError(err instanceof Error ? err.message : "An error occurred");
     } finally {